@@ -1,47 +1,48 @@
-import sys
+import time
+_import_start = time.perf_counter()  # Start of the 'imports' startup phase
+
 import traceback
-from flask import Flask, request, jsonify
-from flask_cors import CORS
-import pandas as pd
+from flask import Flask, Response, g, request, jsonify
 import numpy as np
-import joblib
 import os
+import threading
+import warnings
+
+from feature_encoder import FeatureEncoder
+from tree_engine import FlatForest
+from prediction_table import PredictionTable, default_table_path, model_fingerprint
+from response_cache import LRUCache
+from model_artifact import artifact_path_for, is_artifact, load_artifact
+from micro_batcher import MicroBatcher
+from shadow_scorer import ShadowScorer
+from model_bundle import ModelBundle, ModelFileWatcher
+from metrics import MetricsRegistry
+from career_scoring import CareerScorer
+from cached_json import CachedJSON
+from cors import CORSMiddleware, parse_list
 
-# Configure logging for debugging
+# Configure logging: handlers run on a background thread (see log_config.py)
 import logging
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler('backend.log')
-    ]
-)
+from log_config import configure_logging, dropped_records, payload_sampler_from_env
+configure_logging()
 logger = logging.getLogger(__name__)
+# Request payloads are logged only when LOG_PAYLOADS=1, for 1 in LOG_PAYLOAD_SAMPLE_RATE requests
+payload_logger = logging.getLogger(__name__ + '.payloads')
+payload_sampler = payload_sampler_from_env()
+
+# The model is fitted on a DataFrame but served with plain arrays from FeatureEncoder
+warnings.filterwarnings('ignore', message='X does not have valid feature names')
 
 # Create the Flask app with the simplest possible configuration
 app = Flask(__name__, static_folder='frontend/build', static_url_path='/')
 
-# Apply CORS with appropriate settings - fixing the supports_credentials + wildcard error
-CORS(app, 
-     origins=["http://localhost:3000", "http://127.0.0.1:3000"], 
-     allow_headers=["*"], 
-     methods=["*"], 
-     supports_credentials=True,
-     send_wildcard=True)
-
-# Remove the after_request handler as it might be conflicting
-# @app.after_request
-# def after_request(response):
-#     response.headers.add('Access-Control-Allow-Origin', '*')
-#     response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-#     response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE,OPTIONS')
-#     return response
-
-# Define the path to the new model
-MODEL_PATH = 'student_performance_rf_model.pkl'
-# Alternative model if the above doesn't exist
-ALT_MODEL_PATH = 'student_performance_xgb_model.pkl'
+# Define the path to the model train_model.py selects, whatever its family
+MODEL_PATH = os.environ.get('MODEL_PATH', 'student_performance_model.pkl')
+# Per-family names written by older versions of train_model.py, tried in order if the above doesn't exist
+ALT_MODEL_PATHS = ['student_performance_rf_model.pkl', 'student_performance_xgb_model.pkl']
+# Memory-mapped artifact (see model_artifact.py), preferred over the pickles when present.
+# Set MODEL_ARTIFACT_PATH to an empty string to always load the pickle.
+MODEL_ARTIFACT_PATH = os.environ.get('MODEL_ARTIFACT_PATH', artifact_path_for(MODEL_PATH))
 
 # Pre-defined categories
 EDUCATION_LEVELS = ['High School', 'Bachelor', 'Master', 'PhD']
@@ -49,6 +50,86 @@ SKILL_LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'Expert']
 CAREERS = ['Software Engineer', 'Data Scientist', 'Doctor', 'Teacher',
           'Marketing Specialist', 'Financial Analyst', 'Graphic Designer']
 
+# Map education level to Medu/Fedu
+EDUCATION_MAP = {
+    'High School': 1,
+    'Bachelor': 2,
+    'Master': 3,
+    'PhD': 4
+}
+
+# Map skill levels to numeric values
+SKILL_MAP = {
+    'Beginner': 1,
+    'Intermediate': 2,
+    'Advanced': 3,
+    'Expert': 4
+}
+
+# Career eligibility rules and score weights (see career_scoring.CAREER_RULES)
+career_scorer = CareerScorer(CAREERS, EDUCATION_MAP, SKILL_MAP)
+
+# Inference engine: 'flat' evaluates the trees from flattened NumPy arrays,
+# 'sklearn' calls the estimator's predict/predict_proba directly
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'flat').lower()
+# Batches larger than this go to the estimator's own predict_proba, which is faster
+# there (crossover measured with benchmarks.py; see README); unset uses the
+# per-family default below, 0 always uses the flat engine
+FLAT_ENGINE_MAX_ROWS = os.environ.get('FLAT_ENGINE_MAX_ROWS')
+FLAT_ENGINE_CROSSOVER = {
+    'RandomForestClassifier': 256,
+    'XGBClassifier': 48
+}
+
+# Precomputed prediction table (see prediction_table.py); defaults to <model>_table.npy
+USE_PREDICTION_TABLE = os.environ.get('USE_PREDICTION_TABLE', '1') == '1'
+PREDICTION_TABLE_PATH = os.environ.get('PREDICTION_TABLE_PATH')
+
+# Number of /api/predict responses kept in the in-process LRU cache (0 disables it)
+RESPONSE_CACHE_SIZE = int(os.environ.get('RESPONSE_CACHE_SIZE', 1024))
+
+# Opt-in coalescing of concurrent /api/predict rows into batched model calls
+MICRO_BATCHING = os.environ.get('MICRO_BATCHING', '0') == '1'
+MICRO_BATCH_MAX_SIZE = int(os.environ.get('MICRO_BATCH_MAX_SIZE', 32))
+MICRO_BATCH_MAX_WAIT_MS = float(os.environ.get('MICRO_BATCH_MAX_WAIT_MS', 2))
+
+# Poll the model files every N seconds and hot-reload on change (0 disables the watcher)
+MODEL_WATCH_INTERVAL = float(os.environ.get('MODEL_WATCH_INTERVAL', 0))
+# Token required by the /api/admin/* endpoints (X-Admin-Token header); unset disables them
+ADMIN_TOKEN = os.environ.get('ADMIN_TOKEN')
+
+# Load the model in a background thread so the process answers /healthz immediately
+# and /readyz flips to ready once loading finishes (single-process servers;
+# gunicorn.conf.py turns it off, since the master must finish loading before forking)
+BACKGROUND_MODEL_LOAD = os.environ.get('BACKGROUND_MODEL_LOAD', '0') == '1'
+
+# Maximum number of profiles accepted by /api/predict/batch
+MAX_BATCH_SIZE = int(os.environ.get('MAX_BATCH_SIZE', 1000))
+
+# Second model scored off the request path on the same inputs, to compare with the
+# primary before switching (a pickle or memory-mapped artifact; unset disables it)
+SHADOW_MODEL_PATH = os.environ.get('SHADOW_MODEL_PATH') or None
+# Requests waiting for the shadow model; beyond that they are dropped from the comparison
+SHADOW_QUEUE_SIZE = int(os.environ.get('SHADOW_QUEUE_SIZE', 1000))
+
+# Largest gap (percentage points) allowed between an explanation's base value plus
+# contributions and the studentPerformanceScore it explains
+EXPLANATION_TOLERANCE = 1e-6
+# Build the per-leaf contribution sums (FlatForest.contributions) while warming up a
+# new model, so the first ?explain=true request doesn't pay for them under the lock
+# (about 16 ms for the shipped forest); 0 defers them to that request
+WARM_UP_EXPLANATIONS = os.environ.get('WARM_UP_EXPLANATIONS', '1') == '1'
+
+# Seconds browsers and CDNs may reuse the /api/options response before revalidating
+OPTIONS_CACHE_MAX_AGE = int(os.environ.get('OPTIONS_CACHE_MAX_AGE', 3600))
+
+# CORS for browser clients (see cors.py): allowed origins ('*' for any) and request headers
+CORS_ORIGINS = parse_list(os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://127.0.0.1:3000'))
+CORS_ALLOW_HEADERS = parse_list(os.environ.get('CORS_ALLOW_HEADERS', 'Content-Type, Accept, X-Admin-Token'))
+CORS_ALLOW_CREDENTIALS = os.environ.get('CORS_ALLOW_CREDENTIALS', '1') == '1'
+# Seconds browsers may reuse a preflight result (Chromium caps this at 7200)
+CORS_MAX_AGE = int(os.environ.get('CORS_MAX_AGE', 7200))
+
 # Define the feature names for the model (should match those in student-mat.csv)
 STUDENT_FEATURES = {
     'school': ['GP', 'MS'],
@@ -83,88 +164,642 @@ STUDENT_FEATURES = {
     'absences': range(0, 94)  # 0-93
 }
 
-# Global variables to store model information
-model_info = None
-model = None
-numerical_cols = None
-categorical_cols = None
-numerical_transformer = None
-used_model_path = None  # Track which model file we loaded
+# The active ModelBundle. Handlers read this reference once per request; a reload
+# builds a new bundle and replaces the reference in a single assignment.
+model_bundle = None
+model_loaded = False
+shadow_bundle = None
 
-def load_model():
-    """Load the ML model and return success status."""
-    global model_info, model, numerical_cols, categorical_cols, numerical_transformer, used_model_path
+# Only one load/reload runs at a time
+reload_lock = threading.Lock()
+reload_status = {
+    'reloads': 0,
+    'failures': 0,
+    'inProgress': False,
+    'lastReload': None
+}
+
+# Responses for repeated inputs, keyed on the model version plus the normalized form fields
+response_cache = LRUCache(RESPONSE_CACHE_SIZE)
+
+# Prometheus metrics served on /metrics
+metrics = MetricsRegistry()
+request_latency = metrics.histogram(
+    'student_api_request_duration_seconds', 'Request latency by endpoint.', ['endpoint'])
+stage_latency = metrics.histogram(
+    'student_api_stage_duration_seconds', 'Time spent in each prediction pipeline stage.', ['endpoint', 'stage'])
+request_count = metrics.counter(
+    'student_api_requests_total', 'Requests by endpoint, HTTP status and error type.', ['endpoint', 'status', 'error'])
+batch_item_errors = metrics.counter(
+    'student_api_batch_item_errors_total', 'Failed /api/predict/batch items by error type.', ['error'])
+model_latency = metrics.histogram(
+    'student_api_model_duration_seconds', 'Time to score a request\'s rows, for the primary and the shadow model.',
+    ['endpoint', 'model'])
+shadow_predictions = metrics.counter(
+    'student_api_shadow_predictions_total', 'Rows scored by both models, by whether their predicted classes agree.',
+    ['agreement'])
+shadow_probability_delta = metrics.histogram(
+    'student_api_shadow_probability_delta', 'Absolute difference between the shadow and primary pass probability '
+    '(0-1), by whether the shadow is higher or lower.', ['direction'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0))
+shadow_dropped = metrics.counter(
+    'student_api_shadow_dropped_total', 'Requests left out of the shadow comparison because its queue was full.',
+    ['endpoint'])
+micro_batch_flushes = metrics.counter(
+    'student_api_micro_batch_flushes_total', 'Micro-batches sent to the model, by whether they filled up or timed out.',
+    ['reason'])
+micro_batch_size = metrics.histogram(
+    'student_api_micro_batch_size', 'Rows per micro-batch.', [],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256))
+micro_batch_queue_wait = metrics.histogram(
+    'student_api_micro_batch_queue_wait_seconds',
+    'Time a row waited in the micro-batch queue before its batch was flushed.')
+cors_preflights = metrics.counter(
+    'student_api_cors_preflights_total', 'CORS preflights answered before routing, by whether the origin is allowed.',
+    ['allowed'])
+
+# Preflights are answered before Flask routes the request; actual responses get their CORS headers here too
+app.wsgi_app = CORSMiddleware(
+    app.wsgi_app,
+    CORS_ORIGINS,
+    allow_methods=['GET', 'POST', 'OPTIONS'],
+    allow_headers=CORS_ALLOW_HEADERS,
+    allow_credentials=CORS_ALLOW_CREDENTIALS,
+    max_age=CORS_MAX_AGE,
+    on_preflight=lambda allowed: cors_preflights.inc('true' if allowed else 'false')
+)
+
+def stage_observer(endpoint):
+    """Return an observe(stage, seconds) callback recording into stage_latency."""
+    return lambda stage, seconds: stage_latency.observe(seconds, endpoint, stage)
+
+observe_predict_stage = stage_observer('predict')
+observe_batch_stage = stage_observer('predict_batch')
+observe_micro_batch_stage = stage_observer('micro_batch')
+
+# Synthetic profiles used to warm up a freshly loaded model before it takes traffic
+WARMUP_PROFILES = [
+    {},
+    {'education': 'PhD', 'technicalSkills': 'Expert', 'interestScience': 9, 'interestBusiness': 7},
+    {'education': 'High School', 'creativity': 'Expert', 'interestArts': 9},
+    {'yearsExperience': -1}  # outside the prediction table, so the live path is exercised too
+]
+
+def build_model_bundle(phases=None, model_path=None):
+    """Load the model files and derive the encoder, engine and table; raise on failure.
     
-    try:
-        if os.path.exists(MODEL_PATH):
-            logger.info(f"Loading model from {MODEL_PATH}")
-            model_path = MODEL_PATH
-        elif os.path.exists(ALT_MODEL_PATH):
-            logger.info(f"Loading model from {ALT_MODEL_PATH}")
-            model_path = ALT_MODEL_PATH
+    If given, `phases` receives 'artifactLoadSeconds' and 'prepareSeconds' timings.
+    `model_path` (a pickle or a memory-mapped artifact directory) is loaded
+    instead of the MODEL_ARTIFACT_PATH/MODEL_PATH/ALT_MODEL_PATHS search.
+    """
+    start = time.perf_counter()
+    
+    # Prefer the memory-mapped artifact; fall back to the pickle if it is missing or invalid
+    model_info = None
+    if model_path is not None:
+        if is_artifact(model_path):
+            model_info = load_artifact(model_path)
+            logger.info(f"Loaded memory-mapped model artifact from {model_path}")
+        elif os.path.exists(model_path):
+            logger.info(f"Loading model from {model_path}")
         else:
-            logger.error("No model file found. Please train the model first.")
-            return False
-        
-        # Store which model path we used
-        used_model_path = model_path
+            raise FileNotFoundError(f"No model file found at {model_path}")
+    elif MODEL_ARTIFACT_PATH and is_artifact(MODEL_ARTIFACT_PATH):
+        try:
+            model_info = load_artifact(MODEL_ARTIFACT_PATH)
+            model_path = MODEL_ARTIFACT_PATH
+            logger.info(f"Loaded memory-mapped model artifact from {MODEL_ARTIFACT_PATH}")
+        except ValueError as e:
+            logger.warning(f"Ignoring model artifact {MODEL_ARTIFACT_PATH}: {str(e)}")
+    
+    if model_info is None:
+        if model_path is None:
+            model_path = next((path for path in [MODEL_PATH] + ALT_MODEL_PATHS if os.path.exists(path)), None)
+            if model_path is None:
+                raise FileNotFoundError("No model file found. Please train the model first.")
+            logger.info(f"Loading model from {model_path}")
         
-        # Load model
+        # Load model. joblib (and, through the pickle, pandas/sklearn/xgboost) is
+        # only imported on this path; memory-mapped artifacts need none of them.
+        import joblib
         model_info = joblib.load(model_path)
+    
+    artifact_loaded = time.perf_counter()
+    
+    # Extract components
+    model = model_info.get('model')
+    numerical_cols = model_info.get('numerical_cols')
+    categorical_cols = model_info.get('categorical_cols')
+    numerical_transformer = model_info.get('numerical_transformer')
+    
+    # Verify all components are loaded - Fix for pandas Index objects
+    missing_components = []
+    if model is None:
+        missing_components.append('model')
+    if numerical_cols is None or (hasattr(numerical_cols, 'empty') and numerical_cols.empty):
+        missing_components.append('numerical_cols')
+    if categorical_cols is None or (hasattr(categorical_cols, 'empty') and categorical_cols.empty):
+        missing_components.append('categorical_cols')
+    if numerical_transformer is None:
+        missing_components.append('numerical_transformer')
         
-        # Extract components
-        model = model_info.get('model')
-        numerical_cols = model_info.get('numerical_cols')
-        categorical_cols = model_info.get('categorical_cols')
-        numerical_transformer = model_info.get('numerical_transformer')
-        
-        # Verify all components are loaded - Fix for pandas Index objects
-        missing_components = []
-        if model is None:
-            missing_components.append('model')
-        if numerical_cols is None or (hasattr(numerical_cols, 'empty') and numerical_cols.empty):
-            missing_components.append('numerical_cols')
-        if categorical_cols is None or (hasattr(categorical_cols, 'empty') and categorical_cols.empty):
-            missing_components.append('categorical_cols')
-        if numerical_transformer is None:
-            missing_components.append('numerical_transformer')
-            
-        if missing_components:
-            logger.error(f"Model loaded but missing components: {missing_components}")
+    if missing_components:
+        raise ValueError(f"Model loaded but missing components: {missing_components}")
+    
+    # Precompute the column layout, one-hot slots and scaler stats once
+    feature_encoder = FeatureEncoder(
+        model.feature_names_in_,
+        numerical_cols,
+        categorical_cols,
+        numerical_transformer,
+        categories=STUDENT_FEATURES
+    )
+    
+    # Flatten the trees for single-pass inference unless the sklearn path is configured
+    inference_engine = None
+    if isinstance(model, FlatForest):
+        # Artifacts hold the flattened trees only, so there is no sklearn path
+        inference_engine = model
+        if INFERENCE_ENGINE != 'flat':
+            logger.warning("INFERENCE_ENGINE=sklearn is not available for memory-mapped artifacts")
+    elif INFERENCE_ENGINE == 'flat':
+        try:
+            inference_engine = FlatForest.from_model(model)
+            logger.info(f"Using flat inference engine ({inference_engine.n_trees} trees)")
+        except ValueError as e:
+            logger.warning(f"Flat inference unavailable, using sklearn: {str(e)}")
+    
+    # Large batches are scored by the estimator itself when there is one
+    flat_max_rows = None
+    if inference_engine is not None and inference_engine is not model:
+        if FLAT_ENGINE_MAX_ROWS is not None:
+            flat_max_rows = int(FLAT_ENGINE_MAX_ROWS) or None
+        else:
+            flat_max_rows = FLAT_ENGINE_CROSSOVER.get(type(model).__name__)
+    
+    # The file hash identifies the model version and the prediction table built for it
+    fingerprint = model_fingerprint(model_path)
+    
+    # Serve the mapped input domain from the precomputed table when one matches this model
+    prediction_table = None
+    if USE_PREDICTION_TABLE:
+        table_path = PREDICTION_TABLE_PATH or default_table_path(model_path)
+        try:
+            prediction_table = PredictionTable.load(table_path, fingerprint=fingerprint)
+            logger.info(f"Loaded prediction table with {prediction_table.size} rows from {table_path}")
+        except FileNotFoundError:
+            logger.info(f"No prediction table at {table_path}; using live inference")
+        except ValueError as e:
+            logger.warning(f"Ignoring prediction table {table_path}: {str(e)}")
+    
+    if phases is not None:
+        phases['artifactLoadSeconds'] = round(artifact_loaded - start, 4)
+        phases['prepareSeconds'] = round(time.perf_counter() - artifact_loaded, 4)
+    
+    return ModelBundle(
+        model=model,
+        numerical_cols=numerical_cols,
+        categorical_cols=categorical_cols,
+        numerical_transformer=numerical_transformer,
+        feature_encoder=feature_encoder,
+        inference_engine=inference_engine,
+        prediction_table=prediction_table,
+        model_path=model_path,
+        flat_max_rows=flat_max_rows,
+        version=fingerprint[:12],
+        load_seconds=time.perf_counter() - start
+    )
+
+def warm_up(bundle):
+    """Run the synthetic profiles through a bundle's full scoring path."""
+    for data in WARMUP_PROFILES:
+        form, student_data = map_form_data(data)
+        _, probabilities = bundle.predict_students([student_data])
+        recommend_careers(form, float(probabilities[0][1]) * 100)
+    # Explanations need the flat engine; artifacts that stored the contributions have nothing to build
+    if WARM_UP_EXPLANATIONS and bundle.inference_engine is not None:
+        bundle.explain_students([student_data])
+
+def load_model():
+    """Load the ML model, warm it up and make it the active bundle; return success status."""
+    global model_bundle, model_loaded
+    
+    with reload_lock:
+        reload_status['inProgress'] = True
+        start = time.perf_counter()
+        previous_version = model_bundle.version if model_bundle is not None else None
+        phases = {}
+        try:
+            bundle = build_model_bundle(phases)
+            warmup_start = time.perf_counter()
+            warm_up(bundle)
+            warmup_seconds = time.perf_counter() - warmup_start
+        except Exception as e:
+            logger.error(f"Error loading model: {str(e)}")
+            traceback.print_exc()
+            reload_status['failures'] += 1
+            reload_status['lastReload'] = {
+                'status': 'failed',
+                'error': str(e),
+                'durationSeconds': round(time.perf_counter() - start, 4)
+            }
             return False
-            
-        logger.info(f"Model loaded successfully: {type(model).__name__}")
-        logger.info(f"Model features: {model.feature_names_in_}")
-        return True
+        finally:
+            reload_status['inProgress'] = False
+        
+        # Atomic swap: requests that already hold the previous bundle finish on it
+        model_bundle = bundle
+        model_loaded = True
         
+        # Cached responses belong to the previous model
+        response_cache.clear()
+        
+        duration = time.perf_counter() - start
+        reload_status['reloads'] += 1
+        reload_status['lastReload'] = {
+            'status': 'ok',
+            'version': bundle.version,
+            'previousVersion': previous_version,
+            'durationSeconds': round(duration, 4),
+            **phases,
+            'warmupSeconds': round(warmup_seconds, 4)
+        }
+        logger.info(f"Model loaded successfully: {bundle.model_type} (version {bundle.version}, {duration:.2f}s)")
+        logger.info(f"Model features: {bundle.model.feature_names_in_}")
+        if SHADOW_MODEL_PATH:
+            load_shadow_model()
+        return True
+
+def load_shadow_model():
+    """Load SHADOW_MODEL_PATH as the shadow bundle; on failure keep the previous one and return False."""
+    global shadow_bundle
+    try:
+        bundle = build_model_bundle(model_path=SHADOW_MODEL_PATH)
+        warm_up(bundle)
     except Exception as e:
-        logger.error(f"Error loading model: {str(e)}")
-        traceback.print_exc()
+        logger.error(f"Error loading shadow model {SHADOW_MODEL_PATH}: {str(e)}")
         return False
+    shadow_bundle = bundle
+    logger.info(f"Shadow model loaded: {bundle.model_type} (version {bundle.version}) from {SHADOW_MODEL_PATH}")
+    return True
+
+def model_watch_paths():
+    """Files whose change triggers a reload when MODEL_WATCH_INTERVAL is set."""
+    paths = [MODEL_PATH] + ALT_MODEL_PATHS
+    if MODEL_ARTIFACT_PATH:
+        paths.append(os.path.join(MODEL_ARTIFACT_PATH, 'manifest.json'))
+    if SHADOW_MODEL_PATH:
+        paths.append(os.path.join(SHADOW_MODEL_PATH, 'manifest.json') if is_artifact(SHADOW_MODEL_PATH)
+                     else SHADOW_MODEL_PATH)
+    return paths
+
+# Reload automatically when the model files change (started on the first request,
+# so that every pre-forked worker runs its own watcher)
+model_watcher = ModelFileWatcher(model_watch_paths, load_model, MODEL_WATCH_INTERVAL) \
+    if MODEL_WATCH_INTERVAL > 0 else None
+
+@app.before_request
+def start_model_watcher():
+    if model_watcher is not None:
+        model_watcher.start()
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def record_request_metrics(response):
+    endpoint = request.endpoint or 'unknown'
+    error = ''
+    if response.status_code >= 400 and response.is_json:
+        body = response.get_json(silent=True)
+        if isinstance(body, dict):
+            error = body.get('error', '')
+    request_count.inc(endpoint, str(response.status_code), error)
+    if 'request_start' in g:
+        request_latency.observe(time.perf_counter() - g.request_start, endpoint)
+    return response
+
+def _score_micro_batch(items):
+    """Score a coalesced batch of (bundle, student) items and split it back per caller."""
+    results = [None] * len(items)
+    # A reload can land mid-batch, so rows are scored by the bundle their request started with
+    by_bundle = {}
+    for index, (bundle, student_data) in enumerate(items):
+        by_bundle.setdefault(id(bundle), (bundle, []))[1].append(index)
+    for bundle, indices in by_bundle.values():
+        predictions, probabilities = bundle.predict_students(
+            [items[index][1] for index in indices], observe=observe_micro_batch_stage)
+        for index, prediction, row_probabilities in zip(indices, predictions, probabilities):
+            results[index] = (prediction, row_probabilities)
+    return results
+
+def observe_micro_batch_flush(reason, size, queue_waits):
+    """Record one micro-batch flush on /metrics."""
+    micro_batch_flushes.inc(reason)
+    micro_batch_size.observe(size)
+    for seconds in queue_waits:
+        micro_batch_queue_wait.observe(seconds)
+
+# Dispatcher for MICRO_BATCHING; None when single rows go straight to the model
+micro_batcher = MicroBatcher(
+    _score_micro_batch,
+    max_batch_size=MICRO_BATCH_MAX_SIZE,
+    max_wait=MICRO_BATCH_MAX_WAIT_MS / 1000,
+    on_flush=observe_micro_batch_flush
+) if MICRO_BATCHING else None
+
+# Agreement totals for /api/stats; only the shadow scorer thread writes them
+shadow_summary = {'rows': 0, 'agreements': 0, 'absDeltaSum': 0.0, 'maxAbsDelta': 0.0}
+
+def _score_shadow(item):
+    """Score one request's rows with the shadow model and compare them with the primary's results."""
+    endpoint, students, primary_predictions, primary_probabilities = item
+    bundle = shadow_bundle
+    if bundle is None:
+        return
+    start = time.perf_counter()
+    predictions, probabilities = bundle.predict_students(students)
+    model_latency.observe(time.perf_counter() - start, endpoint, 'shadow')
+    for primary_prediction, prediction, primary_row, row in zip(
+            primary_predictions, predictions, primary_probabilities, probabilities):
+        agree = primary_prediction == prediction
+        shadow_predictions.inc('agree' if agree else 'disagree')
+        delta = float(row[1]) - float(primary_row[1])
+        shadow_probability_delta.observe(abs(delta), 'higher' if delta > 0 else 'lower' if delta < 0 else 'equal')
+        shadow_summary['rows'] += 1
+        shadow_summary['agreements'] += int(agree)
+        shadow_summary['absDeltaSum'] += abs(delta)
+        shadow_summary['maxAbsDelta'] = max(shadow_summary['maxAbsDelta'], abs(delta))
+
+# Background scorer for SHADOW_MODEL_PATH; None when no shadow model is configured
+shadow_scorer = ShadowScorer(_score_shadow, max_queue_size=SHADOW_QUEUE_SIZE) if SHADOW_MODEL_PATH else None
+
+def submit_shadow(endpoint, students, predictions, probabilities):
+    """Hand a request's rows and the primary's results to the shadow scorer without waiting."""
+    if shadow_scorer is not None and shadow_bundle is not None:
+        if not shadow_scorer.submit((endpoint, students, predictions, probabilities)):
+            shadow_dropped.inc(endpoint)
+
+def map_form_data(data):
+    """Extract the form fields and map them onto a student performance data point."""
+    # Extract key features from form data
+    form = {
+        'education_level': data.get('education', 'Bachelor'),
+        'tech_skills': data.get('technicalSkills', 'Intermediate'),
+        'analytical': data.get('analyticalThinking', 'Intermediate'),
+        'comm_skills': data.get('communicationSkills', 'Intermediate'),
+        'creativity': data.get('creativity', 'Intermediate'),
+        'leadership': data.get('leadership', 'Intermediate'),
+        'years_exp': int(data.get('yearsExperience', 0)),
+        'interest_science': int(data.get('interestScience', 5)),
+        'interest_arts': int(data.get('interestArts', 5)),
+        'interest_business': int(data.get('interestBusiness', 5))
+    }
+    education_level = form['education_level']
+    tech_skills = form['tech_skills']
+    comm_skills = form['comm_skills']
+    years_exp = form['years_exp']
+    interest_science = form['interest_science']
+    interest_arts = form['interest_arts']
+    
+    # Create student data point mapped from form data
+    student_data = {
+        'school': 'GP',  # Default value
+        'sex': 'M',      # Default value
+        'age': min(max(15, 15 + years_exp), 22),  # Map experience to age within dataset range
+        'address': 'U',  # Default value
+        'famsize': 'GT3', # Default value
+        'Pstatus': 'T',  # Default value
+        'Medu': EDUCATION_MAP.get(education_level, 2),  # Map education level
+        'Fedu': EDUCATION_MAP.get(education_level, 2),  # Map education level
+        'Mjob': 'other', # Default value
+        'Fjob': 'other', # Default value
+        'reason': 'course', # Default value
+        'guardian': 'mother', # Default value
+        'traveltime': 1,  # Default value
+        'studytime': max(1, min(4, SKILL_MAP.get(tech_skills, 2))),  # Map technical skills
+        'failures': 0,   # Assume no failures
+        'schoolsup': 'yes' if SKILL_MAP.get(tech_skills, 2) > 2 else 'no',
+        'famsup': 'yes',  # Default value
+        'paid': 'no',     # Default value
+        'activities': 'yes' if interest_arts > 5 else 'no',
+        'nursery': 'yes', # Default value
+        'higher': 'yes',  # Default value
+        'internet': 'yes', # Default value
+        'romantic': 'no',  # Default value
+        'famrel': max(1, min(5, SKILL_MAP.get(comm_skills, 3))),  # Map communication skills
+        'freetime': max(1, min(5, int((10 - interest_science)/2))),
+        'goout': max(1, min(5, int(interest_arts/2))),
+        'Dalc': 1,        # Default value
+        'Walc': 1,        # Default value
+        'health': 5,      # Default value
+        'absences': min(int(years_exp * 2), 30)  # Map experience to absences
+    }
+    return form, student_data
+
+def cache_key(form):
+    """Normalized response cache key: the form fields that affect the result."""
+    # 'leadership' and the personality fields are never used for scoring
+    return (
+        form['education_level'],
+        form['tech_skills'],
+        form['analytical'],
+        form['comm_skills'],
+        form['creativity'],
+        form['years_exp'],
+        form['interest_science'],
+        form['interest_arts'],
+        form['interest_business']
+    )
+
+def recommend_careers(form, pass_probability):
+    """Score careers from the form inputs and pass probability and return the top 3."""
+    return career_scorer.recommend(form, pass_probability)
+
+def recommend_careers_many(forms, pass_probabilities):
+    """recommend_careers for many profiles, scored together."""
+    return career_scorer.recommend_many(forms, pass_probabilities)
+
+def prediction_result(data, recommendations, pass_probability, bundle):
+    """Build the JSON body returned for one scored profile."""
+    # Generate a unique request ID
+    unique_id = f"{hash(str(data) + str(np.random.random()))}"[:8]
+    
+    return {
+        'primaryPrediction': recommendations[0]['career'],
+        'recommendations': recommendations,
+        'requestId': unique_id,
+        'modelDetails': {
+            'modelType': bundle.model_type,
+            'modelPath': os.path.basename(bundle.model_path),
+            'modelVersion': bundle.version,
+            'studentPerformanceScore': pass_probability
+        }
+    }
+
+def item_error(index, error, details):
+    """Error dict for one profile; batch items carry their index."""
+    result = {'error': error, 'details': details}
+    return result if index is None else {'index': index, **result}
+
+def recommend_profiles(bundle, items, pass_probabilities):
+    """Result dicts for scored (index, form, data) items, shared by every prediction path.
+
+    Each entry is prediction_result() (plus 'index' unless it is None) or an
+    item_error(). All items are scored together; if that fails they are retried
+    one at a time so only the bad ones fail.
+    """
+    try:
+        all_recommendations = recommend_careers_many([item[1] for item in items], pass_probabilities)
+    except Exception:
+        all_recommendations = [None] * len(items)
+    results = []
+    for (index, form, data), pass_probability, recommendations in zip(items, pass_probabilities, all_recommendations):
+        if recommendations is None:
+            try:
+                recommendations = recommend_careers(form, pass_probability)
+            except Exception as e:
+                results.append(item_error(index, 'Recommendation error', str(e)))
+                continue
+        result = prediction_result(data, recommendations, pass_probability, bundle)
+        results.append(result if index is None else {'index': index, **result})
+    return results
+
+def score_profiles(bundle, profiles, observe=None, endpoint=None):
+    """Map, score and recommend a list of form payloads, as /api/predict/batch does.
+
+    Returns (results, students, predictions, probabilities): a result or error
+    dict per profile, and the mapped student dicts with the primary model's
+    output for the rows that were scored. Mapping, model and recommendation
+    failures are reported per item. `observe(stage, seconds)` gets the 'map',
+    model and 'recommend' stage timings; with `endpoint`, the model call is
+    also recorded for the shadow comparison.
+    """
+    start = time.perf_counter()
+    results = [None] * len(profiles)
+    mapped = []
+    students = []
+    for index, data in enumerate(profiles):
+        if not isinstance(data, dict) or not data:
+            results[index] = item_error(index, 'No data received', 'Each item must be a non-empty JSON object')
+            continue
+        try:
+            form, student_data = map_form_data(data)
+        except Exception as e:
+            results[index] = item_error(index, 'Data processing error', str(e))
+            continue
+        mapped.append((index, form, data))
+        students.append(student_data)
+    if observe is not None:
+        observe('map', time.perf_counter() - start)
+    if not mapped:
+        return results, [], None, None
+
+    # Encode all rows that miss the prediction table into one matrix and call the model once
+    try:
+        start = time.perf_counter()
+        predictions, probabilities = bundle.predict_students(students, observe=observe)
+        if endpoint is not None and shadow_scorer is not None:
+            model_latency.observe(time.perf_counter() - start, endpoint, 'primary')
+    except Exception as e:
+        logger.error(f"Error scoring {len(students)} profiles: {str(e)}")
+        for index, _, _ in mapped:
+            results[index] = item_error(index, 'Prediction error', str(e))
+        return results, [], None, None
+
+    start = time.perf_counter()
+    pass_probabilities = [float(row_probabilities[1]) * 100 for row_probabilities in probabilities]
+    for (index, _, _), result in zip(mapped, recommend_profiles(bundle, mapped, pass_probabilities)):
+        results[index] = result
+    if observe is not None:
+        observe('recommend', time.perf_counter() - start)
+    return results, students, predictions, probabilities
+
+def batch_body(results):
+    """The /api/predict/batch response body; counts failed items on /metrics."""
+    failed = 0
+    for result in results:
+        if 'error' in result:
+            failed += 1
+            batch_item_errors.inc(result['error'])
+    logger.debug("Scored batch of %d profiles (%d failed)", len(results), failed)
+    return {'results': results, 'count': len(results), 'failed': failed}
+
+def explain_requested():
+    """Whether the request opted into explanations with ?explain=true (or 1/yes)."""
+    return request.args.get('explain', '').lower() in ('1', 'true', 'yes')
+
+def explanation_result(bundle, student_data, pass_probability):
+    """Per-field contributions (percentage points) to a profile's studentPerformanceScore.
+
+    Saabas contributions from the loaded forest, summed from the one-hot
+    columns back to the STUDENT_FEATURES fields and ordered by absolute size;
+    raises ValueError if the model can't be explained (sklearn inference path).
+    """
+    _, base_value, contributions = bundle.explain_students([student_data])
+    base_value = float(base_value) * 100
+    contributions = contributions[0] * 100
+    total = base_value + float(contributions.sum())
+    # Contributions must add up to the score that is returned (live or from the prediction table)
+    matches = abs(total - pass_probability) <= EXPLANATION_TOLERANCE
+    if not matches:
+        logger.warning(f"Explanation sums to {total} but the score is {pass_probability} (model {bundle.version})")
+    fields = bundle.feature_encoder.fields
+    order = np.argsort(-np.abs(contributions), kind='stable')
+    return {
+        'method': 'saabas',
+        'baseValue': round(base_value, 4),
+        'contributions': [{'feature': fields[i], 'contribution': round(float(contributions[i]), 4)}
+                          for i in order],
+        'sumCheck': {
+            'total': round(total, 4),
+            'studentPerformanceScore': pass_probability,
+            'matches': bool(matches)
+        }
+    }
+
+# Time spent in each startup phase, reported by /readyz and /api/stats
+startup_report = {
+    'importSeconds': round(time.perf_counter() - _import_start, 4),
+    'ready': False
+}
+
+def startup_load():
+    """Initial model load; records the startup phase timings."""
+    start = time.perf_counter()
+    loaded = load_model()
+    last = reload_status['lastReload'] or {}
+    startup_report.update({
+        'artifactLoadSeconds': last.get('artifactLoadSeconds'),
+        'prepareSeconds': last.get('prepareSeconds'),
+        'warmupSeconds': last.get('warmupSeconds'),
+        'modelLoadSeconds': round(time.perf_counter() - start, 4),
+        'totalSeconds': round(time.perf_counter() - _import_start, 4),
+        'ready': loaded
+    })
+    logger.info(f"Startup report: {startup_report}")
+    if not loaded:
+        logger.warning("Starting without a model. Predictions won't work until a model is loaded.")
 
 # Load the model at startup
-model_loaded = load_model()
-if not model_loaded:
-    logger.warning("Starting without a model. Predictions won't work until a model is loaded.")
+if BACKGROUND_MODEL_LOAD:
+    threading.Thread(target=startup_load, name='model-startup', daemon=True).start()
+else:
+    startup_load()
 
 @app.route('/')
 def index():
     return app.send_static_file('index.html')
 
-@app.route('/api/predict', methods=['POST', 'OPTIONS'])
+@app.route('/api/predict', methods=['POST'])
 def predict():
-    # Handle preflight OPTIONS request
-    if request.method == 'OPTIONS':
-        logger.debug("Received OPTIONS request. Responding with CORS headers.")
-        response = jsonify({'status': 'ok'})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Accept, Origin')
-        response.headers.add('Access-Control-Allow-Methods', 'GET, POST, OPTIONS')
-        return response, 200
-        
     try:
+        # Use one model bundle for the whole request, even if a reload swaps it meanwhile
+        bundle = model_bundle
+        
         # Check if model is loaded
-        if not model_loaded or model is None:
+        if bundle is None:
             logger.error("Model is not loaded. Cannot make predictions.")
             return jsonify({
                 'error': 'Model not loaded',
@@ -172,7 +807,6 @@ def predict():
             }), 500
         
         # Get data from request
-        logger.debug(f"Request headers: {request.headers}")
         if not request.is_json:
             logger.error("Request does not contain JSON data")
             return jsonify({
@@ -180,8 +814,14 @@ def predict():
                 'details': 'Content-Type must be application/json'
             }), 400
             
+        start = time.perf_counter()
         data = request.json
-        logger.debug(f"Received data: {data}")
+        explain = explain_requested()
+        observe_predict_stage('parse', time.perf_counter() - start)
+        log_payload = payload_sampler.sample()
+        if log_payload:
+            payload_logger.info(f"Request headers: {dict(request.headers)}")
+            payload_logger.info(f"Received data: {data}")
         
         if not data:
             logger.error("No JSON data received in the request")
@@ -193,125 +833,47 @@ def predict():
         # Map form data to student model features
         # We need to transform the career prediction form data to match the student performance dataset
         try:
-            # Extract key features from form data
-            education_level = data.get('education', 'Bachelor')
-            tech_skills = data.get('technicalSkills', 'Intermediate') 
-            analytical = data.get('analyticalThinking', 'Intermediate')
-            comm_skills = data.get('communicationSkills', 'Intermediate')
-            creativity = data.get('creativity', 'Intermediate')
-            leadership = data.get('leadership', 'Intermediate')
-            years_exp = int(data.get('yearsExperience', 0))
-            interest_science = int(data.get('interestScience', 5))
-            interest_arts = int(data.get('interestArts', 5))
-            interest_business = int(data.get('interestBusiness', 5))
-            
-            # Map education level to Medu/Fedu
-            education_map = {
-                'High School': 1,
-                'Bachelor': 2,
-                'Master': 3,
-                'PhD': 4
-            }
-            
-            # Map skill levels to numeric values
-            skill_map = {
-                'Beginner': 1,
-                'Intermediate': 2,
-                'Advanced': 3,
-                'Expert': 4
-            }
-            
-            # Create student data point mapped from form data
-            student_data = {
-                'school': 'GP',  # Default value
-                'sex': 'M',      # Default value
-                'age': min(max(15, 15 + years_exp), 22),  # Map experience to age within dataset range
-                'address': 'U',  # Default value
-                'famsize': 'GT3', # Default value
-                'Pstatus': 'T',  # Default value
-                'Medu': education_map.get(education_level, 2),  # Map education level
-                'Fedu': education_map.get(education_level, 2),  # Map education level
-                'Mjob': 'other', # Default value
-                'Fjob': 'other', # Default value
-                'reason': 'course', # Default value
-                'guardian': 'mother', # Default value
-                'traveltime': 1,  # Default value
-                'studytime': max(1, min(4, skill_map.get(tech_skills, 2))),  # Map technical skills
-                'failures': 0,   # Assume no failures
-                'schoolsup': 'yes' if skill_map.get(tech_skills, 2) > 2 else 'no',
-                'famsup': 'yes',  # Default value
-                'paid': 'no',     # Default value
-                'activities': 'yes' if interest_arts > 5 else 'no',
-                'nursery': 'yes', # Default value
-                'higher': 'yes',  # Default value
-                'internet': 'yes', # Default value
-                'romantic': 'no',  # Default value
-                'famrel': max(1, min(5, skill_map.get(comm_skills, 3))),  # Map communication skills
-                'freetime': max(1, min(5, int((10 - interest_science)/2))),
-                'goout': max(1, min(5, int(interest_arts/2))),
-                'Dalc': 1,        # Default value
-                'Walc': 1,        # Default value
-                'health': 5,      # Default value
-                'absences': min(int(years_exp * 2), 30)  # Map experience to absences
-            }
-            
-            logger.debug(f"Mapped student data: {student_data}")
-            
-            # Convert to DataFrame
-            student_df = pd.DataFrame([student_data])
-            
-            # Process numerical features
-            student_num = student_df[numerical_cols].copy()
-            student_num_scaled = numerical_transformer.transform(student_num)
-            student_num_scaled = pd.DataFrame(student_num_scaled, columns=numerical_cols)
-            
-            # Process categorical features
-            student_cat = pd.get_dummies(student_df[categorical_cols])
-            
-            # Align student_cat columns with the model's expected columns from training
-            # This handles the case where one-hot encoded columns don't match exactly
-            expected_cat_cols = [col for col in model.feature_names_in_ if col not in numerical_cols]
-            
-            # Check if we need to manually create the expected columns
-            missing_cols = set(expected_cat_cols) - set(student_cat.columns)
-            if missing_cols:
-                logger.debug(f"Adding missing one-hot encoded columns: {missing_cols}")
-                for col in missing_cols:
-                    student_cat[col] = 0
+            start = time.perf_counter()
+            form, student_data = map_form_data(data)
+            observe_predict_stage('map', time.perf_counter() - start)
             
-            # Keep only the columns that the model expects
-            student_cat = student_cat.reindex(columns=expected_cat_cols, fill_value=0)
+            if log_payload:
+                payload_logger.info(f"Mapped student data: {student_data}")
             
-            # Combine features
-            student_processed = pd.concat([student_num_scaled, student_cat], axis=1)
+            # Repeated inputs are answered from the response cache
+            start = time.perf_counter()
+            key = (bundle.version,) + cache_key(form)
+            cached = response_cache.get(key)
+            observe_predict_stage('cache', time.perf_counter() - start)
+            if cached is not None:
+                recommendations, pass_probability, probabilities = cached
+                result = prediction_result(data, recommendations, pass_probability, bundle)
+                response = explained_response(result, bundle, student_data, pass_probability) if explain \
+                    else jsonify(result)
+                # Cache hits are shadow-scored too, or the comparison would only see first-time inputs;
+                # the cached probabilities are the primary's result
+                submit_shadow('predict', [student_data], bundle.model.classes_.take([np.argmax(probabilities)]),
+                              [probabilities])
+                return response
             
-            # Ensure columns are aligned with what the model expects
-            missing_features = set(model.feature_names_in_) - set(student_processed.columns)
-            extra_features = set(student_processed.columns) - set(model.feature_names_in_)
-            
-            if missing_features:
-                logger.error(f"Missing required features: {missing_features}")
-                return jsonify({
-                    'error': 'Missing features',
-                    'details': f'The model requires features that are missing: {missing_features}'
-                }), 500
-                
-            if extra_features:
-                logger.warning(f"Extra features detected: {extra_features}")
-                student_processed = student_processed.drop(columns=extra_features)
-            
-            # Ensure columns are in the right order
-            student_processed = student_processed[model.feature_names_in_]
-            
-            # Log the final processed data
-            logger.debug(f"Final processed features: {student_processed.columns.tolist()}")
-            
-            # Make prediction
-            prediction = model.predict(student_processed)[0]
-            probabilities = model.predict_proba(student_processed)[0]
+            # Make prediction (table lookup, or encode + score live)
+            if micro_batcher is not None:
+                start = time.perf_counter()
+                prediction, probabilities = micro_batcher.submit((bundle, student_data))
+                # Queue wait plus the shared batch; its own stages are under endpoint="micro_batch"
+                observe_predict_stage('micro_batch', time.perf_counter() - start)
+                if shadow_scorer is not None:
+                    model_latency.observe(time.perf_counter() - start, 'predict', 'primary')
+            else:
+                start = time.perf_counter()
+                predictions, probabilities = bundle.predict_students([student_data], observe=observe_predict_stage)
+                if shadow_scorer is not None:
+                    model_latency.observe(time.perf_counter() - start, 'predict', 'primary')
+                prediction = predictions[0]
+                probabilities = probabilities[0]
             pass_probability = float(probabilities[1]) * 100  # Probability of passing
             
-            logger.info(f"Prediction: {prediction}, Pass probability: {pass_probability:.2f}%")
+            logger.debug("Prediction: %s, Pass probability: %.2f%%", prediction, pass_probability)
             
         except Exception as e:
             logger.error(f"Error processing data: {str(e)}")
@@ -323,115 +885,26 @@ def predict():
         
         # Map student performance prediction to career recommendations
         # Based on the ML model prediction and form input
-        try:
-            # Instead of hardcoded recommendations, use the model prediction and form inputs
-            # to determine suitable careers
-            
-            # Determine potential career paths based on skills and interests
-            potential_careers = []
-            
-            # Data Science/Tech careers
-            if tech_skills in ['Advanced', 'Expert'] and interest_science >= 7:
-                potential_careers.append({
-                    'career': 'Data Scientist',
-                    'score': interest_science * 0.6 + skill_map.get(analytical, 2) * 10 + pass_probability * 0.3
-                })
-                potential_careers.append({
-                    'career': 'Software Engineer',
-                    'score': interest_science * 0.5 + skill_map.get(tech_skills, 2) * 10 + pass_probability * 0.3
-                })
-            
-            # Business careers
-            if interest_business >= 6:
-                potential_careers.append({
-                    'career': 'Financial Analyst',
-                    'score': interest_business * 0.6 + skill_map.get(analytical, 2) * 10 + pass_probability * 0.2
-                })
-                potential_careers.append({
-                    'career': 'Marketing Specialist',
-                    'score': interest_business * 0.5 + skill_map.get(comm_skills, 2) * 10 + skill_map.get(creativity, 2) * 5
-                })
-            
-            # Creative careers
-            if interest_arts >= 7 and creativity in ['Advanced', 'Expert']:
-                potential_careers.append({
-                    'career': 'Graphic Designer',
-                    'score': interest_arts * 0.7 + skill_map.get(creativity, 2) * 15
-                })
-            
-            # Healthcare/education
-            if education_level in ['Master', 'PhD'] and interest_science >= 6:
-                potential_careers.append({
-                    'career': 'Doctor',
-                    'score': interest_science * 0.6 + pass_probability * 0.4 + education_map.get(education_level, 2) * 5
-                })
-                potential_careers.append({
-                    'career': 'Teacher',
-                    'score': interest_arts * 0.3 + interest_science * 0.3 + skill_map.get(comm_skills, 2) * 10
-                })
-            
-            # If we don't have enough careers yet, add some based on the ML model prediction
-            if len(potential_careers) < 3:
-                # Add all careers that weren't already added
-                for career in CAREERS:
-                    if not any(pc['career'] == career for pc in potential_careers):
-                        # Base score on prediction and randomization
-                        base_score = pass_probability
-                        # Add some randomness but keep it consistent for the same inputs
-                        random_factor = hash(career + str(data)) % 20  # 0-19 random factor
-                        score = base_score + random_factor
-                        potential_careers.append({
-                            'career': career,
-                            'score': score
-                        })
-            
-            # Sort careers by score and select top 3
-            potential_careers.sort(key=lambda x: x['score'], reverse=True)
-            top_careers = potential_careers[:3]
-            
-            # Calculate probabilities based on scores
-            total_score = sum(career['score'] for career in top_careers)
-            if total_score > 0:
-                for career in top_careers:
-                    # Convert score to probability percentage
-                    career['probability'] = round((career['score'] / total_score) * 100, 1)
-                    # Ensure probability is within reasonable range (30-95%)
-                    career['probability'] = max(30, min(95, career['probability']))
-            else:
-                # Fallback probabilities if scores are all zero
-                for i, career in enumerate(top_careers):
-                    career['probability'] = 90 - (i * 20)
-            
-            # Format recommendations
-            recommendations = [
-                {'career': career['career'], 'probability': career['probability']}
-                for career in top_careers
-            ]
-            
-            primary_prediction = recommendations[0]['career']
-            logger.info(f"Top career recommendation: {primary_prediction}")
-            
-        except Exception as e:
-            logger.error(f"Error generating career recommendations: {str(e)}")
-            return jsonify({
-                'error': 'Recommendation error',
-                'details': str(e)
-            }), 500
-        
-        # Generate a unique request ID
-        unique_id = f"{hash(str(data) + str(np.random.random()))}"[:8]
+        start = time.perf_counter()
+        result, = recommend_profiles(bundle, [(None, form, data)], [pass_probability])
+        observe_predict_stage('recommend', time.perf_counter() - start)
+        if 'error' in result:
+            logger.error(f"Error generating career recommendations: {result['details']}")
+            return jsonify(result), 500
+        logger.debug("Top career recommendation: %s", result['primaryPrediction'])
+        response_cache.put(key, (result['recommendations'], pass_probability, probabilities))
         
         # Return the result
-        return jsonify({
-            'primaryPrediction': primary_prediction,
-            'recommendations': recommendations,
-            'requestId': unique_id,
-            'modelDetails': {
-                'modelType': type(model).__name__,
-                'modelPath': os.path.basename(used_model_path),
-                'studentPerformanceScore': pass_probability
-            }
-        })
+        if explain:
+            response = explained_response(result, bundle, student_data, pass_probability)
+            submit_shadow('predict', [student_data], [prediction], [probabilities])
+            return response
+        start = time.perf_counter()
+        response = jsonify(result)
+        observe_predict_stage('serialize', time.perf_counter() - start)
+        # Once the response is ready, so the comparison stays off the request's critical path
+        submit_shadow('predict', [student_data], [prediction], [probabilities])
+        return response
                 
     except Exception as e:
         print(f"Error in prediction: {e}")
@@ -440,31 +913,237 @@ def predict():
             'details': str(e)
         }), 500
 
-@app.route('/api/options', methods=['GET', 'OPTIONS'])
-def options():
-    # Handle preflight OPTIONS request
-    if request.method == 'OPTIONS':
-        logger.debug("Received OPTIONS request for /api/options. Responding with CORS headers.")
-        response = jsonify({'status': 'ok'})
-        response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Accept, Origin')
-        response.headers.add('Access-Control-Allow-Methods', 'GET, OPTIONS')
-        return response, 200
+def explained_response(result, bundle, student_data, pass_probability):
+    """jsonify(result) with an 'explanation' added, or a 501 if the model can't be explained."""
+    start = time.perf_counter()
+    try:
+        result['explanation'] = explanation_result(bundle, student_data, pass_probability)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Explanation unavailable',
+            'details': str(e)
+        }), 501
+    observe_predict_stage('explain', time.perf_counter() - start)
+    return jsonify(result)
+
+@app.route('/api/predict/batch', methods=['POST'])
+def predict_batch():
+    """Score an array of form payloads with a single model call."""
+    try:
+        # Use one model bundle for the whole request, even if a reload swaps it meanwhile
+        bundle = model_bundle
+        
+        # Check if model is loaded
+        if bundle is None:
+            logger.error("Model is not loaded. Cannot make predictions.")
+            return jsonify({
+                'error': 'Model not loaded',
+                'details': 'The ML model is not loaded. Please train or load the model first.'
+            }), 500
+        
+        if not request.is_json:
+            logger.error("Request does not contain JSON data")
+            return jsonify({
+                'error': 'Not JSON data',
+                'details': 'Content-Type must be application/json'
+            }), 400
+        
+        # Accept either a bare array or {"profiles": [...]}
+        start = time.perf_counter()
+        payload = request.json
+        observe_batch_stage('parse', time.perf_counter() - start)
+        profiles = payload.get('profiles') if isinstance(payload, dict) else payload
+        if not isinstance(profiles, list) or not profiles:
+            logger.error("No profiles received in the batch request")
+            return jsonify({
+                'error': 'No data received',
+                'details': 'Request body must be a non-empty JSON array of form payloads'
+            }), 400
+        
+        if len(profiles) > MAX_BATCH_SIZE:
+            return jsonify({
+                'error': 'Batch too large',
+                'details': f'A batch may contain at most {MAX_BATCH_SIZE} profiles'
+            }), 413
+        
+        logger.debug("Received batch of %d profiles", len(profiles))
+        
+        # Failures are reported per item instead of failing the batch
+        results, students, predictions, probabilities = score_profiles(
+            bundle, profiles, observe=observe_batch_stage, endpoint='predict_batch')
+        
+        start = time.perf_counter()
+        response = jsonify(batch_body(results))
+        observe_batch_stage('serialize', time.perf_counter() - start)
+        if students:
+            submit_shadow('predict_batch', students, predictions, probabilities)
+        return response
     
-    logger.debug("Processing GET request for /api/options")
-    response = jsonify({
+    except Exception as e:
+        print(f"Error in batch prediction: {e}")
+        return jsonify({
+            'error': 'An unexpected error occurred',
+            'details': str(e)
+        }), 500
+
+def model_status():
+    """Active model version plus load/reload history."""
+    bundle = model_bundle
+    return {
+        'active': bundle.describe() if bundle is not None else None,
+        'reloads': reload_status['reloads'],
+        'failures': reload_status['failures'],
+        'inProgress': reload_status['inProgress'],
+        'lastReload': reload_status['lastReload'],
+        'watchIntervalSeconds': MODEL_WATCH_INTERVAL,
+        'shadow': shadow_bundle.describe() if shadow_bundle is not None else None
+    }
+
+def options_payload():
+    """Option lists for the React form."""
+    return {
         'educationLevels': EDUCATION_LEVELS,
         'skillLevels': SKILL_LEVELS,
         'careers': CAREERS
+    }
+
+# Serialized once; re-serialized only if the lists or the model status change
+options_response = CachedJSON(options_payload, max_age=OPTIONS_CACHE_MAX_AGE)
+model_status_response = CachedJSON(model_status)
+
+@app.route('/healthz', methods=['GET'])
+def healthz():
+    """Liveness: the process is up and serving HTTP, model or not."""
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness: a model is loaded and warmed up."""
+    bundle = model_bundle
+    body = {
+        'status': 'ready' if bundle is not None else 'loading',
+        'modelVersion': bundle.version if bundle is not None else None,
+        'startup': startup_report
+    }
+    return jsonify(body), 200 if bundle is not None else 503
+
+@app.route('/api/model', methods=['GET'])
+def active_model():
+    """Report the active model version and reload history (304 while unchanged)."""
+    return model_status_response.response(request)
+
+@app.route('/api/admin/reload', methods=['POST'])
+def admin_reload():
+    """Load the model files again and swap them in without dropping requests.
+    
+    Runs in the background and answers 202 unless called with ?wait=1.
+    """
+    if not ADMIN_TOKEN:
+        return jsonify({
+            'error': 'Admin endpoints disabled',
+            'details': 'Set ADMIN_TOKEN to enable /api/admin endpoints'
+        }), 403
+    if request.headers.get('X-Admin-Token') != ADMIN_TOKEN:
+        return jsonify({
+            'error': 'Unauthorized',
+            'details': 'A valid X-Admin-Token header is required'
+        }), 401
+    if reload_lock.locked():
+        return jsonify({
+            'error': 'Reload in progress',
+            'details': 'Another model reload is already running'
+        }), 409
+    
+    if request.args.get('wait') == '1':
+        if not load_model():
+            return jsonify({
+                'error': 'Reload failed',
+                'details': reload_status['lastReload']
+            }), 500
+        return jsonify(model_status())
+    
+    threading.Thread(target=load_model, name='model-reload', daemon=True).start()
+    return jsonify({'status': 'reloading'}), 202
+
+def shadow_stats():
+    """Shadow queue counters plus agreement and probability differences with the primary, or None."""
+    if shadow_scorer is None:
+        return None
+    summary = dict(shadow_summary)
+    rows = summary['rows']
+    return {
+        **shadow_scorer.stats(),
+        'rows': rows,
+        'agreementRate': round(summary['agreements'] / rows, 4) if rows else None,
+        'meanAbsProbabilityDelta': round(summary['absDeltaSum'] / rows, 6) if rows else None,
+        'maxAbsProbabilityDelta': round(summary['maxAbsDelta'], 6)
+    }
+
+@app.route('/api/stats', methods=['GET'])
+def stats():
+    """Runtime counters for sizing caches."""
+    return jsonify({
+        'model': model_status(),
+        'startup': startup_report,
+        'responseCache': response_cache.stats(),
+        'microBatcher': micro_batcher.stats() if micro_batcher is not None else None,
+        'shadow': shadow_stats(),
+        'logging': {'droppedRecords': dropped_records()}
     })
-    # Add CORS headers directly to this response
-    response.headers.add('Access-Control-Allow-Origin', '*')
-    response.headers.add('Access-Control-Allow-Headers', 'Content-Type, Accept, Origin')
-    return response
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage and model metrics (per process)."""
+    bundle = model_bundle
+    model_info = []
+    if bundle is not None:
+        model_info.append(({
+            'model_path': bundle.model_path,
+            'model_type': bundle.model_type,
+            'version': bundle.version,
+            'inference_engine': 'flat' if bundle.inference_engine is not None else 'sklearn'
+        }, 1))
+    cache_stats = response_cache.stats()
+    samples = [
+        ('student_api_model_loaded', 'gauge', 'Whether a model is loaded (1) or not (0).',
+         [({}, int(bundle is not None))]),
+        ('student_api_model_info', 'gauge', 'The loaded model; the value is always 1.', model_info),
+        ('student_api_model_load_seconds', 'gauge', 'Time taken to load and prepare the active model.',
+         [({}, bundle.load_seconds)] if bundle is not None else []),
+        ('student_api_model_reloads_total', 'counter', 'Successful model loads, including the initial one.',
+         [({}, reload_status['reloads'])]),
+        ('student_api_model_reload_failures_total', 'counter', 'Failed model loads.',
+         [({}, reload_status['failures'])]),
+        ('student_api_response_cache_hits_total', 'counter', 'Response cache hits.',
+         [({}, cache_stats['hits'])]),
+        ('student_api_response_cache_misses_total', 'counter', 'Response cache misses.',
+         [({}, cache_stats['misses'])]),
+        ('student_api_response_cache_evictions_total', 'counter',
+         'Least recently used entries evicted from the response cache.', [({}, cache_stats['evictions'])]),
+        ('student_api_response_cache_entries', 'gauge', 'Entries in the response cache.',
+         [({}, cache_stats['size'])]),
+        ('student_api_log_records_dropped_total', 'counter', 'Log records dropped because the log queue was full.',
+         [({}, dropped_records())])
+    ]
+    shadow = shadow_bundle
+    if shadow_scorer is not None:
+        samples.append(('student_api_shadow_model_info', 'gauge', 'The loaded shadow model; the value is always 1.',
+                        [({'model_path': shadow.model_path, 'model_type': shadow.model_type,
+                           'version': shadow.version}, 1)] if shadow is not None else []))
+        samples.append(('student_api_shadow_queue_depth', 'gauge', 'Requests waiting for the shadow model.',
+                        [({}, shadow_scorer.stats()['queueDepth'])]))
+    return Response(metrics.render(samples), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/options', methods=['GET'])
+def options():
+    """Option lists for the form, from the pre-serialized response."""
+    return options_response.response(request)
 
 if __name__ == '__main__':
     logger.info("Starting the Flask server...")
-    logger.info(f"Model path: {MODEL_PATH if os.path.exists(MODEL_PATH) else ALT_MODEL_PATH if os.path.exists(ALT_MODEL_PATH) else 'No model found'}")
+    logger.info(f"Model path: {next((path for path in [MODEL_PATH] + ALT_MODEL_PATHS if os.path.exists(path)), 'No model found')}")
     
-    # Allow connections from any IP and use port 5001 instead of 5000 (which conflicts with AirPlay on macOS)
-    app.run(debug=True, host='127.0.0.1', port=5001)
\ No newline at end of file
+    # Development server only; use `gunicorn -c gunicorn.conf.py` in production.
+    # Use port 5001 instead of 5000 (which conflicts with AirPlay on macOS)
+    debug = os.environ.get('FLASK_DEBUG', '1') == '1'
+    app.run(debug=debug, host=os.environ.get('HOST', '127.0.0.1'), port=int(os.environ.get('PORT', 5001)))
\ No newline at end of file
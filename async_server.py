@@ -0,0 +1,544 @@
+#!/usr/bin/env python3
+"""
+Asyncio serving mode with process-pool inference.
+
+Same HTTP API as app.py, on a different serving model. One event loop
+accepts connections, parses and validates requests, checks the response
+cache, builds single-profile recommendations and writes the responses. The
+CPU-bound part runs in a pool of worker processes: feature encoding and the
+model call (ModelBundle.predict_students) for /api/predict, and the whole of
+app.score_profiles (mapping, model call, recommendations) for
+/api/predict/batch. So a slow model call doesn't hold a thread, and
+throughput scales past the GIL. Result and error dicts come from the same
+app.py helpers as the Flask endpoints.
+
+The model is loaded once, in this process, before the workers start.
+Where fork is available the workers share it copy-on-write (like
+gunicorn's preload); elsewhere each worker loads it once at startup.
+Every route other than the two prediction endpoints (options, health,
+metrics, stats, static files and CORS preflights) is served by the Flask
+app itself, on a thread.
+
+    python async_server.py
+    ASYNC_WORKERS=4 ASYNC_QUEUE_DEPTH=64 ASYNC_REQUEST_TIMEOUT=5 python async_server.py
+
+Reloading the model needs a restart in this mode: /api/admin/* answers 501
+and MODEL_WATCH_INTERVAL is ignored. SHADOW_MODEL_PATH is ignored too.
+"""
+import asyncio
+import concurrent.futures
+import gc
+import io
+import json
+import logging
+import multiprocessing
+import os
+import signal
+import sys
+import time
+import traceback
+from concurrent.futures.process import BrokenProcessPool
+from http import HTTPStatus
+from urllib.parse import parse_qs, unquote_to_bytes
+
+# The workers must score with the model the responses name, so there is one load, before forking
+if os.environ.get('MODEL_WATCH_INTERVAL', '0') not in ('', '0'):
+    print("MODEL_WATCH_INTERVAL is ignored in async mode; restart the server to load a new model", file=sys.stderr)
+os.environ['MODEL_WATCH_INTERVAL'] = '0'
+if os.environ.get('SHADOW_MODEL_PATH'):
+    print("SHADOW_MODEL_PATH is ignored in async mode; shadow-score with app.py or gunicorn", file=sys.stderr)
+os.environ['SHADOW_MODEL_PATH'] = ''
+os.environ['BACKGROUND_MODEL_LOAD'] = '0'
+
+import numpy as np
+
+import app as serving
+
+logger = logging.getLogger(__name__)
+
+HOST = os.environ.get('HOST', '127.0.0.1')
+PORT = int(os.environ.get('PORT', 5001))
+# Worker processes running encode + predict
+ASYNC_WORKERS = int(os.environ.get('ASYNC_WORKERS', 0)) or os.cpu_count() or 1
+# Requests allowed to wait for a busy pool; beyond that new predictions get 503
+ASYNC_QUEUE_DEPTH = int(os.environ.get('ASYNC_QUEUE_DEPTH', 64))
+# Seconds a prediction may take, queueing included, before it gets 504
+ASYNC_REQUEST_TIMEOUT = float(os.environ.get('ASYNC_REQUEST_TIMEOUT', 10))
+# Seconds an idle keep-alive connection stays open
+ASYNC_KEEPALIVE = float(os.environ.get('ASYNC_KEEPALIVE', 5))
+ASYNC_MAX_BODY_BYTES = int(os.environ.get('ASYNC_MAX_BODY_BYTES', 4 * 1024 * 1024))
+MAX_HEADER_BYTES = 64 * 1024
+
+
+# ---- Worker processes ----
+
+def _init_worker():
+    # Forked workers would otherwise all draw the same requestId sequence
+    np.random.seed()
+    # Inherited from the parent when forked; loads the model here when spawned
+    if serving.model_bundle is None:
+        serving.startup_load()
+
+def _worker_version(_):
+    bundle = serving.model_bundle
+    return bundle.version if bundle is not None else None
+
+def _score_students(students):
+    """Class probabilities and the model version, for mapped student dicts."""
+    bundle = serving.model_bundle
+    _, probabilities = bundle.predict_students(students)
+    return probabilities, bundle.version
+
+def _score_profiles(profiles):
+    """app.score_profiles: per-item result and error dicts for a batch of form payloads."""
+    results, _, _, _ = serving.score_profiles(serving.model_bundle, profiles)
+    return results
+
+def _explain_student(student_data, pass_probability):
+    """app.explanation_result for one student, or None if the model can't be explained."""
+    try:
+        return serving.explanation_result(serving.model_bundle, student_data, pass_probability)
+    except ValueError:
+        return None
+
+
+# ---- HTTP ----
+
+class HTTPError(Exception):
+    """An error response: status plus app.py's {'error', 'details'} body."""
+
+    def __init__(self, status, details, error=None):
+        super().__init__(details)
+        self.status = status
+        self.error = error or HTTPStatus(status).phrase
+        self.details = details
+
+class Request:
+    __slots__ = ('method', 'path', 'query', 'version', 'headers', 'body')
+
+    def __init__(self, method, path, query, version, headers, body):
+        self.method = method
+        self.path = path
+        self.query = query
+        self.version = version
+        self.headers = headers  # lower-case names
+        self.body = body
+
+    @property
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    @property
+    def explain(self):
+        """?explain=true (or 1/yes), as app.explain_requested."""
+        values = parse_qs(self.query).get('explain', [''])
+        return values[0].lower() in ('1', 'true', 'yes')
+
+    @property
+    def is_json(self):
+        content_type = self.headers.get('content-type', '').split(';')[0].strip().lower()
+        return content_type == 'application/json' or (content_type.startswith('application/')
+                                                       and content_type.endswith('+json'))
+
+async def read_request(reader, writer):
+    """Parse one request from the stream, or return None when the client closed the connection."""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), ASYNC_KEEPALIVE)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    except asyncio.LimitOverrunError:
+        raise HTTPError(HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE, 'Request headers too large')
+
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split(' ')
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'Malformed request line')
+    headers = {}
+    for line in lines[1:]:
+        if not line:
+            continue
+        name, _, value = line.partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        # Repeated headers are combined, as WSGI servers do
+        headers[name] = f"{headers[name]},{value}" if name in headers else value
+    path, _, query = target.partition('?')
+
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, 'Chunked request bodies are not supported')
+    try:
+        length = int(headers.get('content-length', 0))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, 'Invalid Content-Length')
+    if length > ASYNC_MAX_BODY_BYTES:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f'Request body larger than {ASYNC_MAX_BODY_BYTES} bytes')
+    if length and headers.get('expect', '').lower() == '100-continue':
+        writer.write(b'HTTP/1.1 100 Continue\r\n\r\n')
+    try:
+        body = await reader.readexactly(length) if length else b''
+    except (asyncio.IncompleteReadError, ConnectionError):
+        return None
+    return Request(method, path, query, version, headers, body)
+
+def serialize(payload):
+    """Same bytes as Flask's jsonify outside debug mode."""
+    return (json.dumps(payload, separators=(',', ':'), sort_keys=True) + '\n').encode()
+
+def json_response(status, payload, headers=()):
+    return status, [('Content-Type', 'application/json'), *headers], serialize(payload)
+
+def write_response(writer, status, headers, body, keep_alive, head_only=False):
+    status = HTTPStatus(status)
+    lines = [f'HTTP/1.1 {status.value} {status.phrase}']
+    lines.extend(f'{name}: {value}' for name, value in headers if name.lower() not in ('content-length', 'connection'))
+    lines.append(f'Content-Length: {len(body)}')
+    lines.append(f"Connection: {'keep-alive' if keep_alive else 'close'}")
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    if body and not head_only:
+        writer.write(body)
+
+
+# ---- Server ----
+
+class AsyncServer:
+    """Event-loop front end; encode + predict run in a process pool."""
+
+    def __init__(self, workers=ASYNC_WORKERS, queue_depth=ASYNC_QUEUE_DEPTH, timeout=ASYNC_REQUEST_TIMEOUT):
+        self.workers = workers
+        self.queue_depth = queue_depth
+        self.timeout = timeout
+        # Predictions submitted to the pool and not finished yet (running or queued)
+        self.in_flight = 0
+        self.executor = None
+        # Future for a pool restart in progress (see restart_pool)
+        self.restarting = None
+        self.threads = concurrent.futures.ThreadPoolExecutor(thread_name_prefix='wsgi')
+        self.cors = serving.app.wsgi_app
+
+    def start_pool(self, method=None):
+        """Create the worker pool, wait until every worker is up, then make it the active pool.
+
+        By default workers are forked and share the loaded model copy-on-write;
+        with 'forkserver' or 'spawn' each worker loads its own copy.
+        """
+        if method is None:
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+        if method == 'fork':
+            # Like gunicorn.conf.py: keep the collector from touching (and copying) the model pages
+            gc.freeze()
+        executor = concurrent.futures.ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context(method), initializer=_init_worker)
+        # Spawned workers load the model in their initializer; wait for that before taking requests
+        versions = set(executor.map(_worker_version, range(self.workers)))
+        expected = serving.model_bundle.version if serving.model_bundle is not None else None
+        if versions != {expected}:
+            # Responses name this process's model; workers that loaded a newer file must not score for it
+            executor.shutdown(wait=False, cancel_futures=True)
+            raise RuntimeError(f"Inference workers loaded model version(s) {sorted(map(str, versions))}, "
+                               f"but this server serves {expected}; restart the server")
+        self.executor = executor
+        logger.info(f"Started {self.workers} inference workers ({method})")
+
+    async def run_in_pool(self, fn, *args):
+        """Run fn in a worker, with backpressure and the request timeout.
+
+        Raises HTTPError(503) when the pool and its queue are full and
+        HTTPError(504) when the result doesn't arrive in time.
+        """
+        if self.in_flight >= self.workers + self.queue_depth:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, 'Too many predictions in progress, retry shortly', 'Server busy')
+        await self.wait_for_pool()
+        executor = self.executor
+        try:
+            future = executor.submit(fn, *args)
+        except BrokenProcessPool:
+            self.restart_pool(executor)
+            await self.wait_for_pool()
+            future = self.executor.submit(fn, *args)
+        self.in_flight += 1
+        # Released when the worker finishes, even if the request timed out before that
+        future.add_done_callback(lambda _: self.loop.call_soon_threadsafe(self.release))
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.GATEWAY_TIMEOUT, f'No result within {self.timeout:g}s', 'Prediction timed out')
+        except BrokenProcessPool:
+            self.restart_pool(executor)
+            raise
+
+    def release(self):
+        self.in_flight -= 1
+
+    def restart_pool(self, broken):
+        """Start replacing the broken pool `broken` unless that is already under way or done.
+
+        The new workers are started on a thread, so the event loop keeps
+        serving while they come up; predictions wait for them in
+        wait_for_pool(). This process runs threads by now, and forking it
+        could copy a lock another thread holds, so the new workers come from
+        a forkserver (or spawn) and each loads its own copy of the model.
+        """
+        if self.restarting is not None or self.executor is not broken:
+            return
+        logger.error("Inference worker pool broke; restarting it")
+        broken.shutdown(wait=False, cancel_futures=True)
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        self.restarting = self.loop.run_in_executor(self.threads, self.start_pool, method)
+        self.restarting.add_done_callback(self.pool_restarted)
+
+    def pool_restarted(self, future):
+        self.restarting = None
+        if not future.cancelled() and future.exception() is not None:
+            # The broken pool stays active, so the next prediction tries again
+            logger.error(f"Restarting the inference worker pool failed: {future.exception()}")
+
+    async def wait_for_pool(self):
+        """Wait for a pool restart in progress; HTTPError(503) if it takes longer than the request timeout."""
+        if self.restarting is None:
+            return
+        try:
+            await asyncio.wait_for(asyncio.shield(self.restarting), self.timeout)
+        except asyncio.TimeoutError:
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, 'Inference workers are restarting, retry shortly',
+                            'Server busy')
+
+    # ---- Prediction endpoints (app.predict / app.predict_batch on the same helpers) ----
+
+    def check_request(self, request):
+        """Return the model bundle for the request, or raise HTTPError with app.py's error bodies."""
+        # One bundle for the whole request, as in app.py
+        bundle = serving.model_bundle
+        if bundle is None:
+            raise HTTPError(500, 'The ML model is not loaded. Please train or load the model first.',
+                            'Model not loaded')
+        if not request.is_json:
+            raise HTTPError(400, 'Content-Type must be application/json', 'Not JSON data')
+        return bundle
+
+    async def predict(self, request):
+        observe = serving.observe_predict_stage
+        bundle = self.check_request(request)
+        start = time.perf_counter()
+        data = json.loads(request.body)
+        observe('parse', time.perf_counter() - start)
+        log_payload = serving.payload_sampler.sample()
+        if log_payload:
+            serving.payload_logger.info(f"Request headers: {request.headers}")
+            serving.payload_logger.info(f"Received data: {data}")
+        if not data:
+            return json_response(400, {'error': 'No data received', 'details': 'Request body must contain JSON data'})
+
+        try:
+            start = time.perf_counter()
+            form, student_data = serving.map_form_data(data)
+            observe('map', time.perf_counter() - start)
+            if log_payload:
+                serving.payload_logger.info(f"Mapped student data: {student_data}")
+
+            start = time.perf_counter()
+            key = (bundle.version,) + serving.cache_key(form)
+            cached = serving.response_cache.get(key)
+            observe('cache', time.perf_counter() - start)
+            if cached is not None:
+                recommendations, pass_probability, _ = cached
+                result = serving.prediction_result(data, recommendations, pass_probability, bundle)
+                if request.explain:
+                    return await self.explained_response(result, student_data, pass_probability)
+                return json_response(200, result)
+
+            start = time.perf_counter()
+            (probabilities,), _ = await self.run_in_pool(_score_students, [student_data])
+            pass_probability = float(probabilities[1]) * 100  # Probability of passing
+            # Queue wait, transfer and the worker's encode + model call
+            observe('pool', time.perf_counter() - start)
+        except HTTPError:
+            raise
+        except Exception as e:
+            logger.error(f"Error processing data: {str(e)}")
+            traceback.print_exc()
+            return json_response(500, {'error': 'Data processing error', 'details': str(e)})
+
+        start = time.perf_counter()
+        result, = serving.recommend_profiles(bundle, [(None, form, data)], [pass_probability])
+        observe('recommend', time.perf_counter() - start)
+        if 'error' in result:
+            logger.error(f"Error generating career recommendations: {result['details']}")
+            return json_response(500, result)
+        serving.response_cache.put(key, (result['recommendations'], pass_probability, probabilities))
+
+        if request.explain:
+            return await self.explained_response(result, student_data, pass_probability)
+        start = time.perf_counter()
+        response = json_response(200, result)
+        observe('serialize', time.perf_counter() - start)
+        return response
+
+    async def explained_response(self, result, student_data, pass_probability):
+        """The result with an 'explanation' computed in a worker, as app.explained_response."""
+        start = time.perf_counter()
+        explanation = await self.run_in_pool(_explain_student, student_data, pass_probability)
+        if explanation is None:
+            return json_response(501, {'error': 'Explanation unavailable',
+                                       'details': 'Explanations need the flat inference engine (INFERENCE_ENGINE=flat)'})
+        result['explanation'] = explanation
+        serving.observe_predict_stage('explain', time.perf_counter() - start)
+        return json_response(200, result)
+
+    async def predict_batch(self, request):
+        observe = serving.observe_batch_stage
+        bundle = self.check_request(request)
+        start = time.perf_counter()
+        payload = json.loads(request.body)
+        observe('parse', time.perf_counter() - start)
+        profiles = payload.get('profiles') if isinstance(payload, dict) else payload
+        if not isinstance(profiles, list) or not profiles:
+            return json_response(400, {'error': 'No data received',
+                                       'details': 'Request body must be a non-empty JSON array of form payloads'})
+        if len(profiles) > serving.MAX_BATCH_SIZE:
+            return json_response(413, {'error': 'Batch too large',
+                                       'details': f'A batch may contain at most {serving.MAX_BATCH_SIZE} profiles'})
+
+        # Mapping, the model call and the recommendations all run in a worker, as app.score_profiles
+        start = time.perf_counter()
+        results = await self.run_in_pool(_score_profiles, profiles)
+        observe('pool', time.perf_counter() - start)
+
+        start = time.perf_counter()
+        response = json_response(200, serving.batch_body(results))
+        observe('serialize', time.perf_counter() - start)
+        return response
+
+    # ---- Everything else: the Flask app ----
+
+    def call_wsgi(self, request, peer):
+        """Run the Flask app (behind its CORS middleware) for one request; return (status, headers, body)."""
+        host, _, port = request.headers.get('host', f'{HOST}:{PORT}').partition(':')
+        environ = {
+            'REQUEST_METHOD': request.method,
+            'SCRIPT_NAME': '',
+            'PATH_INFO': unquote_to_bytes(request.path).decode('latin-1'),
+            'QUERY_STRING': request.query,
+            'SERVER_NAME': host,
+            'SERVER_PORT': port or str(PORT),
+            'SERVER_PROTOCOL': request.version,
+            'REMOTE_ADDR': peer[0] if peer else '',
+            'wsgi.version': (1, 0),
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(request.body),
+            'wsgi.errors': sys.stderr,
+            'wsgi.multithread': True,
+            'wsgi.multiprocess': False,
+            'wsgi.run_once': False,
+        }
+        for name, value in request.headers.items():
+            if name == 'content-type':
+                environ['CONTENT_TYPE'] = value
+            elif name == 'content-length':
+                environ['CONTENT_LENGTH'] = value
+            else:
+                environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+        response = {}
+
+        def start_response(status, headers, exc_info=None):
+            response['status'] = int(status.split(' ', 1)[0])
+            response['headers'] = headers
+
+        body_iter = serving.app(environ, start_response)
+        try:
+            body = b''.join(body_iter)
+        finally:
+            if hasattr(body_iter, 'close'):
+                body_iter.close()
+        return response['status'], response['headers'], body
+
+    # ---- Connection handling ----
+
+    async def dispatch(self, request, peer):
+        if request.method == 'POST' and request.path in ('/api/predict', '/api/predict/batch'):
+            endpoint = 'predict' if request.path == '/api/predict' else 'predict_batch'
+            start = time.perf_counter()
+            try:
+                if endpoint == 'predict':
+                    status, headers, body = await self.predict(request)
+                else:
+                    status, headers, body = await self.predict_batch(request)
+            except HTTPError as e:
+                extra = [('Retry-After', '1')] if e.status == HTTPStatus.SERVICE_UNAVAILABLE else []
+                status, headers, body = json_response(e.status, {'error': e.error, 'details': e.details}, extra)
+            except Exception as e:
+                # Includes undecodable JSON, which app.py answers the same way
+                logger.error(f"Error in prediction: {e}")
+                status, headers, body = json_response(500, {'error': 'An unexpected error occurred', 'details': str(e)})
+            # Same metrics the Flask hooks record
+            error = json.loads(body).get('error', '') if status >= 400 else ''
+            serving.request_count.inc(endpoint, str(status), error)
+            serving.request_latency.observe(time.perf_counter() - start, endpoint)
+            # CORS headers from the same middleware the Flask app uses
+            origin = request.headers.get('origin')
+            allow_origin = self.cors.allow_origin_value(origin) if origin else None
+            if allow_origin is not None:
+                headers = headers + [('Access-Control-Allow-Origin', allow_origin)] + self.cors.response_headers
+            return status, headers, body
+
+        if request.path.startswith('/api/admin/'):
+            return json_response(501, {'error': 'Not supported in async mode',
+                                       'details': 'Restart the server to load a new model'})
+        return await asyncio.get_running_loop().run_in_executor(self.threads, self.call_wsgi, request, peer)
+
+    async def handle_connection(self, reader, writer):
+        peer = writer.get_extra_info('peername')
+        try:
+            while True:
+                try:
+                    request = await read_request(reader, writer)
+                except HTTPError as e:
+                    status, headers, body = json_response(e.status, {'error': e.error, 'details': e.details})
+                    write_response(writer, status, headers, body, keep_alive=False)
+                    await writer.drain()
+                    break
+                if request is None:
+                    break
+                status, headers, body = await self.dispatch(request, peer)
+                keep_alive = request.keep_alive
+                write_response(writer, status, headers, body, keep_alive, head_only=request.method == 'HEAD')
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host=HOST, port=PORT):
+        self.loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self.handle_connection, host, port, limit=MAX_HEADER_BYTES)
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(sig, stop.set)
+            except NotImplementedError:
+                pass
+        logger.info(f"Async server listening on http://{host}:{port} with {self.workers} workers, "
+                    f"queue depth {self.queue_depth}, timeout {self.timeout:g}s")
+        async with server:
+            await stop.wait()
+        logger.info("Shutting down")
+        self.executor.shutdown(wait=True, cancel_futures=True)
+        self.threads.shutdown(wait=False)
+
+
+def main():
+    if serving.model_bundle is None:
+        logger.warning("Starting without a model. Predictions won't work until the server is restarted with one.")
+    server = AsyncServer()
+    server.start_pool()
+    asyncio.run(server.serve())
+
+
+if __name__ == '__main__':
+    main()
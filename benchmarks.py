@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the serving and training code.
+
+Each benchmark times one stage in isolation against the bundled data/ CSVs and
+the trained model (no server or network needed) and reports the median and
+fastest time per call over several repeats. Results are written as JSON;
+passing --baseline compares against an earlier results file and exits with
+status 1 if any benchmark got slower than --threshold.
+
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --baseline baseline.json
+    python benchmarks.py --only serving.predict_proba --repeat 10
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+import warnings
+
+import numpy as np
+
+DEFAULT_OUTPUT = 'benchmark_results.json'
+
+# Every benchmark runs for at least this long per repeat (see timeit.Timer.autorange)
+MIN_REPEAT_SECONDS = 0.2
+
+SAMPLE_PROFILE = {
+    'education': 'PhD',
+    'technicalSkills': 'Expert',
+    'communicationSkills': 'Advanced',
+    'analyticalThinking': 'Expert',
+    'creativity': 'Intermediate',
+    'leadership': 'Advanced',
+    'yearsExperience': 5,
+    'interestScience': 9,
+    'interestArts': 4,
+    'interestBusiness': 6
+}
+
+
+def time_call(fn, repeat, number=None):
+    """Return {'medianSeconds', 'minSeconds', 'number', 'repeat'} per call of fn()."""
+    timer = timeit.Timer(fn)
+    if number is None:
+        number, elapsed = timer.autorange()
+        if elapsed < MIN_REPEAT_SECONDS:
+            number = max(1, int(number * MIN_REPEAT_SECONDS / max(elapsed, 1e-9)))
+    runs = [seconds / number for seconds in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'medianSeconds': float(np.median(runs)),
+        'minSeconds': min(runs),
+        'number': number,
+        'repeat': repeat
+    }
+
+
+def legacy_pandas_encode(student_data, model, numerical_cols, categorical_cols, numerical_transformer):
+    """The DataFrame encoding app.py used before feature_encoder.py, kept for comparison."""
+    import pandas as pd
+
+    student_df = pd.DataFrame([student_data])
+    student_num = student_df[numerical_cols].copy()
+    student_num_scaled = numerical_transformer.transform(student_num)
+    student_num_scaled = pd.DataFrame(student_num_scaled, columns=numerical_cols)
+    student_cat = pd.get_dummies(student_df[categorical_cols])
+    expected_cat_cols = [col for col in model.feature_names_in_ if col not in numerical_cols]
+    student_cat = student_cat.reindex(columns=expected_cat_cols, fill_value=0)
+    student_processed = pd.concat([student_num_scaled, student_cat], axis=1)
+    return student_processed[model.feature_names_in_]
+
+
+def serving_benchmarks():
+    """Yield (name, fn, fixed number of calls or None) for the request path."""
+    import joblib
+    import pandas as pd
+    import app
+    from flask import json as flask_json
+    from model_artifact import is_artifact, load_artifact
+    from tree_engine import FlatForest
+
+    bundle = app.model_bundle
+    if bundle is None:
+        raise SystemExit("No model loaded; train the model first.")
+    model_info = joblib.load(bundle.model_path) if not is_artifact(bundle.model_path) else None
+    model = model_info['model'] if model_info is not None else None
+    encoder = bundle.feature_encoder
+
+    form, student_data = app.map_form_data(SAMPLE_PROFILE)
+    pass_probability = 72.5
+    recommendations = app.recommend_careers(form, pass_probability)
+    result = app.prediction_result(SAMPLE_PROFILE, recommendations, pass_probability, bundle)
+
+    yield 'serving.map_form_data', lambda: app.map_form_data(SAMPLE_PROFILE), None
+    yield 'serving.encode.feature_encoder', lambda: encoder.encode(student_data), None
+    if model is not None:
+        yield 'serving.encode.pandas_legacy', lambda: legacy_pandas_encode(
+            student_data, model, bundle.numerical_cols, bundle.categorical_cols, bundle.numerical_transformer), None
+    numerical_row = pd.DataFrame([student_data])[list(bundle.numerical_cols)]
+    yield 'serving.scaler_transform', lambda: bundle.numerical_transformer.transform(numerical_row), None
+
+    profiles = list(app.WARMUP_PROFILES) + [SAMPLE_PROFILE]
+    students = [app.map_form_data(profiles[i % len(profiles)])[1] for i in range(1000)]
+    rows = {n: encoder.encode_many(students[:n]) for n in (1, 10, 100, 300, 1000)}
+    flat = bundle.inference_engine or (FlatForest.from_model(model) if model is not None else None)
+    if flat is not None:
+        flat.contributions()  # built on the first explanation; time the steady state
+    for n, X in rows.items():
+        if flat is not None:
+            yield f'serving.predict_proba.flat.{n}', lambda X=X: flat.predict_proba(X), None
+            yield f'serving.predict_contributions.flat.{n}', lambda X=X: flat.predict_contributions(X), None
+        if model is not None:
+            yield f'serving.predict_proba.sklearn.{n}', lambda X=X: model.predict_proba(X), None
+    yield 'serving.predict_students.1', lambda: bundle.predict_students([student_data]), None
+
+    yield 'serving.recommend_careers', lambda: app.recommend_careers(form, pass_probability), None
+    forms = [app.map_form_data(profiles[i % len(profiles)])[0] for i in range(1000)]
+    pass_probabilities = [float(i % 100) for i in range(1000)]
+    yield 'serving.recommend_careers.many.1000', lambda: app.recommend_careers_many(forms, pass_probabilities), None
+    yield 'serving.json.stdlib', lambda: json.dumps(result), None
+    yield 'serving.json.flask', lambda: flask_json.dumps(result), None
+
+    if not is_artifact(bundle.model_path):
+        yield 'serving.load.joblib', lambda: joblib.load(bundle.model_path), 1
+    artifact_path = app.MODEL_ARTIFACT_PATH
+    if artifact_path and is_artifact(artifact_path):
+        yield 'serving.load.mmap_artifact', lambda: load_artifact(artifact_path), None
+
+
+def training_benchmarks():
+    """Yield (name, fn, number) for each phase of train_model.py."""
+    import train_model
+    from feature_cache import cache_key, load_prepared, save_prepared
+
+    df = train_model.load_dataset()
+    X_processed, y, _, _, _ = train_model.preprocess(df)
+    X_train, _, y_train, _ = train_model.split_data(X_processed, y)
+    X_resampled, y_resampled = train_model.resample(X_train, y_train)
+
+    yield 'training.read_csv', lambda: train_model.load_dataset(), None
+    yield 'training.preprocess', lambda: train_model.preprocess(df), None
+    yield 'training.split', lambda: train_model.split_data(X_processed, y), None
+    yield 'training.smote', lambda: train_model.resample(X_train, y_train), None
+    with tempfile.TemporaryDirectory() as cache_dir:
+        key = cache_key([train_model.DATA_PATH], train_model.PREPROCESS_PARAMS)
+        save_prepared(cache_dir, key, train_model.prepare_data(df))
+        yield 'training.feature_cache.load', lambda: load_prepared(cache_dir, key), None
+    yield 'training.fit.random_forest', lambda: train_model.train_random_forest(X_resampled, y_resampled), 1
+    yield 'training.fit.xgboost', lambda: train_model.train_xgboost(X_resampled, y_resampled), 1
+
+
+SUITES = [('serving', serving_benchmarks), ('training', training_benchmarks)]
+
+
+def selected(name, prefixes):
+    """True if `name` matches one of the --only prefixes (or could contain matches)."""
+    return not prefixes or any(name.startswith(prefix) or prefix.startswith(name) for prefix in prefixes)
+
+
+def compare(baseline, results, threshold):
+    """Print per-benchmark changes; return the names that regressed by more than `threshold`."""
+    regressions = []
+    print(f"\n{'benchmark':<40} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, current in results.items():
+        before = baseline.get(name)
+        if before is None:
+            print(f"{name:<40} {'-':>12} {format_seconds(current['medianSeconds']):>12} {'new':>9}")
+            continue
+        change = current['medianSeconds'] / before['medianSeconds'] - 1
+        flag = ''
+        if change > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f"{name:<40} {format_seconds(before['medianSeconds']):>12} "
+              f"{format_seconds(current['medianSeconds']):>12} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def format_seconds(seconds):
+    if seconds >= 1:
+        return f"{seconds:.3f} s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.3f} ms"
+    return f"{seconds * 1e6:.2f} us"
+
+
+def environment():
+    import sklearn
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'sklearn': sklearn.__version__
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the serving and training micro-benchmarks.")
+    parser.add_argument('--only', action='append', default=[],
+                        help="run only benchmarks whose name starts with this prefix (repeatable)")
+    parser.add_argument('--skip-training', action='store_true', help="skip the train_model.py phases")
+    parser.add_argument('--repeat', type=int, default=5, help="timed repeats per benchmark (default 5)")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help=f"results file (default {DEFAULT_OUTPUT})")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help="slowdown that counts as a regression (default 0.10 = 10%%)")
+    args = parser.parse_args()
+
+    results = {}
+    for suite_name, suite in SUITES:
+        if (suite_name == 'training' and args.skip_training) or not selected(suite_name + '.', args.only):
+            continue
+        for name, fn, number in suite():
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore')
+                results[name] = time_call(fn, args.repeat, number)
+            print(f"{name:<40} {format_seconds(results[name]['medianSeconds']):>12}  "
+                  f"(min {format_seconds(results[name]['minSeconds'])}, {results[name]['number']} calls x {args.repeat})")
+
+    report = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'environment': environment(),
+        'benchmarks': results
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(baseline['benchmarks'], results, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} benchmark(s) regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print(f"\nNo regressions above {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
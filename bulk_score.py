@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+"""
+Offline bulk scoring of form payloads, without the HTTP API.
+
+Reads CSV (one column per form field, e.g. education, technicalSkills,
+interestScience) or newline-delimited JSON (one /api/predict payload per
+line) in chunks, scores the chunks in worker processes and writes one
+result per input row, in input order. Each worker imports app.py once, so
+it loads the model once and scores through app.score_profiles, the helper
+behind /api/predict/batch.
+
+At most --max-in-flight chunks are read ahead of the writer, so memory
+stays bounded whatever the size of the input.
+
+    python bulk_score.py roster.csv --output scores.ndjson
+    python bulk_score.py payloads.ndjson --output scores.csv --workers 4 --chunk-size 2000
+    cat payloads.ndjson | python bulk_score.py - --input-format ndjson > scores.ndjson
+
+Results have the shape of /api/predict/batch items, without requestId:
+{"index", "primaryPrediction", "recommendations", "modelDetails"}, or
+{"index", "error", "details"} for rows that couldn't be scored. --id-field
+copies an input column (e.g. a student id) into every result as "id".
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import io
+import itertools
+import json
+import os
+import resource
+import sys
+import time
+
+DEFAULT_CHUNK_SIZE = 1000
+PROGRESS_INTERVAL = 5.0  # seconds between progress lines
+TOP_N = 3
+
+# Workers only score: no model watcher, and app.py's startup logging only for warnings
+os.environ['MODEL_WATCH_INTERVAL'] = '0'
+os.environ['BACKGROUND_MODEL_LOAD'] = '0'
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+
+CSV_COLUMNS = (['id', 'index', 'primaryPrediction']
+               + [f'{name}{rank}' for rank in range(1, TOP_N + 1) for name in ('career', 'probability')]
+               + ['studentPerformanceScore', 'modelVersion', 'error', 'details'])
+
+
+def peak_rss_mb(who=resource.RUSAGE_SELF):
+    """Peak resident set size (ru_maxrss is in KB on Linux, bytes on macOS); the largest child for RUSAGE_CHILDREN."""
+    peak = resource.getrusage(who).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+# ---- Input ----
+
+def read_csv_rows(f, delimiter=','):
+    """Form payloads from CSV rows; empty cells are left out so app.py's defaults apply."""
+    for row in csv.DictReader(f, delimiter=delimiter):
+        yield {name: value for name, value in row.items() if name and value not in ('', None)}
+
+def read_ndjson_lines(f):
+    """Raw NDJSON lines (decoded in the workers); blank lines are skipped."""
+    for line in f:
+        if line.strip():
+            yield line
+
+def chunked(rows, size):
+    """Yield (index of the first row, list of rows) chunks."""
+    rows = iter(rows)
+    start = 0
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+# ---- Scoring (runs in the workers) ----
+
+def _init_worker():
+    # Loads the model once per worker
+    import app  # noqa: F401
+
+def score_chunk(start, rows, id_field=None, output_format='ndjson'):
+    """Score one chunk; return (serialized results, rows, failed rows)."""
+    import app
+
+    bundle = app.model_bundle
+    if bundle is None:
+        raise RuntimeError('The ML model is not loaded. Please train or load the model first.')
+
+    # NDJSON lines are decoded here; undecodable ones are scored as empty items and reported below
+    invalid = {}
+    for offset, data in enumerate(rows):
+        if isinstance(data, str):
+            try:
+                rows[offset] = json.loads(data)
+            except ValueError as e:
+                rows[offset] = None
+                invalid[offset] = str(e)
+
+    # Mapping, model and recommendation failures are reported per row, as in /api/predict/batch
+    results, _, _, _ = app.score_profiles(bundle, rows)
+
+    failed = 0
+    for offset, result in enumerate(results):
+        if offset in invalid:
+            result = results[offset] = {'index': offset, 'error': 'Invalid JSON', 'details': invalid[offset]}
+        # Random per request; offline results are reproducible without it
+        result.pop('requestId', None)
+        result['index'] = start + offset
+        if 'error' in result:
+            failed += 1
+        if id_field is not None:
+            data = rows[offset]
+            result['id'] = data.get(id_field) if isinstance(data, dict) else None
+    return serialize(results, output_format), len(results), failed
+
+def serialize(results, output_format):
+    if output_format == 'ndjson':
+        return ''.join(json.dumps(result, separators=(',', ':')) + '\n' for result in results)
+    out = io.StringIO()
+    writer = csv.writer(out, lineterminator='\n')
+    for result in results:
+        row = {'id': result.get('id'), 'index': result['index'],
+               'error': result.get('error'), 'details': result.get('details')}
+        if 'error' not in result:
+            row['primaryPrediction'] = result['primaryPrediction']
+            for rank, recommendation in enumerate(result['recommendations'], 1):
+                row[f'career{rank}'] = recommendation['career']
+                row[f'probability{rank}'] = recommendation['probability']
+            row['studentPerformanceScore'] = result['modelDetails']['studentPerformanceScore']
+            row['modelVersion'] = result['modelDetails']['modelVersion']
+        writer.writerow([row.get(column) for column in CSV_COLUMNS])
+    return out.getvalue()
+
+
+# ---- Driver ----
+
+class InProcessExecutor:
+    """Executor interface for --workers 0: score each chunk in this process when it is submitted."""
+
+    def submit(self, fn, *args):
+        future = concurrent.futures.Future()
+        try:
+            future.set_result(fn(*args))
+        except Exception as e:
+            future.set_exception(e)
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        pass
+
+
+def bulk_score(chunks, out, workers, max_in_flight, id_field=None, output_format='ndjson', log=sys.stderr):
+    """Score chunks and write the results to `out` in input order; return a report dict.
+
+    Up to max_in_flight chunks are submitted ahead of the one being written;
+    the reader waits for the oldest chunk before reading more.
+    """
+    if workers > 0:
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=workers, initializer=_init_worker)
+    else:
+        _init_worker()
+        executor = InProcessExecutor()
+
+    start_time = time.perf_counter()
+    last_progress = start_time
+    rows = failed = 0
+    pending = collections.deque()
+
+    def write_oldest():
+        nonlocal rows, failed, last_progress
+        text, chunk_rows, chunk_failed = pending.popleft().result()
+        out.write(text)
+        rows += chunk_rows
+        failed += chunk_failed
+        now = time.perf_counter()
+        if now - last_progress >= PROGRESS_INTERVAL:
+            last_progress = now
+            print(f"{rows:,} rows ({rows / (now - start_time):,.0f} rows/s)", file=log)
+
+    try:
+        if output_format == 'csv':
+            out.write(','.join(CSV_COLUMNS) + '\n')
+        for start, chunk in chunks:
+            if len(pending) >= max_in_flight:
+                write_oldest()
+            pending.append(executor.submit(score_chunk, start, chunk, id_field, output_format))
+        while pending:
+            write_oldest()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    seconds = time.perf_counter() - start_time
+    return {
+        'rows': rows,
+        'failed': failed,
+        'seconds': round(seconds, 3),
+        'rowsPerSecond': round(rows / seconds, 1) if seconds else 0.0,
+        'workers': workers,
+        'peakRssMb': round(peak_rss_mb(), 1),
+        'peakWorkerRssMb': round(peak_rss_mb(resource.RUSAGE_CHILDREN), 1) if workers > 0 else None,
+    }
+
+
+def input_format_for(path):
+    return 'ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv'
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score CSV or NDJSON form payloads offline, in input order.")
+    parser.add_argument('input', help="CSV or NDJSON file, or - for stdin")
+    parser.add_argument('--output', default='-', help="results file (default: stdout)")
+    parser.add_argument('--input-format', choices=['csv', 'ndjson'],
+                        help="default: ndjson for .ndjson/.jsonl files, csv otherwise")
+    parser.add_argument('--output-format', choices=['csv', 'ndjson'],
+                        help="default: from the --output extension, ndjson for stdout")
+    parser.add_argument('--delimiter', default=',', help="CSV input delimiter (default ',')")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"rows per chunk (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: CPU count; 0 scores in this process)")
+    parser.add_argument('--max-in-flight', type=int,
+                        help="chunks read ahead of the writer (default: 2 per worker)")
+    parser.add_argument('--id-field', help="input field copied into every result as 'id'")
+    parser.add_argument('--report', help="also write the report as JSON to this file")
+    args = parser.parse_args()
+
+    input_format = args.input_format or input_format_for(args.input)
+    output_format = args.output_format or ('csv' if args.output.endswith('.csv') else 'ndjson')
+    max_in_flight = args.max_in_flight or 2 * max(1, args.workers)
+
+    f = sys.stdin if args.input == '-' else open(args.input, newline='' if input_format == 'csv' else None)
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='')
+    try:
+        rows = read_csv_rows(f, args.delimiter) if input_format == 'csv' else read_ndjson_lines(f)
+        report = bulk_score(chunked(rows, args.chunk_size), out, args.workers, max_in_flight,
+                            args.id_field, output_format)
+    finally:
+        if f is not sys.stdin:
+            f.close()
+        if out is not sys.stdout:
+            out.close()
+
+    print(f"Scored {report['rows']:,} rows ({report['failed']:,} failed) in {report['seconds']}s: "
+          f"{report['rowsPerSecond']:,.0f} rows/s with {args.workers} workers, "
+          f"peak RSS {report['peakRssMb']} MB"
+          + (f" (largest worker {report['peakWorkerRssMb']} MB)" if report['peakWorkerRssMb'] else ''),
+          file=sys.stderr)
+    if args.report:
+        with open(args.report, 'w') as report_file:
+            json.dump(report, report_file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
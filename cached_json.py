@@ -0,0 +1,54 @@
+"""
+Pre-serialized JSON responses for constant or rarely changing payloads.
+
+A CachedJSON serializes its payload once and keeps the bytes with a strong
+ETag (a SHA-256 of the bytes). The payload is rebuilt on every request
+(cheap for small dicts) and compared with the last one, and only a change
+re-serializes it. Responses carry Cache-Control so browsers and CDNs can
+reuse them, and a request whose If-None-Match matches gets an empty 304.
+"""
+import copy
+import hashlib
+import json
+
+from flask import Response
+
+
+class CachedJSON:
+    """Serve `build()` as JSON from cached bytes, re-serialized only when the payload changes.
+
+    max_age > 0 lets clients reuse the response for that many seconds; 0
+    sends "no-cache", so clients revalidate every time and get a 304 while
+    the payload is unchanged.
+    """
+
+    def __init__(self, build, max_age=0, public=True):
+        self.build = build
+        self.cache_control = (f"{'public' if public else 'private'}, max-age={int(max_age)}"
+                              if max_age > 0 else 'no-cache')
+        self.serializations = 0
+        self._state = None
+        self.current()
+
+    def current(self):
+        """Return (body bytes, etag, cache headers) for the current payload."""
+        payload = self.build()
+        state = self._state
+        if state is not None and state[0] == payload:
+            return state[1:]
+        # Same bytes as Flask's jsonify outside debug mode: compact, sorted keys, trailing newline
+        body = (json.dumps(payload, separators=(',', ':'), sort_keys=True) + '\n').encode()
+        etag = hashlib.sha256(body).hexdigest()[:32]
+        headers = [('ETag', f'"{etag}"'), ('Cache-Control', self.cache_control)]
+        # Snapshot, so in-place changes to the source lists are noticed; swapped in as one tuple
+        self._state = (copy.deepcopy(payload), body, etag, headers)
+        self.serializations += 1
+        return body, etag, headers
+
+    def response(self, request):
+        """The cached body, or an empty 304 if the request's If-None-Match matches."""
+        body, etag, headers = self.current()
+        # If-None-Match uses the weak comparison (RFC 9110, 13.1.2); "*" matches too
+        if request.if_none_match.contains_weak(etag):
+            return Response(status=304, headers=headers)
+        return Response(body, content_type='application/json', headers=headers)
@@ -0,0 +1,211 @@
+"""
+Data-driven career scoring.
+
+Each career has an eligibility rule (minimum values for some profile
+features) and a linear score (weighted profile features, summed in the
+listed order). The rules are compiled into arrays and a batch of profiles
+is scored against all careers at once with NumPy; a single profile walks
+the same compiled rules in plain Python, which is faster than NumPy's
+per-call overhead at that size. Both give identical results:
+
+- careers whose rule matches keep their score;
+- if fewer than MIN_RECOMMENDATIONS match, every other career gets a
+  fallback score of pass probability + a tie factor in 0-19, taken from a
+  CRC32 of the scoring fields and the career name (stable across processes,
+  unlike hash());
+- the top 3 by score are returned, ties going to the earlier rule and then
+  to the earlier fallback career;
+- probabilities are each top score's share of the top-3 total, clamped to
+  30-95.
+"""
+import zlib
+
+import numpy as np
+
+# Profile features the rules and scores refer to; SKILL and EDUCATION levels are
+# mapped to numbers with the same defaults (2) app.py uses
+FEATURES = ['interest_science', 'interest_arts', 'interest_business', 'analytical', 'tech_skills',
+            'comm_skills', 'creativity', 'education_level', 'pass_probability', 'zero']
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURES)}
+
+# Form fields the tie factor is computed from (all of them are part of app.cache_key)
+TIE_FIELDS = ['education_level', 'tech_skills', 'analytical', 'comm_skills', 'creativity',
+              'interest_science', 'interest_arts', 'interest_business']
+
+MIN_RECOMMENDATIONS = 3
+TOP_N = 3
+TIE_MODULUS = 20
+# Below this many profiles, NumPy's per-call overhead costs more than scoring row by row
+VECTORIZE_MIN_ROWS = 32
+
+# (career, eligibility as {feature: minimum}, score as [(feature, weight), ...]), in rule order
+CAREER_RULES = [
+    ('Data Scientist', {'tech_skills': 3, 'interest_science': 7},
+     [('interest_science', 0.6), ('analytical', 10), ('pass_probability', 0.3)]),
+    ('Software Engineer', {'tech_skills': 3, 'interest_science': 7},
+     [('interest_science', 0.5), ('tech_skills', 10), ('pass_probability', 0.3)]),
+    ('Financial Analyst', {'interest_business': 6},
+     [('interest_business', 0.6), ('analytical', 10), ('pass_probability', 0.2)]),
+    ('Marketing Specialist', {'interest_business': 6},
+     [('interest_business', 0.5), ('comm_skills', 10), ('creativity', 5)]),
+    ('Graphic Designer', {'interest_arts': 7, 'creativity': 3},
+     [('interest_arts', 0.7), ('creativity', 15)]),
+    ('Doctor', {'education_level': 3, 'interest_science': 6},
+     [('interest_science', 0.6), ('pass_probability', 0.4), ('education_level', 5)]),
+    ('Teacher', {'education_level': 3, 'interest_science': 6},
+     [('interest_arts', 0.3), ('interest_science', 0.3), ('comm_skills', 10)]),
+]
+
+
+class CareerScorer:
+    """Scores all careers for a batch of profiles with the rules compiled into arrays."""
+
+    def __init__(self, careers, education_map, skill_map, rules=CAREER_RULES):
+        self.careers = list(careers)
+        self.education_map = education_map
+        self.skill_map = skill_map
+        career_index = {career: i for i, career in enumerate(self.careers)}
+        n_careers = len(self.careers)
+        n_conditions = max(len(eligibility) for _, eligibility, _ in rules)
+        n_terms = max(len(terms) for _, _, terms in rules)
+        zero = FEATURE_INDEX['zero']
+
+        # Conditions and score terms as (condition/term, career) arrays of feature indexes;
+        # padding is 'zero' >= 0 (always true) and 0 * 'zero'. Careers without a rule are
+        # never eligible (minimum +inf).
+        self.condition_features = np.full((n_conditions, n_careers), zero)
+        self.condition_minimums = np.full((n_conditions, n_careers), np.inf)
+        self.term_features = np.full((n_terms, n_careers), zero)
+        self.term_weights = np.zeros((n_terms, n_careers))
+        # Tie order: eligible careers by rule order, fallback careers after them in CAREERS order
+        self.rule_position = np.full(n_careers, len(rules))
+        for position, (career, eligibility, terms) in enumerate(rules):
+            index = career_index[career]
+            self.rule_position[index] = position
+            self.condition_minimums[:, index] = 0
+            for condition, (feature, minimum) in enumerate(eligibility.items()):
+                self.condition_features[condition, index] = FEATURE_INDEX[feature]
+                self.condition_minimums[condition, index] = minimum
+            for term, (feature, weight) in enumerate(terms):
+                self.term_features[term, index] = FEATURE_INDEX[feature]
+                self.term_weights[term, index] = weight
+        self.fallback_position = len(rules) + np.arange(n_careers)
+        self.career_crcs = np.array([zlib.crc32(career.encode()) for career in self.careers], dtype=np.uint32)
+
+        # The same rules as tuples of indexes, for scoring one profile without NumPy overhead
+        self.compiled_rules = [
+            (position, career_index[career],
+             tuple((FEATURE_INDEX[feature], minimum) for feature, minimum in eligibility.items()),
+             tuple((FEATURE_INDEX[feature], float(weight)) for feature, weight in terms))
+            for position, (career, eligibility, terms) in enumerate(rules)
+        ]
+        self.fallback_careers = [(len(rules) + index, index, int(crc))
+                                 for index, crc in enumerate(self.career_crcs)]
+
+    def feature_row(self, form, pass_probability):
+        """Numeric profile features in FEATURES order."""
+        skill_map = self.skill_map
+        return (form['interest_science'], form['interest_arts'], form['interest_business'],
+                skill_map.get(form['analytical'], 2), skill_map.get(form['tech_skills'], 2),
+                skill_map.get(form['comm_skills'], 2), skill_map.get(form['creativity'], 2),
+                self.education_map.get(form['education_level'], 2), pass_probability, 0)
+
+    def features(self, forms, pass_probabilities):
+        """(n, len(FEATURES)) matrix of numeric profile features."""
+        rows = [self.feature_row(form, pass_probability)
+                for form, pass_probability in zip(forms, pass_probabilities)]
+        return np.array(rows, dtype=np.float64)
+
+    @staticmethod
+    def key_crc(form):
+        """CRC32 of the scoring fields; XORed with a career's CRC32 it gives the tie factor."""
+        return zlib.crc32('|'.join([str(form[field]) for field in TIE_FIELDS]).encode())
+
+    def tie_factors(self, forms):
+        """Factor in [0, TIE_MODULUS) per (profile, career)."""
+        key_crcs = np.array([self.key_crc(form) for form in forms], dtype=np.uint32)
+        return (key_crcs[:, None] ^ self.career_crcs) % TIE_MODULUS
+
+    def score(self, forms, pass_probabilities):
+        """Return (scores, tie positions), shape (n, careers); -inf marks careers left out."""
+        X = self.features(forms, pass_probabilities)
+        eligible = (X[:, self.condition_features] >= self.condition_minimums).all(axis=1)
+
+        # Summed term by term, in the order each rule lists them
+        terms = X[:, self.term_features] * self.term_weights
+        scores = terms[:, 0]
+        for term in range(1, terms.shape[1]):
+            scores = scores + terms[:, term]
+
+        fallback_rows = np.flatnonzero(np.count_nonzero(eligible, axis=1) < MIN_RECOMMENDATIONS)
+        if len(fallback_rows):
+            # Every career not already eligible: pass probability plus the tie factor
+            fallback_scores = (X[fallback_rows, FEATURE_INDEX['pass_probability'], None]
+                               + self.tie_factors([forms[row] for row in fallback_rows]))
+            scores[fallback_rows] = np.where(eligible[fallback_rows], scores[fallback_rows], fallback_scores)
+            included = eligible.copy()
+            included[fallback_rows] = True
+        else:
+            included = eligible
+        scores[~included] = -np.inf
+        positions = np.where(eligible, self.rule_position, self.fallback_position)
+        return scores, positions
+
+    def top_careers(self, scores, positions):
+        """Top TOP_N (career index, score) per row by score, ties by position."""
+        # lexsort rather than argpartition: a partial selection doesn't keep the tie order
+        order = np.lexsort((positions, -scores), axis=1)[:, :TOP_N]
+        return order, scores[np.arange(len(scores))[:, None], order]
+
+    def probabilities(self, careers, top_scores):
+        """[{'career', 'probability'}, ...] from the top careers and their scores."""
+        total_score = 0.0
+        for score in top_scores:
+            total_score += score
+        if total_score > 0:
+            recommendations = []
+            for career, score in zip(careers, top_scores):
+                # Share of the top-3 total, rounded and clamped to 30-95 (the bounds stay ints, as with max/min)
+                probability = round(score / total_score * 100, 1)
+                probability = 95 if probability >= 95 else 30 if probability <= 30 else probability
+                recommendations.append({'career': self.careers[career], 'probability': probability})
+            return recommendations
+        # Fallback probabilities if scores are all zero
+        return [{'career': self.careers[career], 'probability': 90 - (i * 20)}
+                for i, career in enumerate(careers)]
+
+    def recommend_many(self, forms, pass_probabilities):
+        """Top-3 recommendations ([{'career', 'probability'}, ...]) for each profile."""
+        if len(forms) < VECTORIZE_MIN_ROWS:
+            return [self.recommend(form, pass_probability)
+                    for form, pass_probability in zip(forms, pass_probabilities)]
+        scores, positions = self.score(forms, pass_probabilities)
+        order, top_scores = self.top_careers(scores, positions)
+        # At least MIN_RECOMMENDATIONS careers are always included, so all top scores are finite
+        return [self.probabilities(row_order, row_scores)
+                for row_order, row_scores in zip(order.tolist(), top_scores.tolist())]
+
+    def recommend(self, form, pass_probability):
+        """Top-3 recommendations for one profile: the same rules, evaluated without NumPy."""
+        x = self.feature_row(form, pass_probability)
+        candidates = []
+        eligible = set()
+        for position, career, conditions, terms in self.compiled_rules:
+            for feature, minimum in conditions:
+                if x[feature] < minimum:
+                    break
+            else:
+                score = 0.0
+                for feature, weight in terms:
+                    score = score + x[feature] * weight
+                candidates.append((-score, position, career))
+                eligible.add(career)
+        if len(candidates) < MIN_RECOMMENDATIONS:
+            key_crc = self.key_crc(form)
+            for position, career, career_crc in self.fallback_careers:
+                if career not in eligible:
+                    candidates.append((-(pass_probability + (key_crc ^ career_crc) % TIE_MODULUS), position, career))
+        # At most len(CAREERS) candidates: a sort is cheaper than heapq.nsmallest here
+        candidates.sort()
+        top = candidates[:TOP_N]
+        return self.probabilities([career for _, _, career in top], [-score for score, _, _ in top])
@@ -7,10 +7,13 @@ import json
 import time
 import os
 
+# app.py listens on port 5001; override with API_URL
+API_URL = os.environ.get('API_URL', 'http://localhost:5001')
+
 def test_options_endpoint():
     """Test the /api/options endpoint to get education and skill levels."""
     try:
-        response = requests.get('http://localhost:5000/api/options')
+        response = requests.get(f'{API_URL}/api/options')
         if response.status_code == 200:
             print("✅ Successfully connected to /api/options endpoint")
             print("Data received:", json.dumps(response.json(), indent=2))
@@ -27,6 +30,7 @@ def test_options_endpoint():
 def test_model_exists():
     """Check if the ML model file exists."""
     model_paths = [
+        'student_performance_model.pkl',
         'student_performance_rf_model.pkl',
         'student_performance_xgb_model.pkl'
     ]
@@ -112,7 +116,7 @@ def test_predict_endpoint():
             
             start_time = time.time()
             response = requests.post(
-                'http://localhost:5000/api/predict',
+                f'{API_URL}/api/predict',
                 json=test_case['data'],
                 headers=headers
             )
@@ -162,5 +166,5 @@ if __name__ == "__main__":
         if not model_exists:
             print("\nTo fix the missing model issue:")
             print("1. Run the training script: python train_model.py")
-            print("2. Verify that student_performance_rf_model.pkl or student_performance_xgb_model.pkl is created")
+            print("2. Verify that student_performance_model.pkl is created")
             print("3. Run this test script again") 
\ No newline at end of file
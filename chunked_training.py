@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+Out-of-core training on student records of any size.
+
+train_model.py reads student-mat.csv into memory in one go. This module
+streams any number of ';'-separated CSV files in the UCI student schema
+(by default both data/student-mat.csv and data/student-por.csv) in chunks
+with compact dtypes, so peak memory depends on the chunk size rather than
+on the number of rows:
+
+    pass 1  fit the StandardScaler incrementally (partial_fit) and count classes
+    pass 2  train a RandomForest with warm_start, adding trees fitted on each
+            chunk; class weights from pass 1 stand in for SMOTE, which would
+            need the whole training set in memory
+    pass 3  evaluate on the held-out rows
+
+Rows are assigned to the test split by a hash of the attributes that
+identify a student (MERGE_KEYS), so the split is stable across passes
+without keeping row ids, and a student who is in both course files lands
+on the same side of it in both. The saved model_info has the same columns
+as train_model.py's, so app.py serves it unchanged. It is written to
+DEFAULT_OUTPUT, next to the served model rather than over it; point
+MODEL_PATH at it (or pass --output) to serve it.
+
+    python chunked_training.py train --chunksize 100000
+    python chunked_training.py train institution-2024.csv --output institution_rf_model.pkl
+    python chunked_training.py merge data/student-mat.csv data/student-por.csv merged.csv
+
+`merge` is the Python port of data/student-merge.R: the students present in
+both courses, joined on the attributes that identify a student. Its output
+has a column per course for the grades and other course-specific fields,
+so it is for analysis, not an input to `train`.
+"""
+import argparse
+import json
+import resource
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_FILES = ['data/student-mat.csv', 'data/student-por.csv']
+DEFAULT_CHUNKSIZE = 50000
+DEFAULT_OUTPUT = 'student_performance_chunked_rf_model.pkl'
+TEST_FRACTION = 0.2
+
+YES_NO = ['no', 'yes']
+JOBS = ['at_home', 'health', 'other', 'services', 'teacher']
+
+# Categories are fixed up front (sorted, like pd.get_dummies on object
+# columns) so every chunk one-hot encodes to the same columns
+CATEGORICAL_COLUMNS = {
+    'school': ['GP', 'MS'],
+    'sex': ['F', 'M'],
+    'address': ['R', 'U'],
+    'famsize': ['GT3', 'LE3'],
+    'Pstatus': ['A', 'T'],
+    'Mjob': JOBS,
+    'Fjob': JOBS,
+    'reason': ['course', 'home', 'other', 'reputation'],
+    'guardian': ['father', 'mother', 'other'],
+    'schoolsup': YES_NO,
+    'famsup': YES_NO,
+    'paid': YES_NO,
+    'activities': YES_NO,
+    'nursery': YES_NO,
+    'higher': YES_NO,
+    'internet': YES_NO,
+    'romantic': YES_NO,
+}
+
+# Numeric columns in file order; absences reaches 93, everything else fits int8
+NUMERICAL_COLUMNS = {
+    'age': 'int8', 'Medu': 'int8', 'Fedu': 'int8', 'traveltime': 'int8', 'studytime': 'int8',
+    'failures': 'int8', 'famrel': 'int8', 'freetime': 'int8', 'goout': 'int8', 'Dalc': 'int8',
+    'Walc': 'int8', 'health': 'int8', 'absences': 'int16',
+}
+GRADE_COLUMNS = {'G1': 'int8', 'G2': 'int8', 'G3': 'int8'}
+
+CSV_DTYPES = {
+    **{col: pd.CategoricalDtype(categories) for col, categories in CATEGORICAL_COLUMNS.items()},
+    **NUMERICAL_COLUMNS,
+    **GRADE_COLUMNS,
+}
+
+# Attributes that identify a student across the two course files (see data/student-merge.R)
+MERGE_KEYS = ['school', 'sex', 'age', 'address', 'famsize', 'Pstatus', 'Medu', 'Fedu',
+              'Mjob', 'Fjob', 'reason', 'nursery', 'internet']
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process (ru_maxrss is in KB on Linux, bytes on macOS)."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def check_categories(chunk, path, offset):
+    """Raise ValueError for empty or unknown categorical values.
+
+    CSV_DTYPES turns both into NaN, which one-hot encodes to all zeros. Missing
+    numeric values already fail to parse as integers, so categoricals are
+    rejected the same way rather than trained on silently.
+    """
+    missing = chunk[list(CATEGORICAL_COLUMNS)].isna()
+    if missing.any(axis=None):
+        columns = missing.columns[missing.any()].tolist()
+        first_row = offset + int(np.flatnonzero(missing.any(axis=1).to_numpy())[0])
+        raise ValueError(f"{path}: empty or unknown values in {columns} (first at data row {first_row}); "
+                         f"expected one of {[CATEGORICAL_COLUMNS[col] for col in columns]}")
+
+
+def read_chunks(paths, chunksize):
+    """Yield (global row offset, DataFrame chunk) over all files with compact dtypes."""
+    offset = 0
+    for path in paths:
+        file_offset = 0
+        for chunk in pd.read_csv(path, sep=';', dtype=CSV_DTYPES, chunksize=chunksize):
+            check_categories(chunk, path, file_offset)
+            yield offset, chunk
+            offset += len(chunk)
+            file_offset += len(chunk)
+
+
+def test_mask(chunk):
+    """Boolean test mask for a chunk: about TEST_FRACTION of the students, by a hash of MERGE_KEYS.
+
+    Grouping by student keeps one student's rows from both course files out of
+    the training side when the other is tested.
+    """
+    hashes = pd.util.hash_pandas_object(chunk[MERGE_KEYS], index=False).to_numpy()
+    return (hashes % round(1 / TEST_FRACTION)) == 0
+
+
+def labels(chunk, pass_threshold):
+    return (chunk['G3'].to_numpy() >= pass_threshold).astype(np.int64)
+
+
+def encode_chunk(chunk, scaler):
+    """Scaled numerics followed by one-hot columns, named like train_model.preprocess()."""
+    numerical_cols = list(NUMERICAL_COLUMNS)
+    X_num = pd.DataFrame(scaler.transform(chunk[numerical_cols]), columns=numerical_cols, index=chunk.index)
+    X_cat = pd.get_dummies(chunk[list(CATEGORICAL_COLUMNS)])
+    return pd.concat([X_num, X_cat], axis=1)
+
+
+class PassTimer:
+    """Rows/sec for one pass over the data."""
+
+    def __init__(self, name):
+        self.name = name
+        self.rows = 0
+        self.start = time.perf_counter()
+
+    def add(self, rows):
+        self.rows += rows
+
+    def report(self):
+        seconds = time.perf_counter() - self.start
+        rows_per_second = self.rows / seconds if seconds else 0.0
+        print(f"{self.name}: {self.rows} rows in {seconds:.2f}s ({rows_per_second:,.0f} rows/s), "
+              f"peak RSS {peak_rss_mb():.1f} MB")
+        return {'rows': self.rows, 'seconds': round(seconds, 3), 'rowsPerSecond': round(rows_per_second, 1)}
+
+
+def train(paths, chunksize=DEFAULT_CHUNKSIZE, n_estimators=100, pass_threshold=10, random_state=42):
+    """Three streaming passes; return (model_info, report)."""
+    from sklearn.ensemble import RandomForestClassifier
+    from sklearn.metrics import accuracy_score
+    from sklearn.preprocessing import StandardScaler
+
+    numerical_cols = list(NUMERICAL_COLUMNS)
+    report = {'files': list(paths), 'chunksize': chunksize, 'passes': {}}
+
+    # Pass 1: scaler statistics and class counts of the training rows
+    timer = PassTimer('pass 1 (scaler)')
+    scaler = StandardScaler()
+    class_counts = np.zeros(2, dtype=np.int64)
+    chunks = 0
+    for offset, chunk in read_chunks(paths, chunksize):
+        train_rows = chunk[~test_mask(chunk)]
+        if len(train_rows):
+            scaler.partial_fit(train_rows[numerical_cols])
+            chunk_counts = np.bincount(labels(train_rows, pass_threshold), minlength=2)
+            class_counts += chunk_counts
+            # Only chunks with both classes get trees in pass 2
+            if chunk_counts.all():
+                chunks += 1
+        timer.add(len(chunk))
+    report['passes']['scaler'] = timer.report()
+    if not class_counts.all():
+        raise ValueError(f"Training data needs both classes; class counts: {class_counts.tolist()}")
+    if not chunks:
+        raise ValueError("No chunk has training rows of both classes; use a larger --chunksize")
+
+    # "balanced" weights from the global counts, since each chunk sees only part of the data
+    total = class_counts.sum()
+    class_weight = {label: total / (2 * count) for label, count in enumerate(class_counts)}
+    # At least one tree per chunk, so every chunk contributes
+    total_trees = max(n_estimators, chunks)
+
+    # Pass 2: grow the forest chunk by chunk
+    timer = PassTimer('pass 2 (fit)')
+    model = RandomForestClassifier(n_estimators=0, warm_start=True, class_weight=class_weight,
+                                   random_state=random_state)
+    fitted_chunks = 0
+    for offset, chunk in read_chunks(paths, chunksize):
+        train_rows = chunk[~test_mask(chunk)]
+        if not len(train_rows):
+            continue
+        y = labels(train_rows, pass_threshold)
+        if len(np.unique(y)) < 2:
+            # A single-class chunk would make trees that only know one class
+            print(f"Skipping chunk at row {offset}: only one class")
+            continue
+        fitted_chunks += 1
+        model.set_params(n_estimators=-(-total_trees * fitted_chunks // chunks))  # ceil, never repeats
+        model.fit(encode_chunk(train_rows, scaler), y)
+        timer.add(len(train_rows))
+    report['passes']['fit'] = timer.report()
+
+    # Pass 3: accuracy on the held-out rows
+    timer = PassTimer('pass 3 (evaluate)')
+    correct = 0
+    tested = 0
+    for offset, chunk in read_chunks(paths, chunksize):
+        test_rows = chunk[test_mask(chunk)]
+        if not len(test_rows):
+            continue
+        y = labels(test_rows, pass_threshold)
+        correct += int(accuracy_score(y, model.predict(encode_chunk(test_rows, scaler)), normalize=False))
+        tested += len(test_rows)
+        timer.add(len(test_rows))
+    report['passes']['evaluate'] = timer.report()
+
+    model.set_params(warm_start=False)
+    accuracy = correct / tested if tested else None
+    report.update({
+        'trainRows': int(total),
+        'testRows': tested,
+        'classCounts': class_counts.tolist(),
+        'trees': len(model.estimators_),
+        'testAccuracy': accuracy,
+        'peakRssMb': round(peak_rss_mb(), 1)
+    })
+    model_info = {
+        'model': model,
+        'numerical_cols': pd.Index(numerical_cols, dtype=object),
+        'categorical_cols': pd.Index(list(CATEGORICAL_COLUMNS), dtype=object),
+        'numerical_transformer': scaler
+    }
+    return model_info, report
+
+
+def merge_courses(mat_path, por_path, output_path, chunksize=DEFAULT_CHUNKSIZE):
+    """Write the students present in both files, like data/student-merge.R; return the row count.
+
+    The Portuguese file is the in-memory side of the join; the Math file is streamed.
+    Course-specific columns get _mat / _por suffixes (R's .x / .y).
+    """
+    por = pd.read_csv(por_path, sep=';', dtype=CSV_DTYPES)
+    rows = 0
+    header = True
+    for chunk in pd.read_csv(mat_path, sep=';', dtype=CSV_DTYPES, chunksize=chunksize):
+        merged = chunk.merge(por, on=MERGE_KEYS, suffixes=('_mat', '_por'))
+        merged.to_csv(output_path, sep=';', index=False, mode='w' if header else 'a', header=header)
+        header = False
+        rows += len(merged)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core training on student CSV files.")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    train_parser = commands.add_parser('train', help="train a RandomForest from CSV files in chunks")
+    train_parser.add_argument('files', nargs='*', default=DEFAULT_FILES,
+                              help=f"';'-separated CSVs in the UCI student schema (default: {' '.join(DEFAULT_FILES)})")
+    train_parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE,
+                              help=f"rows per chunk (default {DEFAULT_CHUNKSIZE})")
+    train_parser.add_argument('--n-estimators', type=int, default=100, help="trees in the forest (default 100)")
+    train_parser.add_argument('--output', default=DEFAULT_OUTPUT,
+                              help=f"model file to write (default {DEFAULT_OUTPUT}; serve it with MODEL_PATH)")
+    train_parser.add_argument('--report', help="also write the report as JSON to this file")
+
+    merge_parser = commands.add_parser(
+        'merge', help="students present in both course files",
+        description="Write the students present in both course files, with _mat/_por columns for "
+                    "the course-specific fields. The output is for analysis; train does not read it.")
+    merge_parser.add_argument('mat')
+    merge_parser.add_argument('por')
+    merge_parser.add_argument('output')
+    merge_parser.add_argument('--chunksize', type=int, default=DEFAULT_CHUNKSIZE)
+    args = parser.parse_args()
+
+    if args.command == 'merge':
+        rows = merge_courses(args.mat, args.por, args.output, args.chunksize)
+        print(f"{rows} students in both courses written to {args.output}")
+        return
+
+    import train_model
+
+    start = time.perf_counter()
+    model_info, report = train(args.files, args.chunksize, args.n_estimators,
+                               train_model.PREPROCESS_PARAMS['pass_threshold'])
+    report['totalSeconds'] = round(time.perf_counter() - start, 3)
+    report['rowsPerSecond'] = round(report['passes']['scaler']['rows'] / report['totalSeconds'], 1)
+    print(f"Test accuracy: {report['testAccuracy']:.4f} ({report['testRows']} rows, {report['trees']} trees)")
+    print(f"Total: {report['totalSeconds']}s, {report['rowsPerSecond']:,.0f} rows/s end to end, "
+          f"peak RSS {report['peakRssMb']} MB")
+
+    train_model.save_model(model_info, args.output)
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved as {args.report}")
+
+
+if __name__ == '__main__':
+    main()
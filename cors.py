@@ -0,0 +1,81 @@
+"""
+CORS as a WSGI middleware in front of the Flask app.
+
+Browsers send an OPTIONS preflight before cross-origin POSTs with a JSON
+body. This layer answers preflights with an empty 204 before Flask routes
+the request. The same origin allow-list adds the CORS headers to actual
+responses, so preflight and response never disagree.
+Access-Control-Max-Age lets browsers reuse a preflight result instead of
+repeating it before every request.
+"""
+
+
+class CORSMiddleware:
+    """WSGI middleware answering CORS preflights and adding CORS headers to responses.
+
+    allowed_origins is a list of exact origins, or ['*'] for any origin. With
+    credentials allowed, a wildcard is answered with the request's own
+    origin, since browsers reject "*" together with credentials.
+    """
+
+    def __init__(self, app, allowed_origins, allow_methods=('GET', 'POST', 'OPTIONS'),
+                 allow_headers=('Content-Type', 'Accept'), allow_credentials=False, max_age=7200,
+                 on_preflight=None):
+        self.app = app
+        self.allow_any_origin = '*' in allowed_origins
+        self.allowed_origins = frozenset(origin.rstrip('/') for origin in allowed_origins if origin != '*')
+        self.allow_credentials = allow_credentials
+        # Called with True/False (origin allowed) for every preflight, e.g. to count them
+        self.on_preflight = on_preflight
+
+        # Response headers are fixed except for the echoed origin, so build them once
+        self.vary = not self.allow_any_origin or allow_credentials
+        self.response_headers = [('Access-Control-Allow-Credentials', 'true')] if allow_credentials else []
+        if self.vary:
+            self.response_headers.append(('Vary', 'Origin'))
+        self.preflight_headers = self.response_headers + [
+            ('Access-Control-Allow-Methods', ', '.join(allow_methods)),
+            ('Access-Control-Allow-Headers', ', '.join(allow_headers)),
+            ('Access-Control-Max-Age', str(int(max_age))),
+            ('Content-Length', '0'),
+        ]
+        self.rejected_preflight_headers = [('Vary', 'Origin'), ('Content-Length', '0')]
+
+    def allow_origin_value(self, origin):
+        """The Access-Control-Allow-Origin value for a request origin, or None if it isn't allowed."""
+        if self.allow_any_origin:
+            return origin if self.allow_credentials else '*'
+        return origin if origin.rstrip('/') in self.allowed_origins else None
+
+    def __call__(self, environ, start_response):
+        origin = environ.get('HTTP_ORIGIN')
+        if origin is None:
+            return self.app(environ, start_response)
+
+        allow_origin = self.allow_origin_value(origin)
+        if environ['REQUEST_METHOD'] == 'OPTIONS' and 'HTTP_ACCESS_CONTROL_REQUEST_METHOD' in environ:
+            # Preflight: answered here, without routing, a view or a body
+            if self.on_preflight is not None:
+                self.on_preflight(allow_origin is not None)
+            if allow_origin is None:
+                # No CORS headers: the browser blocks the actual request
+                start_response('204 No Content', self.rejected_preflight_headers)
+            else:
+                start_response('204 No Content',
+                               [('Access-Control-Allow-Origin', allow_origin)] + self.preflight_headers)
+            return []
+
+        if allow_origin is None:
+            return self.app(environ, start_response)
+
+        cors_headers = [('Access-Control-Allow-Origin', allow_origin)] + self.response_headers
+
+        def cors_start_response(status, headers, exc_info=None):
+            return start_response(status, headers + cors_headers, exc_info)
+
+        return self.app(environ, cors_start_response)
+
+
+def parse_list(value):
+    """'a, b,c' -> ['a', 'b', 'c']"""
+    return [item.strip() for item in value.split(',') if item.strip()]
@@ -0,0 +1,152 @@
+"""
+Content-addressed cache of the preprocessed training data.
+
+train_model.py's preprocessing (CSV parse, pass label, scaling, one-hot
+encoding, train/test split and SMOTE) depends only on the input CSV files, a
+few parameters and the library versions. The cache key is a SHA-256 over all
+of them. An entry is a directory of .npy arrays, one per dtype block of each
+frame, plus a JSON header with the column names. A repeated run with
+unchanged inputs loads the matrices with a few reads, without per-column
+conversion, and goes straight to model fitting.
+
+Bump FEATURE_CACHE_VERSION when the preprocessing code changes in a way the
+key can't see.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+FEATURE_CACHE_VERSION = 1
+HEADER_NAME = 'header.json'
+
+# DataFrame / Series entries of the prepared data dict
+FRAMES = ['X_train', 'X_test', 'X_train_resampled']
+SERIES = ['y_train', 'y_test', 'y_train_resampled']
+# StandardScaler attributes stored as arrays
+SCALER_ARRAYS = ['mean_', 'var_', 'scale_']
+
+
+def library_versions():
+    import imblearn
+    import sklearn
+    return {'numpy': np.__version__, 'pandas': pd.__version__,
+            'sklearn': sklearn.__version__, 'imblearn': imblearn.__version__}
+
+
+def cache_key(input_paths, params):
+    """SHA-256 over the input file contents, preprocessing parameters and library versions."""
+    digest = hashlib.sha256()
+    header = {'version': FEATURE_CACHE_VERSION, 'params': params, 'libraries': library_versions()}
+    digest.update(json.dumps(header, sort_keys=True).encode())
+    for path in input_paths:
+        digest.update(os.path.basename(path).encode())
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+def save_prepared(cache_dir, key, prepared):
+    """Write a prepared data dict under cache_dir/key (atomically: a temp dir renamed into place)."""
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_path = os.path.join(cache_dir, key)
+    temp_path = tempfile.mkdtemp(prefix=f'.{key[:12]}-', dir=cache_dir)
+    header = {'version': FEATURE_CACHE_VERSION, 'key': key, 'frames': {}, 'series': {}}
+
+    for name in FRAMES:
+        frame = prepared[name]
+        # Group columns by dtype (scaled numerics are float64, one-hot columns bool)
+        blocks = {}
+        for col, dtype in zip(frame.columns, frame.dtypes):
+            blocks.setdefault(str(dtype), []).append(str(col))
+        block_entries = []
+        for i, (dtype, columns) in enumerate(blocks.items()):
+            file_name = f'{name}_{i}.npy'
+            np.save(os.path.join(temp_path, file_name), frame[columns].to_numpy(dtype=dtype))
+            block_entries.append({'file': file_name, 'dtype': dtype, 'columns': columns})
+        np.save(os.path.join(temp_path, f'{name}_index.npy'), frame.index.to_numpy())
+        header['frames'][name] = {
+            'columns': [str(col) for col in frame.columns],
+            'blocks': block_entries
+        }
+    for name in SERIES:
+        series = prepared[name]
+        np.save(os.path.join(temp_path, f'{name}.npy'), series.to_numpy())
+        np.save(os.path.join(temp_path, f'{name}_index.npy'), series.index.to_numpy())
+        header['series'][name] = {'name': series.name}
+
+    scaler = prepared['numerical_transformer']
+    for attribute in SCALER_ARRAYS:
+        np.save(os.path.join(temp_path, f'scaler_{attribute}.npy'), getattr(scaler, attribute))
+    header['scaler'] = {
+        'n_samples_seen_': int(scaler.n_samples_seen_),
+        'feature_names_in_': [str(col) for col in scaler.feature_names_in_]
+    }
+    header['numerical_cols'] = [str(col) for col in prepared['numerical_cols']]
+    header['categorical_cols'] = [str(col) for col in prepared['categorical_cols']]
+
+    # The header goes last, so an entry with a header has all its arrays
+    with open(os.path.join(temp_path, HEADER_NAME), 'w') as f:
+        json.dump(header, f, indent=2)
+    if os.path.exists(entry_path):
+        # Move the old entry aside before the rename, so the key never names a half-deleted entry
+        stale_path = tempfile.mkdtemp(prefix=f'.{key[:12]}-stale-', dir=cache_dir)
+        os.replace(entry_path, os.path.join(stale_path, key))
+        os.replace(temp_path, entry_path)
+        shutil.rmtree(stale_path, ignore_errors=True)
+    else:
+        os.replace(temp_path, entry_path)
+    return entry_path
+
+
+def load_prepared(cache_dir, key):
+    """Return the prepared data dict stored under key, or None if there is no valid entry."""
+    entry_path = os.path.join(cache_dir, key)
+    try:
+        with open(os.path.join(entry_path, HEADER_NAME)) as f:
+            header = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    if header.get('version') != FEATURE_CACHE_VERSION or header.get('key') != key:
+        return None
+    try:
+        return _read_entry(entry_path, header)
+    except (OSError, ValueError, KeyError):
+        # Missing or truncated arrays: a miss, and the caller rebuilds the entry
+        return None
+
+
+def _read_entry(entry_path, header):
+    from sklearn.preprocessing import StandardScaler
+
+    prepared = {}
+    for name, frame_info in header['frames'].items():
+        index = np.load(os.path.join(entry_path, f'{name}_index.npy'))
+        parts = [pd.DataFrame(np.load(os.path.join(entry_path, block['file'])), columns=block['columns'],
+                              index=index, copy=False)
+                 for block in frame_info['blocks']]
+        frame = pd.concat(parts, axis=1) if len(parts) > 1 else parts[0]
+        if list(frame.columns) != frame_info['columns']:
+            frame = frame[frame_info['columns']]
+        prepared[name] = frame
+    for name, series_info in header['series'].items():
+        prepared[name] = pd.Series(np.load(os.path.join(entry_path, f'{name}.npy')),
+                                   index=np.load(os.path.join(entry_path, f'{name}_index.npy')),
+                                   name=series_info['name'])
+
+    scaler = StandardScaler()
+    for attribute in SCALER_ARRAYS:
+        setattr(scaler, attribute, np.load(os.path.join(entry_path, f'scaler_{attribute}.npy')))
+    scaler.n_samples_seen_ = header['scaler']['n_samples_seen_']
+    scaler.feature_names_in_ = np.asarray(header['scaler']['feature_names_in_'], dtype=object)
+    scaler.n_features_in_ = len(scaler.feature_names_in_)
+    prepared['numerical_transformer'] = scaler
+    prepared['numerical_cols'] = pd.Index(header['numerical_cols'], dtype=object)
+    prepared['categorical_cols'] = pd.Index(header['categorical_cols'], dtype=object)
+    return prepared
+
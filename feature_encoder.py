@@ -0,0 +1,104 @@
+"""
+Array-based feature encoder for the student performance model.
+
+Replaces the per-request pandas pipeline (DataFrame -> get_dummies -> reindex ->
+concat) with a lookup table built once when the model is loaded. Encoding a
+student is then just filling a preallocated float64 vector.
+"""
+import numpy as np
+
+
+class FeatureEncoder:
+    """Encode mapped student dicts into the column order the model was trained on."""
+
+    def __init__(self, feature_names, numerical_cols, categorical_cols,
+                 numerical_transformer, categories=None):
+        self.feature_names = [str(name) for name in feature_names]
+        self.numerical_cols = [str(col) for col in numerical_cols]
+        self.categorical_cols = [str(col) for col in categorical_cols]
+        self.n_features = len(self.feature_names)
+
+        column_index = {name: i for i, name in enumerate(self.feature_names)}
+
+        # Every numerical column must be present in the model's features
+        missing = [col for col in self.numerical_cols if col not in column_index]
+        if missing:
+            raise ValueError(f"Model is missing numerical features: {missing}")
+        self.numerical_index = np.array(
+            [column_index[col] for col in self.numerical_cols], dtype=np.intp)
+
+        # Scaler statistics as plain arrays (StandardScaler: (x - mean_) / scale_)
+        mean = getattr(numerical_transformer, 'mean_', None)
+        scale = getattr(numerical_transformer, 'scale_', None)
+        n_num = len(self.numerical_cols)
+        self.mean = (np.zeros(n_num) if mean is None
+                     else np.asarray(mean, dtype=np.float64).copy())
+        self.scale = (np.ones(n_num) if scale is None
+                      else np.asarray(scale, dtype=np.float64).copy())
+
+        # One-hot slot for every (categorical column, value) pair the model knows.
+        # pd.get_dummies names these columns "<col>_<value>".
+        self.one_hot_slots = {}
+        categorical_set = set(self.categorical_cols)
+        for name, index in column_index.items():
+            if name in self.numerical_cols:
+                continue
+            for col in self.categorical_cols:
+                prefix = col + '_'
+                if name.startswith(prefix):
+                    self.one_hot_slots[(col, name[len(prefix):])] = index
+        for col, values in (categories or {}).items():
+            if col not in categorical_set:
+                continue
+            for value in values:
+                slot = column_index.get(f"{col}_{value}")
+                if slot is not None:
+                    self.one_hot_slots[(col, value)] = slot
+
+        unmatched = set(range(self.n_features)) - set(self.numerical_index.tolist()) \
+            - set(self.one_hot_slots.values())
+        if unmatched:
+            names = [self.feature_names[i] for i in sorted(unmatched)]
+            raise ValueError(f"Cannot map model features to inputs: {names}")
+
+        # Student field behind every column (one-hot columns share theirs), so values
+        # computed per column, like explanations, can be summed back per field
+        self.fields = self.numerical_cols + self.categorical_cols
+        field_index = {field: i for i, field in enumerate(self.fields)}
+        self.field_matrix = np.zeros((self.n_features, len(self.fields)))
+        self.field_matrix[self.numerical_index, np.arange(len(self.numerical_cols))] = 1.0
+        for (col, _), slot in self.one_hot_slots.items():
+            self.field_matrix[slot, field_index[col]] = 1.0
+
+    def encode_into(self, student_data, out):
+        """Write the encoded vector for one student into `out` (1-D, zeroed)."""
+        num = np.fromiter((student_data[col] for col in self.numerical_cols),
+                          dtype=np.float64, count=len(self.numerical_cols))
+        num -= self.mean
+        num /= self.scale
+        out[self.numerical_index] = num
+
+        slots = self.one_hot_slots
+        for col in self.categorical_cols:
+            # Values the model never saw get no column, exactly like reindex() drops them
+            slot = slots.get((col, student_data[col]))
+            if slot is not None:
+                out[slot] = 1.0
+        return out
+
+    def encode(self, student_data):
+        """Encode one student into a (1, n_features) float64 array."""
+        out = np.zeros((1, self.n_features), dtype=np.float64)
+        self.encode_into(student_data, out[0])
+        return out
+
+    def encode_many(self, students):
+        """Encode a sequence of students into an (n, n_features) float64 array."""
+        out = np.zeros((len(students), self.n_features), dtype=np.float64)
+        for row, student_data in zip(out, students):
+            self.encode_into(student_data, row)
+        return out
+
+    def aggregate_fields(self, column_values):
+        """Sum (n, n_features) per-column values into (n, len(fields)) per-field values."""
+        return column_values @ self.field_matrix
@@ -0,0 +1,44 @@
+"""
+Production server configuration.
+
+Run with:
+
+    gunicorn -c gunicorn.conf.py
+
+The app (and with it the model) is loaded once in the master process before
+the workers are forked, so every worker shares the loaded forest pages
+copy-on-write instead of unpickling its own copy. Debug mode is never enabled.
+"""
+import gc
+import multiprocessing
+import os
+import sys
+
+# The model must be loaded before the workers are forked: a background load
+# thread would still be running in the master at fork time, and the workers
+# would inherit a half-finished load that no thread of theirs completes
+if os.environ.get('BACKGROUND_MODEL_LOAD', '0') == '1':
+    print("BACKGROUND_MODEL_LOAD is ignored under gunicorn; the model is preloaded before forking", file=sys.stderr)
+os.environ['BACKGROUND_MODEL_LOAD'] = '0'
+
+wsgi_app = 'app:app'
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:5001')
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('GUNICORN_THREADS', 1))
+worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+
+# Load app.py (and the model) in the master before forking
+preload_app = True
+
+accesslog = os.environ.get('GUNICORN_ACCESS_LOG')  # e.g. '-' for stdout; off by default
+loglevel = os.environ.get('GUNICORN_LOG_LEVEL', 'info')
+
+
+def when_ready(server):
+    # Move everything loaded so far into the permanent generation so the
+    # workers' garbage collector never touches (and copies) the model pages
+    gc.freeze()
+    server.log.info(f"Model preloaded; forking {workers} workers x {threads} threads")
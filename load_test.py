@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Concurrent load generator for the Flask API.
+
+Drives /api/predict, /api/options and /api/predict/batch with randomized but
+valid form payloads (education and skill levels come from /api/options, the
+numeric fields use the form's ranges), either against a live server or
+in-process through the Flask test client, and writes a JSON report with
+throughput, latency percentiles and error rates per endpoint.
+
+Examples:
+
+    python load_test.py --url http://localhost:5001 --concurrency 16 --duration 30
+    python load_test.py --in-process --requests 2000 --mix predict=8,options=1,batch=1
+    python load_test.py --rate 200 --duration 60 --output after.json --compare before.json
+
+With --rate the requests are sent on a fixed schedule and latency is measured
+from each request's scheduled start, so a server that falls behind is not
+hidden by the client waiting for it.
+"""
+import argparse
+import itertools
+import json
+import math
+import os
+import random
+import threading
+import time
+
+DEFAULT_URL = os.environ.get('API_URL', 'http://localhost:5001')
+
+ENDPOINTS = {
+    # name: (method, path)
+    'predict': ('POST', '/api/predict'),
+    'options': ('GET', '/api/options'),
+    'batch': ('POST', '/api/predict/batch'),
+}
+
+SKILL_FIELDS = ['technicalSkills', 'communicationSkills', 'analyticalThinking', 'creativity', 'leadership']
+SCORE_FIELDS = ['interestScience', 'interestArts', 'interestBusiness',
+                'personalityExtroversion', 'personalityOpenness', 'personalityConscientiousness']
+
+
+class HttpClient:
+    """requests-based client against a live server; one session per thread."""
+
+    def __init__(self, base_url):
+        import requests
+        self.requests = requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = self.requests.Session()
+        response = session.request(method, self.base_url + path, json=payload, timeout=30)
+        return response.status_code, response.content
+
+
+class InProcessClient:
+    """Flask test client; the app (and model) are loaded in this process."""
+
+    def __init__(self):
+        import app
+        self.app = app.app
+        self._local = threading.local()
+
+    def request(self, method, path, payload=None):
+        client = getattr(self._local, 'client', None)
+        if client is None:
+            client = self._local.client = self.app.test_client()
+        response = client.open(path, method=method, json=payload)
+        return response.status_code, response.get_data()
+
+
+class PayloadGenerator:
+    """Random valid form payloads."""
+
+    def __init__(self, education_levels, skill_levels, seed=None):
+        self.education_levels = education_levels
+        self.skill_levels = skill_levels
+        self.random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def profile(self):
+        with self._lock:
+            data = {
+                'education': self.random.choice(self.education_levels),
+                'yearsExperience': self.random.randint(0, 50)
+            }
+            for field in SKILL_FIELDS:
+                data[field] = self.random.choice(self.skill_levels)
+            for field in SCORE_FIELDS:
+                data[field] = self.random.randint(1, 10)
+        return data
+
+    def batch(self, size):
+        return [self.profile() for _ in range(size)]
+
+
+def fetch_levels(client):
+    """Education and skill levels as served by /api/options."""
+    status, body = client.request('GET', '/api/options')
+    if status != 200:
+        raise SystemExit(f"/api/options returned {status}; is the server running?")
+    options = json.loads(body)
+    return options['educationLevels'], options['skillLevels']
+
+
+def parse_mix(mix):
+    """'predict=8,options=1' -> ['predict'] * 8 + ['options']"""
+    schedule = []
+    for part in mix.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in ENDPOINTS:
+            raise SystemExit(f"Unknown endpoint '{name}'; choose from {', '.join(ENDPOINTS)}")
+        schedule.extend([name] * int(weight or 1))
+    return schedule
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def summarize(samples, elapsed):
+    """Aggregate (latency seconds, status, error) samples."""
+    latencies = sorted(latency for latency, _, _ in samples)
+    errors = sum(1 for _, _, error in samples if error)
+    status_codes = {}
+    error_types = {}
+    for _, status, error in samples:
+        status_codes[str(status)] = status_codes.get(str(status), 0) + 1
+        if error:
+            error_types[error] = error_types.get(error, 0) + 1
+
+    def ms(value):
+        return round(value * 1000, 3) if value is not None else None
+
+    return {
+        'requests': len(samples),
+        'errors': errors,
+        'errorRate': round(errors / len(samples), 4) if samples else 0.0,
+        'throughput': round(len(samples) / elapsed, 2) if elapsed else 0.0,
+        'latencyMs': {
+            'mean': ms(sum(latencies) / len(latencies)) if latencies else None,
+            'p50': ms(percentile(latencies, 50)),
+            'p95': ms(percentile(latencies, 95)),
+            'p99': ms(percentile(latencies, 99)),
+            'max': ms(latencies[-1]) if latencies else None
+        },
+        'statusCodes': status_codes,
+        'errorTypes': error_types
+    }
+
+
+def classify(endpoint, status, body):
+    """Error type for a response, or None if it is a valid success."""
+    if status >= 400:
+        try:
+            return json.loads(body).get('error', f'HTTP {status}')
+        except (ValueError, AttributeError):
+            return f'HTTP {status}'
+    try:
+        result = json.loads(body)
+    except ValueError:
+        return 'Invalid JSON'
+    if endpoint == 'predict' and 'recommendations' not in result:
+        return 'Missing recommendations'
+    if endpoint == 'batch' and result.get('failed'):
+        return 'Batch item errors'
+    return None
+
+
+def run_load(client, generator, mix, concurrency, total_requests=None, duration=None,
+             rate=None, batch_size=10):
+    """Send requests from `concurrency` threads; return ({endpoint: samples}, elapsed seconds)."""
+    samples = {name: [] for name in set(mix)}
+    counter = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration if duration else None
+
+    def worker():
+        local_samples = {name: [] for name in samples}
+        while True:
+            index = next(counter)
+            if total_requests is not None and index >= total_requests:
+                break
+            scheduled = start + index / rate if rate else None
+            now = time.perf_counter()
+            if deadline is not None and (scheduled or now) >= deadline:
+                break
+            if scheduled is not None and scheduled > now:
+                time.sleep(scheduled - now)
+
+            endpoint = mix[index % len(mix)]
+            method, path = ENDPOINTS[endpoint]
+            payload = None
+            if endpoint == 'predict':
+                payload = generator.profile()
+            elif endpoint == 'batch':
+                payload = generator.batch(batch_size)
+
+            sent = time.perf_counter()
+            try:
+                status, body = client.request(method, path, payload)
+                error = classify(endpoint, status, body)
+            except Exception as e:
+                status, error = 0, type(e).__name__
+            latency = time.perf_counter() - (scheduled if scheduled is not None else sent)
+            local_samples[endpoint].append((latency, status, error))
+
+        for name, values in local_samples.items():
+            samples[name].extend(values)  # list.extend is atomic under the GIL
+
+    threads = [threading.Thread(target=worker, name=f'load-{i}') for i in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+
+def compare_reports(baseline, report):
+    """Print throughput and latency changes against a baseline report."""
+    print(f"\nCompared with {baseline.get('startedAt', 'baseline')}:")
+    for name in sorted(set(baseline['endpoints']) | set(report['endpoints'])):
+        before = baseline['endpoints'].get(name)
+        after = report['endpoints'].get(name)
+        if before is None or after is None:
+            print(f"  {name}: only in {'baseline' if after is None else 'this run'}")
+            continue
+        parts = []
+        for label, old, new in [('throughput', before['throughput'], after['throughput']),
+                                ('p50', before['latencyMs']['p50'], after['latencyMs']['p50']),
+                                ('p99', before['latencyMs']['p99'], after['latencyMs']['p99'])]:
+            change = f"{(new - old) / old * 100:+.1f}%" if old else 'n/a'
+            parts.append(f"{label} {old} -> {new} ({change})")
+        parts.append(f"errors {before['errorRate']} -> {after['errorRate']}")
+        print(f"  {name}: " + ', '.join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the career prediction API.")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument('--url', default=DEFAULT_URL, help=f"server base URL (default {DEFAULT_URL})")
+    target.add_argument('--in-process', action='store_true', help="use the Flask test client instead of HTTP")
+    parser.add_argument('--mix', default='predict=1', help="endpoint weights, e.g. predict=8,options=1,batch=1")
+    parser.add_argument('--concurrency', type=int, default=8, help="client threads (default 8)")
+    parser.add_argument('--rate', type=float, default=0, help="target requests/second across all threads (default: as fast as possible)")
+    parser.add_argument('--requests', type=int, help="total requests to send")
+    parser.add_argument('--duration', type=float, help="seconds to run (default 10 unless --requests is given)")
+    parser.add_argument('--batch-size', type=int, default=10, help="profiles per batch request (default 10)")
+    parser.add_argument('--seed', type=int, help="random seed for the payloads")
+    parser.add_argument('--output', help="write the JSON report to this file")
+    parser.add_argument('--compare', help="baseline JSON report to compare against")
+    args = parser.parse_args()
+
+    duration = args.duration if args.duration or args.requests else 10.0
+    client = InProcessClient() if args.in_process else HttpClient(args.url)
+    education_levels, skill_levels = fetch_levels(client)
+    generator = PayloadGenerator(education_levels, skill_levels, args.seed)
+    mix = parse_mix(args.mix)
+
+    started_at = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())
+    samples, elapsed = run_load(client, generator, mix, args.concurrency, args.requests,
+                                duration, args.rate or None, args.batch_size)
+
+    report = {
+        'startedAt': started_at,
+        'target': 'in-process' if args.in_process else args.url,
+        'config': {
+            'mix': args.mix,
+            'concurrency': args.concurrency,
+            'rate': args.rate or None,
+            'requests': args.requests,
+            'duration': duration,
+            'batchSize': args.batch_size,
+            'seed': args.seed
+        },
+        'elapsedSeconds': round(elapsed, 3),
+        'total': summarize([sample for values in samples.values() for sample in values], elapsed),
+        'endpoints': {name: summarize(values, elapsed) for name, values in sorted(samples.items())}
+    }
+
+    print(json.dumps(report, indent=2))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare_reports(json.load(f), report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Logging setup for the API server.
+
+Log records are put on a bounded in-memory queue by the request threads and
+written to stdout and a size-rotated file by a background listener thread, so
+formatting and disk I/O never run on the request path.
+
+Only the process that configured logging (gunicorn's master with
+preload_app, the async server, bulk_score.py's driver) opens and rotates
+the log file. Processes forked from it, such as gunicorn workers and
+process-pool workers, write to stdout themselves and send their records
+for the file to the parent over a multiprocessing queue. Without that,
+each one would keep its own RotatingFileHandler on the same file and roll
+it over under the others. Spawned worker processes log to stdout only.
+Settings come from the environment:
+
+    LOG_LEVEL                 root log level (default INFO)
+    LOG_FILE                  log file path (default backend.log; empty disables it)
+    LOG_MAX_BYTES             rotate the log file at this size (default 10 MB)
+    LOG_BACKUP_COUNT          rotated files to keep (default 5)
+    LOG_QUEUE_SIZE            records buffered before new ones are dropped (default 10000)
+    LOG_PAYLOADS              set to 1 to log request payloads (default 0)
+    LOG_PAYLOAD_SAMPLE_RATE   log the payload of 1 in N requests (default 100)
+"""
+import atexit
+import itertools
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import queue
+import sys
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops (and counts) records when the queue is full instead of blocking."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class PayloadSampler:
+    """Decide whether to log a request payload: disabled, or 1 in every `rate` requests."""
+
+    def __init__(self, enabled, rate):
+        self.enabled = enabled
+        self.rate = max(1, int(rate))
+        self._counter = itertools.count()
+
+    def sample(self):
+        if not self.enabled:
+            return False
+        # next() on itertools.count is atomic under the GIL
+        return next(self._counter) % self.rate == 0
+
+
+class FileQueueListener(logging.handlers.QueueListener):
+    """Listener for the records forked children send to the log file; waits for room for the stop sentinel."""
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=5)
+
+
+_queue_handler = None
+_listener = None
+# The log file's handler, its owner process and the queue forked children send file records on
+_file_handler = None
+_file_owner_pid = None
+_file_queue = None
+_file_listener = None
+# In forked children: the handler putting records on _file_queue
+_file_forwarder = None
+
+
+def _create_file_handler():
+    log_file = os.environ.get('LOG_FILE', 'backend.log')
+    if not log_file:
+        return None
+    handler = logging.handlers.RotatingFileHandler(
+        log_file,
+        maxBytes=int(os.environ.get('LOG_MAX_BYTES', 10 * 1024 * 1024)),
+        backupCount=int(os.environ.get('LOG_BACKUP_COUNT', 5))
+    )
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    return handler
+
+
+def _output_handlers():
+    global _file_forwarder
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handlers = [stream_handler]
+    if _file_handler is not None:
+        if os.getpid() == _file_owner_pid:
+            handlers.append(_file_handler)
+        else:
+            # Forked child: the parent writes (and rotates) the file
+            _file_forwarder = DroppingQueueHandler(_file_queue)
+            handlers.append(_file_forwarder)
+    return handlers
+
+
+def _start_listener():
+    """(Re)create the queue and the listener thread that drains it."""
+    global _listener
+    log_queue = queue.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    _queue_handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_output_handlers(), respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+    if _file_listener is not None and os.getpid() == _file_owner_pid:
+        _file_listener.stop()
+
+
+def configure_logging():
+    """Route all logging through the background queue; safe to call more than once."""
+    global _queue_handler
+    if _queue_handler is not None:
+        return _queue_handler
+
+    root = logging.getLogger()
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+    _queue_handler = DroppingQueueHandler(None)
+    root.addHandler(_queue_handler)
+    # Spawned workers (multiprocessing children that imported this module afresh) leave the file to their parent
+    if multiprocessing.parent_process() is None:
+        _start_file_listener()
+    _start_listener()
+    atexit.register(_stop_listener)
+
+    # The listener thread doesn't survive fork(); pre-forked workers start their own
+    # with a fresh queue, forwarding file records to this process
+    if hasattr(os, 'register_at_fork'):
+        os.register_at_fork(after_in_child=_start_listener)
+    return _queue_handler
+
+
+def _start_file_listener():
+    """Open the log file in this process and drain the records forked children send for it."""
+    global _file_handler, _file_owner_pid, _file_queue, _file_listener
+    _file_handler = _create_file_handler()
+    if _file_handler is None:
+        return
+    _file_owner_pid = os.getpid()
+    _file_queue = multiprocessing.Queue(maxsize=int(os.environ.get('LOG_QUEUE_SIZE', 10000)))
+    _file_listener = FileQueueListener(_file_queue, _file_handler, respect_handler_level=True)
+    _file_listener.start()
+
+
+def payload_sampler_from_env():
+    return PayloadSampler(
+        os.environ.get('LOG_PAYLOADS', '0') == '1',
+        os.environ.get('LOG_PAYLOAD_SAMPLE_RATE', 100)
+    )
+
+
+def dropped_records():
+    """Number of log records dropped because the queue (or, in forked children, the file queue) was full."""
+    dropped = _queue_handler.dropped if _queue_handler is not None else 0
+    if _file_forwarder is not None:
+        dropped += _file_forwarder.dropped
+    return dropped
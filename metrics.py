@@ -0,0 +1,177 @@
+"""
+Lock-light metrics with Prometheus text exposition.
+
+Every thread records into its own shard (a plain dict only that thread writes
+to), so observing a latency or bumping a counter takes no lock. The registry
+lock is only taken when a thread records its first value and when /metrics
+sums the shards. Shards of threads that have exited are folded into a retired
+total so per-request threads (the Flask dev server) don't grow the shard list.
+"""
+import bisect
+import threading
+
+# Upper bounds in seconds, from 50 microseconds (table hits) to 10 seconds
+DEFAULT_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01,
+                   0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Fold dead threads' shards once this many shards exist
+MAX_SHARDS = 64
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    if isinstance(value, float) and value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _ShardedMetric:
+    """Base class: per-thread shards of {label values: state}."""
+
+    kind = None
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._shards = []  # (thread, shard dict)
+        self._retired = {}
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                if len(self._shards) >= MAX_SHARDS:
+                    self._fold_dead_shards()
+                self._shards.append((threading.current_thread(), shard))
+        return shard
+
+    def _fold_dead_shards(self):
+        # Caller holds self._lock; a dead thread no longer writes to its shard
+        live = []
+        for thread, shard in self._shards:
+            if thread.is_alive():
+                live.append((thread, shard))
+            else:
+                for labels, state in shard.items():
+                    self._merge(self._retired, labels, state)
+        self._shards = live
+
+    def _merge(self, target, labels, state):
+        raise NotImplementedError
+
+    def collect(self):
+        """Return {label values: merged state} over all shards."""
+        with self._lock:
+            self._fold_dead_shards()
+            totals = {}
+            for labels, state in self._retired.items():
+                self._merge(totals, labels, state)
+            for _, shard in self._shards:
+                # Copy first: the owning thread may add label sets concurrently
+                for labels, state in list(shard.items()):
+                    self._merge(totals, labels, state)
+        return totals
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} {self.kind}']
+        for labels, state in sorted(self.collect().items()):
+            lines.extend(self._render_state(labels, state))
+        return lines
+
+
+class Counter(_ShardedMetric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    def _merge(self, target, labels, state):
+        target[labels] = target.get(labels, 0) + state
+
+    def _render_state(self, labels, value):
+        return [f'{self.name}{_format_labels(self.label_names, labels)} {_format_value(value)}']
+
+
+class Histogram(_ShardedMetric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, label_names)
+        self.buckets = tuple(buckets)
+
+    def observe(self, seconds, *label_values):
+        shard = self._shard()
+        state = shard.get(label_values)
+        if state is None:
+            # Per-bucket counts (non-cumulative, last slot is +Inf), then sum and count
+            state = shard[label_values] = [0] * (len(self.buckets) + 1) + [0.0, 0]
+        state[bisect.bisect_left(self.buckets, seconds)] += 1
+        state[-2] += seconds
+        state[-1] += 1
+
+    def _merge(self, target, labels, state):
+        merged = target.get(labels)
+        if merged is None:
+            target[labels] = list(state)
+        else:
+            for i, value in enumerate(state):
+                merged[i] += value
+
+    def _render_state(self, labels, state):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), state):
+            cumulative += count
+            label_text = _format_labels(self.label_names, labels, [('le', _format_value(bound))])
+            lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+        label_text = _format_labels(self.label_names, labels)
+        lines.append(f'{self.name}_sum{label_text} {_format_value(state[-2])}')
+        lines.append(f'{self.name}_count{label_text} {state[-1]}')
+        return lines
+
+
+class MetricsRegistry:
+    """Holds the metrics and renders them together with values read at scrape time."""
+
+    def __init__(self):
+        self.metrics = []
+
+    def counter(self, name, documentation, label_names=()):
+        metric = Counter(name, documentation, label_names)
+        self.metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        metric = Histogram(name, documentation, label_names, buckets)
+        self.metrics.append(metric)
+        return metric
+
+    def render(self, samples=()):
+        """Prometheus text format.
+
+        `samples` adds values read at scrape time, as a list of
+        (name, type, documentation, [(labels dict, value)]).
+        """
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        for name, kind, documentation, values in samples:
+            lines.append(f'# HELP {name} {documentation}')
+            lines.append(f'# TYPE {name} {kind}')
+            for labels, value in values:
+                lines.append(f'{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
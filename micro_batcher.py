@@ -0,0 +1,110 @@
+"""
+Micro-batching request coalescer.
+
+Request threads submit single rows; a dispatcher thread collects them and
+flushes them to the model as one batch when either `max_batch_size` rows are
+queued or `max_wait` seconds have passed since the first queued row. Each
+caller blocks until its own row's result is available.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-row calls into batched calls to `score_batch`.
+
+    `score_batch(items)` receives a list of submitted items and must return a
+    sequence of results in the same order. If given, `on_flush(reason, size,
+    queue_waits)` is called after each batch with the flush reason ('size' or
+    'timeout'), the batch size and each row's seconds spent queued.
+    """
+
+    def __init__(self, score_batch, max_batch_size=32, max_wait=0.002, on_flush=None):
+        self.score_batch = score_batch
+        self.on_flush = on_flush
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait))
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.batches = 0
+        self.rows = 0
+        self.largest_batch = 0
+        self.size_flushes = 0
+        self.timeout_flushes = 0
+        self.total_wait = 0.0
+
+    def submit(self, item):
+        """Queue one item and block until its result is ready."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((item, future, time.perf_counter()))
+        return future.result()
+
+    def _ensure_started(self):
+        # Started lazily so that pre-forked workers each get their own dispatcher
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._flush(batch)
+
+    def _flush(self, batch):
+        flushed_at = time.perf_counter()
+        items = [item for item, _, _ in batch]
+        try:
+            results = self.score_batch(items)
+        except Exception as e:
+            for _, future, _ in batch:
+                future.set_exception(e)
+        else:
+            for (_, future, _), result in zip(batch, results):
+                future.set_result(result)
+
+        reason = 'size' if len(batch) >= self.max_batch_size else 'timeout'
+        queue_waits = [flushed_at - queued_at for _, _, queued_at in batch]
+        with self._stats_lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self.largest_batch = max(self.largest_batch, len(batch))
+            if reason == 'size':
+                self.size_flushes += 1
+            else:
+                self.timeout_flushes += 1
+            self.total_wait += sum(queue_waits)
+        if self.on_flush is not None:
+            self.on_flush(reason, len(batch), queue_waits)
+
+    def stats(self):
+        """Configuration and batch-size counters."""
+        with self._stats_lock:
+            return {
+                'maxBatchSize': self.max_batch_size,
+                'maxWaitMs': self.max_wait * 1000,
+                'batches': self.batches,
+                'rows': self.rows,
+                'averageBatchSize': round(self.rows / self.batches, 2) if self.batches else 0.0,
+                'largestBatch': self.largest_batch,
+                'sizeFlushes': self.size_flushes,
+                'timeoutFlushes': self.timeout_flushes,
+                'averageQueueWaitMs': round(self.total_wait / self.rows * 1000, 3) if self.rows else 0.0,
+                'queueDepth': self._queue.qsize()
+            }
@@ -0,0 +1,207 @@
+"""
+Memory-mapped model artifact.
+
+An alternative to the pickled model_info dict: a directory holding the
+flattened tree arrays (see tree_engine.FlatForest) and the scaler statistics
+as raw .npy files, plus a manifest.json header with the schema version, column
+vocabularies and a checksum per array. Loading opens every array with
+np.load(mmap_mode='r'), so startup does no unpickling and all server processes
+on a host share one physical copy of the model through the page cache.
+
+Convert an existing pickle with:
+
+    python model_artifact.py student_performance_model.pkl
+"""
+import hashlib
+import json
+import os
+import shutil
+import sys
+
+import numpy as np
+
+from tree_engine import FlatForest
+
+ARTIFACT_FORMAT = 'student-performance-flat-forest'
+SCHEMA_VERSION = 1
+MANIFEST_NAME = 'manifest.json'
+
+# FlatForest attributes stored as arrays
+FOREST_ARRAYS = ['feature', 'threshold', 'default_left', 'left', 'right', 'value', 'roots']
+# Precomputed explanation arrays (FlatForest.contributions), shared by every process
+# like the trees; artifacts written without them build them on the first explanation
+CONTRIBUTION_ARRAYS = ['leaf_index', 'leaf_contributions']
+
+
+class ScalerStats:
+    """Minimal stand-in for the fitted StandardScaler: mean_/scale_ and transform()."""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        X -= self.mean_
+        X /= self.scale_
+        return X
+
+
+def artifact_path_for(model_path):
+    """student_performance_model.pkl -> student_performance_model.mmap"""
+    return os.path.splitext(model_path)[0] + '.mmap'
+
+
+def is_artifact(path):
+    return os.path.isfile(os.path.join(path, MANIFEST_NAME))
+
+
+def replace_directory(source, destination):
+    """Move the directory source to destination, replacing an existing one.
+
+    Two renames: in between, destination doesn't exist and app.py falls back
+    to the pickle. Processes that have the old arrays mapped keep reading them.
+    """
+    if os.path.isdir(destination):
+        retired = f"{destination.rstrip(os.sep)}.old-{os.getpid()}"
+        os.replace(destination, retired)
+        os.replace(source, destination)
+        shutil.rmtree(retired)
+    else:
+        os.replace(source, destination)
+
+
+def save_artifact(model_info, artifact_path):
+    """Write model_info (as produced by train_model.py) as a memory-mappable artifact.
+
+    The files are written to a temporary directory next to artifact_path,
+    which then replaces any existing artifact, so no server ever maps an
+    array that is still being written.
+    """
+    model = model_info['model']
+    forest = model if isinstance(model, FlatForest) else FlatForest.from_model(model)
+    scaler = model_info['numerical_transformer']
+
+    arrays = {name: getattr(forest, name) for name in FOREST_ARRAYS}
+    leaf_index, leaf_contributions, base_value = forest.contributions()
+    arrays['leaf_index'] = leaf_index
+    arrays['leaf_contributions'] = leaf_contributions
+    arrays['scaler_mean'] = np.asarray(scaler.mean_, dtype=np.float64)
+    arrays['scaler_scale'] = np.asarray(scaler.scale_, dtype=np.float64)
+
+    temp_path = f"{artifact_path.rstrip(os.sep)}.tmp-{os.getpid()}"
+    if os.path.isdir(temp_path):
+        shutil.rmtree(temp_path)
+    os.makedirs(temp_path)
+    try:
+        array_entries = {}
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            file_name = f"{name}.npy"
+            np.save(os.path.join(temp_path, file_name), array)
+            array_entries[name] = {
+                'file': file_name,
+                'dtype': array.dtype.str,
+                'shape': list(array.shape),
+                'sha256': hashlib.sha256(array.tobytes()).hexdigest()
+            }
+
+        manifest = {
+            'format': ARTIFACT_FORMAT,
+            'schema_version': SCHEMA_VERSION,
+            'estimator': forest.estimator_name,
+            'output': forest.output,
+            'base_margin': forest.base_margin,
+            'base_value': float(base_value),
+            'max_depth': forest.max_depth,
+            'classes': np.asarray(forest.classes_).tolist(),
+            'feature_names': [str(name) for name in forest.feature_names_in_],
+            'numerical_cols': [str(col) for col in model_info['numerical_cols']],
+            'categorical_cols': [str(col) for col in model_info['categorical_cols']],
+            'arrays': array_entries
+        }
+        # Written last, so a partially written artifact has no valid header
+        with open(os.path.join(temp_path, MANIFEST_NAME), 'w') as f:
+            json.dump(manifest, f, indent=2)
+        replace_directory(temp_path, artifact_path)
+    except BaseException:
+        shutil.rmtree(temp_path, ignore_errors=True)
+        raise
+    return manifest
+
+
+def load_artifact(artifact_path, verify_checksums=False):
+    """Open an artifact memory-mapped and return a model_info-style dict.
+
+    Raises ValueError if the header is missing, of another format or schema
+    version, or doesn't describe the arrays on disk, and if an array file is
+    missing or unreadable.
+    """
+    manifest_path = os.path.join(artifact_path, MANIFEST_NAME)
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ValueError(f"Unreadable artifact manifest {manifest_path}: {e}")
+
+    if manifest.get('format') != ARTIFACT_FORMAT:
+        raise ValueError(f"Not a {ARTIFACT_FORMAT} artifact: {manifest.get('format')}")
+    if manifest.get('schema_version') != SCHEMA_VERSION:
+        raise ValueError(f"Unsupported artifact schema version: {manifest.get('schema_version')}")
+
+    try:
+        arrays = {}
+        for name in FOREST_ARRAYS + ['scaler_mean', 'scaler_scale'] + CONTRIBUTION_ARRAYS:
+            entry = manifest['arrays'].get(name)
+            if entry is None:
+                if name in CONTRIBUTION_ARRAYS:
+                    continue
+                raise ValueError(f"Artifact is missing array '{name}'")
+            array = np.load(os.path.join(artifact_path, entry['file']), mmap_mode='r')
+            if array.dtype.str != entry['dtype'] or list(array.shape) != entry['shape']:
+                raise ValueError(f"Array '{name}' does not match the manifest")
+            if verify_checksums and hashlib.sha256(array.tobytes()).hexdigest() != entry['sha256']:
+                raise ValueError(f"Array '{name}' failed its checksum")
+            arrays[name] = array
+
+        contributions = None
+        if all(name in arrays for name in CONTRIBUTION_ARRAYS) and 'base_value' in manifest:
+            contributions = (arrays['leaf_index'], arrays['leaf_contributions'], manifest['base_value'])
+        forest = FlatForest(
+            feature=arrays['feature'],
+            threshold=arrays['threshold'],
+            default_left=arrays['default_left'],
+            left=arrays['left'],
+            right=arrays['right'],
+            value=arrays['value'],
+            roots=arrays['roots'],
+            max_depth=manifest['max_depth'],
+            classes=manifest['classes'],
+            feature_names=manifest['feature_names'],
+            estimator_name=manifest['estimator'],
+            output=manifest['output'],
+            base_margin=manifest['base_margin'],
+            contributions=contributions
+        )
+        return {
+            'model': forest,
+            'numerical_cols': manifest['numerical_cols'],
+            'categorical_cols': manifest['categorical_cols'],
+            'numerical_transformer': ScalerStats(arrays['scaler_mean'], arrays['scaler_scale'])
+        }
+    except OSError as e:
+        # Missing, truncated or unreadable .npy file
+        raise ValueError(f"Unreadable artifact array in {artifact_path}: {e}")
+    except KeyError as e:
+        raise ValueError(f"Artifact manifest is missing key {e}")
+
+
+if __name__ == '__main__':
+    import joblib
+
+    if len(sys.argv) not in (2, 3):
+        raise SystemExit("Usage: python model_artifact.py MODEL.pkl [ARTIFACT_DIR]")
+    model_path = sys.argv[1]
+    artifact_path = sys.argv[2] if len(sys.argv) == 3 else artifact_path_for(model_path)
+    manifest = save_artifact(joblib.load(model_path), artifact_path)
+    print(f"Wrote {manifest['estimator']} artifact to {artifact_path}")
@@ -0,0 +1,176 @@
+"""
+Immutable model bundle and model file watcher.
+
+A ModelBundle holds one loaded model together with everything derived from it
+(feature encoder, inference engine, prediction table, version). Request
+handlers read the active bundle reference once and use it for the whole
+request; a reload builds and warms a new bundle off to the side and then
+swaps the single reference, so in-flight requests finish on the old model.
+"""
+import logging
+import os
+import threading
+import time
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+class ModelBundle:
+    """One loaded model and its derived serving state. Not modified after creation."""
+
+    __slots__ = ('model', 'numerical_cols', 'categorical_cols', 'numerical_transformer',
+                 'feature_encoder', 'inference_engine', 'prediction_table', 'model_path',
+                 'flat_max_rows', 'version', 'load_seconds', 'loaded_at', '_frozen')
+
+    def __init__(self, model, numerical_cols, categorical_cols, numerical_transformer,
+                 feature_encoder, inference_engine, prediction_table, model_path,
+                 version, load_seconds, flat_max_rows=None):
+        self.model = model
+        self.numerical_cols = numerical_cols
+        self.categorical_cols = categorical_cols
+        self.numerical_transformer = numerical_transformer
+        self.feature_encoder = feature_encoder
+        self.inference_engine = inference_engine  # FlatForest, or None for the sklearn path
+        self.prediction_table = prediction_table  # PredictionTable, or None
+        self.model_path = model_path
+        self.flat_max_rows = flat_max_rows  # larger batches use the estimator; None for no limit
+        self.version = version
+        self.load_seconds = load_seconds
+        self.loaded_at = time.time()
+        self._frozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_frozen', False):
+            raise AttributeError("ModelBundle is immutable; build a new bundle instead")
+        object.__setattr__(self, name, value)
+
+    @property
+    def model_type(self):
+        """Estimator class name, also for models loaded from a flattened artifact."""
+        return getattr(self.model, 'estimator_name', type(self.model).__name__)
+
+    def score_rows(self, student_processed):
+        """Return (predicted classes, class probabilities) for encoded rows."""
+        if self.inference_engine is not None and (
+                self.flat_max_rows is None or len(student_processed) <= self.flat_max_rows):
+            return self.inference_engine.predict_with_proba(student_processed)
+        # One predict_proba call; predict() would compute the probabilities again
+        probabilities = self.model.predict_proba(student_processed)
+        return self.model.classes_.take(np.argmax(probabilities, axis=1)), probabilities
+
+    def predict_students(self, students, observe=None):
+        """Return (predicted classes, class probabilities) for mapped student dicts.
+
+        Rows found in the prediction table are served from it; the rest are
+        encoded and scored live in one call. If given, `observe(stage, seconds)`
+        is called with the time spent in the 'table', 'encode' and 'model' stages.
+        """
+        start = time.perf_counter()
+        classes = self.model.classes_
+        probabilities = np.empty((len(students), len(classes)), dtype=np.float64)
+        live_rows = []
+        for row, student_data in enumerate(students):
+            cached = self.prediction_table.lookup(student_data) if self.prediction_table is not None else None
+            if cached is None:
+                live_rows.append(row)
+            else:
+                probabilities[row] = cached
+
+        if observe is not None and self.prediction_table is not None:
+            observe('table', time.perf_counter() - start)
+
+        if live_rows:
+            start = time.perf_counter()
+            student_processed = self.feature_encoder.encode_many([students[row] for row in live_rows])
+            encoded = time.perf_counter()
+            live_predictions, live_probabilities = self.score_rows(student_processed)
+            probabilities[live_rows] = live_probabilities
+            if observe is not None:
+                observe('encode', encoded - start)
+                observe('model', time.perf_counter() - encoded)
+
+        predictions = classes.take(np.argmax(probabilities, axis=1))
+        if live_rows:
+            predictions[live_rows] = live_predictions
+        return predictions, probabilities
+
+    def explain_students(self, students):
+        """Return (pass probabilities, base value, per-field contributions) for mapped student dicts.
+
+        Contributions are Saabas contributions from the flat engine (see
+        FlatForest.predict_contributions), summed from the model's columns back
+        to feature_encoder.fields. Raises ValueError on the sklearn path.
+        """
+        if self.inference_engine is None:
+            raise ValueError("Explanations need the flat inference engine (INFERENCE_ENGINE=flat)")
+        student_processed = self.feature_encoder.encode_many(students)
+        probabilities, base_value, contributions = self.inference_engine.predict_contributions(student_processed)
+        return probabilities, base_value, self.feature_encoder.aggregate_fields(contributions)
+
+    def describe(self):
+        """Summary of the bundle for status endpoints."""
+        return {
+            'version': self.version,
+            'modelPath': os.path.basename(self.model_path),
+            'modelType': self.model_type,
+            'inferenceEngine': 'flat' if self.inference_engine is not None else 'sklearn',
+            'flatEngineMaxRows': self.flat_max_rows,
+            'predictionTable': self.prediction_table is not None,
+            'loadedAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(self.loaded_at)),
+            'loadSeconds': round(self.load_seconds, 4)
+        }
+
+
+class ModelFileWatcher:
+    """Poll model files and call `on_change()` once a change has settled.
+
+    A change is only acted on when two consecutive polls see the same new
+    size/mtime, so a file that is still being written is not loaded half-way.
+    """
+
+    def __init__(self, paths_fn, on_change, interval):
+        self.paths_fn = paths_fn
+        self.on_change = on_change
+        self.interval = float(interval)
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Start polling in a daemon thread (idempotent, and safe to call after fork)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='model-watcher', daemon=True)
+                self._thread.start()
+
+    def _signature(self):
+        signature = []
+        for path in self.paths_fn():
+            try:
+                stat = os.stat(path)
+                signature.append((path, stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                signature.append((path, None, None))
+        return tuple(signature)
+
+    def _run(self):
+        current = self._signature()
+        pending = None
+        while True:
+            time.sleep(self.interval)
+            signature = self._signature()
+            if signature == current:
+                pending = None
+            elif signature == pending:
+                current = signature
+                pending = None
+                logger.info("Model files changed; reloading")
+                try:
+                    self.on_change()
+                except Exception as e:
+                    logger.error(f"Model reload from file watcher failed: {str(e)}")
+            else:
+                pending = signature
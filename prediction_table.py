@@ -0,0 +1,213 @@
+"""
+Precomputed prediction table over the finite mapped input domain.
+
+Only a handful of form fields reach the model through app.py's mapping, and
+each of them drives its own small group of student features:
+
+    education            -> Medu, Fedu
+    technicalSkills      -> studytime, schoolsup
+    communicationSkills  -> famrel
+    yearsExperience      -> age, absences
+    interestScience      -> freetime
+    interestArts         -> goout, activities
+
+Every other student feature is a constant default. The table enumerates the
+product of the distinct values of these groups, scores it in bulk and stores
+the class probabilities as a .npy file (opened memory-mapped) with a JSON
+sidecar describing the axes. A lookup is a few dict hits and one row read;
+inputs outside the table return None so the caller falls back to live inference.
+
+Build the table for the currently configured model with:
+
+    python prediction_table.py
+"""
+import hashlib
+import itertools
+import json
+import os
+import time
+
+import numpy as np
+
+TABLE_VERSION = 1
+
+# (form field, form values to enumerate, student features it drives)
+TABLE_AXES = [
+    ('education', ['High School', 'Bachelor', 'Master', 'PhD'], ('Medu', 'Fedu')),
+    ('technicalSkills', ['Beginner', 'Intermediate', 'Advanced', 'Expert'], ('studytime', 'schoolsup')),
+    ('communicationSkills', ['Beginner', 'Intermediate', 'Advanced', 'Expert'], ('famrel',)),
+    # 15+ years clamps to age 22 / 30 absences, so 0-15 covers every non-negative value
+    ('yearsExperience', range(0, 16), ('age', 'absences')),
+    ('interestScience', range(0, 11), ('freetime',)),
+    ('interestArts', range(0, 11), ('goout', 'activities')),
+]
+
+# Chunk size used when scoring the domain
+BUILD_CHUNK_SIZE = 4096
+
+
+def model_fingerprint(model_path):
+    """SHA-256 of the model file; a table is only valid for the exact artifact it was built from."""
+    if os.path.isdir(model_path):
+        # Memory-mapped artifacts: the manifest carries a checksum of every array
+        model_path = os.path.join(model_path, 'manifest.json')
+    digest = hashlib.sha256()
+    with open(model_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def table_paths(table_path):
+    """Return (.npy path, .json path) for a table path given with or without extension."""
+    base = table_path[:-4] if table_path.endswith('.npy') else table_path
+    return base + '.npy', base + '.json'
+
+
+def default_table_path(model_path):
+    """Table stored next to the model: student_performance_model.pkl -> ..._model_table.
+
+    For a memory-mapped artifact directory the table lives inside it.
+    """
+    if os.path.isdir(model_path):
+        return os.path.join(model_path, 'prediction_table')
+    return os.path.splitext(model_path)[0] + '_table'
+
+
+class PredictionTable:
+    """Dense probability table indexed by the mapped feature groups."""
+
+    def __init__(self, axes, base_student, probabilities, classes, fingerprint):
+        # axes: list of (student fields, list of value tuples)
+        self.axes = [(tuple(fields), [tuple(value) for value in values]) for fields, values in axes]
+        self.base_student = dict(base_student)
+        self.probabilities = probabilities
+        self.classes = np.asarray(classes)
+        self.fingerprint = fingerprint
+
+        self.axis_index = [{value: i for i, value in enumerate(values)} for _, values in self.axes]
+        self.strides = []
+        stride = 1
+        for _, values in reversed(self.axes):
+            self.strides.append(stride)
+            stride *= len(values)
+        self.strides.reverse()
+        self.size = stride
+
+        axis_fields = {field for fields, _ in self.axes for field in fields}
+        self.constant_fields = [(field, value) for field, value in self.base_student.items()
+                                if field not in axis_fields]
+
+    def row_index(self, student_data):
+        """Table row for a mapped student dict, or None if it is outside the table."""
+        for field, value in self.constant_fields:
+            if student_data.get(field) != value:
+                return None
+        row = 0
+        for (fields, _), index, stride in zip(self.axes, self.axis_index, self.strides):
+            position = index.get(tuple(student_data.get(field) for field in fields))
+            if position is None:
+                return None
+            row += position * stride
+        return row
+
+    def lookup(self, student_data):
+        """Class probabilities for a mapped student dict, or None to fall back to live inference."""
+        row = self.row_index(student_data)
+        if row is None:
+            return None
+        return self.probabilities[row]
+
+    def students(self):
+        """Yield the mapped student dict for every table row, in row order."""
+        for combination in itertools.product(*(values for _, values in self.axes)):
+            student_data = dict(self.base_student)
+            for (fields, _), value in zip(self.axes, combination):
+                student_data.update(zip(fields, value))
+            yield student_data
+
+    def save(self, table_path):
+        """Write the probabilities (.npy) and the axis description (.json)."""
+        npy_path, json_path = table_paths(table_path)
+        np.save(npy_path, np.ascontiguousarray(self.probabilities, dtype=np.float64))
+        metadata = {
+            'version': TABLE_VERSION,
+            'fingerprint': self.fingerprint,
+            'classes': self.classes.tolist(),
+            'base_student': self.base_student,
+            'axes': [{'fields': list(fields), 'values': [list(value) for value in values]}
+                     for fields, values in self.axes],
+            'rows': self.size
+        }
+        with open(json_path, 'w') as f:
+            json.dump(metadata, f, indent=2)
+
+    @classmethod
+    def load(cls, table_path, fingerprint=None):
+        """Open a saved table memory-mapped; raise ValueError if it doesn't match."""
+        npy_path, json_path = table_paths(table_path)
+        with open(json_path) as f:
+            metadata = json.load(f)
+        if metadata.get('version') != TABLE_VERSION:
+            raise ValueError(f"Unsupported prediction table version: {metadata.get('version')}")
+        if fingerprint is not None and metadata.get('fingerprint') != fingerprint:
+            raise ValueError("Prediction table was built for a different model file")
+
+        probabilities = np.load(npy_path, mmap_mode='r')
+        axes = [(axis['fields'], axis['values']) for axis in metadata['axes']]
+        table = cls(axes, metadata['base_student'], probabilities,
+                    metadata['classes'], metadata['fingerprint'])
+        if probabilities.shape[0] != table.size:
+            raise ValueError(f"Prediction table has {probabilities.shape[0]} rows, expected {table.size}")
+        return table
+
+
+def build_table(map_form_data, score_students, classes, fingerprint, axes=TABLE_AXES):
+    """Enumerate the mapped domain and score it in bulk.
+
+    `map_form_data(data)` is app.py's form mapping returning (form, student_data);
+    `score_students(list of student dicts)` returns class probabilities.
+    """
+    _, base_student = map_form_data({})
+
+    table_axes = []
+    for form_field, form_values, fields in axes:
+        values = []
+        for form_value in form_values:
+            _, student_data = map_form_data({form_field: form_value})
+            # Each form field must only move its own group of student features
+            changed = {field for field in student_data if student_data[field] != base_student[field]}
+            if not changed <= set(fields):
+                raise ValueError(f"{form_field} also changes {sorted(changed - set(fields))}")
+            value = tuple(student_data[field] for field in fields)
+            if value not in values:
+                values.append(value)
+        table_axes.append((fields, values))
+
+    table = PredictionTable(table_axes, base_student, None, classes, fingerprint)
+    students = list(table.students())
+    chunks = [score_students(students[start:start + BUILD_CHUNK_SIZE])
+              for start in range(0, len(students), BUILD_CHUNK_SIZE)]
+    table.probabilities = np.concatenate(chunks).astype(np.float64)
+    return table
+
+
+if __name__ == '__main__':
+    import app
+
+    bundle = app.model_bundle
+    if bundle is None:
+        raise SystemExit("No model loaded; train the model first.")
+
+    start = time.perf_counter()
+    table = build_table(
+        app.map_form_data,
+        # Score live, never from a table that may already be loaded
+        lambda students: bundle.score_rows(bundle.feature_encoder.encode_many(students))[1],
+        bundle.model.classes_,
+        model_fingerprint(bundle.model_path)
+    )
+    table_path = app.PREDICTION_TABLE_PATH or default_table_path(bundle.model_path)
+    table.save(table_path)
+    print(f"Scored {table.size} mapped profiles in {time.perf_counter() - start:.2f}s")
+    print(f"Prediction table saved to {table_paths(table_path)[0]}")
@@ -0,0 +1,78 @@
+"""
+Background scorer for a shadow model.
+
+Request threads hand over work after their response is computed and never
+wait for it: `submit` puts the item on a bounded queue and returns at once.
+If the queue is full the item is dropped and counted, so a slow or
+saturated shadow model never adds latency or unbounded memory to the
+primary path. One worker thread takes items off the queue and calls
+`score(item)`.
+"""
+import logging
+import queue
+import threading
+
+logger = logging.getLogger(__name__)
+
+
+class ShadowScorer:
+    """Run `score(item)` for submitted items on one background thread, dropping items when the queue is full."""
+
+    def __init__(self, score, max_queue_size=1000):
+        self.score = score
+        self.max_queue_size = max(1, int(max_queue_size))
+        self._queue = queue.Queue(self.max_queue_size)
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.submitted = 0
+        self.dropped = 0
+        self.scored = 0
+        self.errors = 0
+
+    def submit(self, item):
+        """Queue one item without blocking; return False if it was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._stats_lock:
+                self.dropped += 1
+            return False
+        with self._stats_lock:
+            self.submitted += 1
+        return True
+
+    def _ensure_started(self):
+        # Started lazily so that pre-forked workers each get their own thread
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='shadow-scorer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                self.score(item)
+            except Exception as e:
+                logger.warning(f"Shadow scoring failed: {str(e)}")
+                with self._stats_lock:
+                    self.errors += 1
+            else:
+                with self._stats_lock:
+                    self.scored += 1
+
+    def stats(self):
+        """Queue size and submitted/dropped/scored counters."""
+        with self._stats_lock:
+            return {
+                'maxQueueSize': self.max_queue_size,
+                'queueDepth': self._queue.qsize(),
+                'submitted': self.submitted,
+                'dropped': self.dropped,
+                'scored': self.scored,
+                'errors': self.errors
+            }
@@ -1,25 +1,57 @@
 #!/usr/bin/env python3
 """Test CORS configuration for the API."""
+import os
 import requests
 import json
 import time
+import statistics
+
+API_URL = os.environ.get('API_URL', 'http://localhost:5001')
+# Must be in the server's CORS_ORIGINS
+ALLOWED_ORIGIN = os.environ.get('CORS_TEST_ORIGIN', 'http://localhost:3000')
+DISALLOWED_ORIGIN = 'http://not-allowed.example'
+
+SAMPLE_DATA = {
+    "education": "PhD",
+    "technicalSkills": "Expert",
+    "communicationSkills": "Advanced",
+    "analyticalThinking": "Expert",
+    "creativity": "Intermediate",
+    "leadership": "Advanced",
+    "yearsExperience": 5,
+    "interestScience": 9,
+    "interestArts": 4,
+    "interestBusiness": 6,
+    "personalityExtroversion": 6,
+    "personalityOpenness": 8,
+    "personalityConscientiousness": 9
+}
+
+def preflight_headers(origin, method='POST'):
+    """Headers a browser sends on a preflight before a JSON POST."""
+    return {
+        'Origin': origin,
+        'Access-Control-Request-Method': method,
+        'Access-Control-Request-Headers': 'content-type'
+    }
 
 def test_options():
-    """Test the OPTIONS request to check CORS headers."""
+    """Test the preflight for GET /api/options to check CORS headers."""
     print("\n=== Testing OPTIONS request ===")
     try:
-        response = requests.options('http://localhost:5000/api/options')
+        response = requests.options(f'{API_URL}/api/options', headers=preflight_headers(ALLOWED_ORIGIN, 'GET'))
         print(f"Status code: {response.status_code}")
         print("Headers:")
         for key, value in response.headers.items():
             print(f"  {key}: {value}")
-        
+
         cors_headers = [
             'Access-Control-Allow-Origin',
             'Access-Control-Allow-Headers',
-            'Access-Control-Allow-Methods'
+            'Access-Control-Allow-Methods',
+            'Access-Control-Max-Age'
         ]
-        
+
         all_present = True
         for header in cors_headers:
             if header in response.headers:
@@ -27,58 +59,91 @@ def test_options():
             else:
                 print(f"❌ {header} is missing")
                 all_present = False
-        
+
         return all_present
     except Exception as e:
         print(f"❌ Error: {e}")
         return False
 
+def test_preflight_headers():
+    """Check the preflight for POST /api/predict: empty 204 with consistent CORS headers."""
+    print("\n=== Testing preflight headers for /api/predict ===")
+    try:
+        response = requests.options(f'{API_URL}/api/predict', headers=preflight_headers(ALLOWED_ORIGIN))
+        headers = response.headers
+        checks = [
+            ("status is 204", response.status_code == 204),
+            ("body is empty", response.content == b''),
+            ("Access-Control-Allow-Origin echoes the origin",
+             headers.get('Access-Control-Allow-Origin') == ALLOWED_ORIGIN),
+            ("Vary includes Origin", 'origin' in headers.get('Vary', '').lower()),
+            ("POST is an allowed method", 'POST' in headers.get('Access-Control-Allow-Methods', '')),
+            ("Content-Type is an allowed header",
+             'content-type' in headers.get('Access-Control-Allow-Headers', '').lower()),
+            ("Access-Control-Max-Age is a positive number",
+             headers.get('Access-Control-Max-Age', '').isdigit() and int(headers['Access-Control-Max-Age']) > 0),
+            # "*" together with credentials is rejected by browsers
+            ("no wildcard origin with credentials",
+             not (headers.get('Access-Control-Allow-Origin') == '*'
+                  and headers.get('Access-Control-Allow-Credentials') == 'true')),
+        ]
+        for name, passed in checks:
+            print(f"{'✅' if passed else '❌'} {name}")
+        print(f"Access-Control-Max-Age: {headers.get('Access-Control-Max-Age')}")
+        return all(passed for _, passed in checks)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
+def test_disallowed_origin():
+    """An origin outside the allow-list gets no CORS headers, on the preflight or the response."""
+    print("\n=== Testing a disallowed origin ===")
+    try:
+        preflight = requests.options(f'{API_URL}/api/predict', headers=preflight_headers(DISALLOWED_ORIGIN))
+        response = requests.get(f'{API_URL}/api/options', headers={'Origin': DISALLOWED_ORIGIN})
+        checks = [
+            ("preflight has no Access-Control-Allow-Origin", 'Access-Control-Allow-Origin' not in preflight.headers),
+            ("response has no Access-Control-Allow-Origin", 'Access-Control-Allow-Origin' not in response.headers),
+        ]
+        for name, passed in checks:
+            print(f"{'✅' if passed else '❌'} {name}")
+        return all(passed for _, passed in checks)
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 def test_predict():
     """Test a POST request to the predict endpoint."""
     print("\n=== Testing POST to /api/predict ===")
     try:
-        # Sample data
-        sample_data = {
-            "education": "PhD",
-            "technicalSkills": "Expert",
-            "communicationSkills": "Advanced",
-            "analyticalThinking": "Expert",
-            "creativity": "Intermediate",
-            "leadership": "Advanced",
-            "yearsExperience": 5,
-            "interestScience": 9,
-            "interestArts": 4,
-            "interestBusiness": 6,
-            "personalityExtroversion": 6,
-            "personalityOpenness": 8,
-            "personalityConscientiousness": 9
-        }
-        
         headers = {
             'Content-Type': 'application/json',
             'Accept': 'application/json',
-            'Origin': 'http://localhost:3000'
+            'Origin': ALLOWED_ORIGIN
         }
-        
-        # First make an OPTIONS request
+
+        # First make the preflight request a browser would send
         print("Making OPTIONS request...")
         options_response = requests.options(
-            'http://localhost:5000/api/predict',
-            headers=headers
+            f'{API_URL}/api/predict',
+            headers=preflight_headers(ALLOWED_ORIGIN)
         )
         print(f"OPTIONS Status: {options_response.status_code}")
-        
+
         # Then make the actual POST request
         print("Making POST request...")
         response = requests.post(
-            'http://localhost:5000/api/predict',
-            json=sample_data,
+            f'{API_URL}/api/predict',
+            json=SAMPLE_DATA,
             headers=headers
         )
-        
+
         print(f"Status code: {response.status_code}")
-        
+
         if response.status_code == 200:
+            if response.headers.get('Access-Control-Allow-Origin') != ALLOWED_ORIGIN:
+                print("❌ POST response is missing Access-Control-Allow-Origin")
+                return False
             print("✅ POST request successful")
             print("Response JSON:")
             print(json.dumps(response.json(), indent=2))
@@ -91,16 +156,66 @@ def test_predict():
         print(f"❌ Error: {e}")
         return False
 
+def timed_requests(send, count):
+    """Latencies in milliseconds of `count` calls of send()."""
+    latencies = []
+    for _ in range(count):
+        start = time.perf_counter()
+        send()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return latencies
+
+def measure_preflight_overhead(count=200):
+    """Compare preflight latency with the POST it precedes, over one keep-alive connection."""
+    print(f"\n=== Measuring preflight overhead ({count} requests each) ===")
+    try:
+        session = requests.Session()
+        post_headers = {'Content-Type': 'application/json', 'Origin': ALLOWED_ORIGIN}
+        # Warm up the connection and the response cache
+        session.options(f'{API_URL}/api/predict', headers=preflight_headers(ALLOWED_ORIGIN))
+        session.post(f'{API_URL}/api/predict', json=SAMPLE_DATA, headers=post_headers)
+
+        preflights = timed_requests(
+            lambda: session.options(f'{API_URL}/api/predict', headers=preflight_headers(ALLOWED_ORIGIN)), count)
+        posts = timed_requests(
+            lambda: session.post(f'{API_URL}/api/predict', json=SAMPLE_DATA, headers=post_headers), count)
+
+        for name, latencies in (('preflight', preflights), ('POST', posts)):
+            ordered = sorted(latencies)
+            p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+            print(f"{name:<10} mean {statistics.mean(latencies):.3f} ms, "
+                  f"median {statistics.median(latencies):.3f} ms, p99 {p99:.3f} ms")
+        share = statistics.mean(preflights) / (statistics.mean(preflights) + statistics.mean(posts))
+        print(f"Without preflight caching every POST costs one extra round trip: "
+              f"{share:.0%} of the time per form submit spent on preflights")
+
+        max_age = session.options(f'{API_URL}/api/predict',
+                                  headers=preflight_headers(ALLOWED_ORIGIN)).headers.get('Access-Control-Max-Age')
+        if max_age:
+            print(f"With Access-Control-Max-Age {max_age} a browser sends at most one preflight "
+                  f"per {int(max_age) // 60} minutes per URL")
+        return True
+    except Exception as e:
+        print(f"❌ Error: {e}")
+        return False
+
 if __name__ == "__main__":
     print("Starting CORS tests...")
     options_success = test_options()
+    preflight_success = test_preflight_headers()
+    disallowed_success = test_disallowed_origin()
     predict_success = test_predict()
-    
-    if options_success and predict_success:
+    measure_preflight_overhead()
+
+    if options_success and preflight_success and disallowed_success and predict_success:
         print("\n✅ All CORS tests passed!")
     else:
         print("\n❌ Some CORS tests failed.")
         if not options_success:
             print("  - OPTIONS request test failed")
+        if not preflight_success:
+            print("  - Preflight header test failed")
+        if not disallowed_success:
+            print("  - Disallowed origin test failed")
         if not predict_success:
-            print("  - POST request test failed") 
\ No newline at end of file
+            print("  - POST request test failed")
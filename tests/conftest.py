@@ -0,0 +1,35 @@
+"""
+Shared fixtures: the shipped dataset and model.
+
+Tests run from the repository root (see pytest.ini) against
+data/student-mat.csv, data/student-por.csv and student_performance_model.pkl.
+"""
+import os
+
+# app.py configures logging on import; keep test runs out of backend.log
+os.environ.setdefault('LOG_FILE', '')
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ['MODEL_WATCH_INTERVAL'] = '0'
+os.environ['SHADOW_MODEL_PATH'] = ''
+
+import joblib
+import pandas as pd
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_FILES = [os.path.join(ROOT, 'data', 'student-mat.csv'), os.path.join(ROOT, 'data', 'student-por.csv')]
+MODEL_PATH = os.path.join(ROOT, 'student_performance_model.pkl')
+
+
+@pytest.fixture(scope='session')
+def students():
+    """Every row of both course files as a student dict, grades dropped."""
+    df = pd.concat([pd.read_csv(path, sep=';') for path in DATA_FILES], ignore_index=True)
+    df = df.drop(columns=['G1', 'G2', 'G3'])
+    return df.to_dict('records')
+
+
+@pytest.fixture(scope='session')
+def model_info():
+    """The shipped model_info dict (RandomForest, columns and scaler)."""
+    return joblib.load(MODEL_PATH)
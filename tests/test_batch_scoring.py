@@ -0,0 +1,42 @@
+"""/api/predict/batch reports failures per item, whatever stage they happen in."""
+import pytest
+
+import app
+from model_bundle import ModelBundle
+
+
+@pytest.fixture
+def client():
+    return app.app.test_client()
+
+
+def test_batch_reports_mapping_errors_per_item(client):
+    response = client.post('/api/predict/batch', json=[{'interestScience': 8}, {}, {'yearsExperience': 'many'}])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['failed'] == 2
+    assert 'primaryPrediction' in body['results'][0]
+    assert [result.get('error') for result in body['results'][1:]] == ['No data received', 'Data processing error']
+    assert [result['index'] for result in body['results']] == [0, 1, 2]
+
+
+def test_model_failure_fails_the_scored_items_not_the_batch(client, monkeypatch):
+    def fail(self, students, observe=None):
+        raise RuntimeError('model exploded')
+    monkeypatch.setattr(ModelBundle, 'predict_students', fail)
+    response = client.post('/api/predict/batch', json=[{'interestScience': 8}, {}])
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body['results'] == [
+        {'index': 0, 'error': 'Prediction error', 'details': 'model exploded'},
+        {'index': 1, 'error': 'No data received', 'details': 'Each item must be a non-empty JSON object'}
+    ]
+
+
+def test_batch_items_match_single_predictions(client):
+    profiles = [dict(profile) for profile in app.WARMUP_PROFILES if profile]
+    batch = client.post('/api/predict/batch', json=profiles).get_json()['results']
+    for profile, item in zip(profiles, batch):
+        single = client.post('/api/predict', json=profile).get_json()
+        assert item['recommendations'] == single['recommendations']
+        assert item['modelDetails'] == single['modelDetails']
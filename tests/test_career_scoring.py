@@ -0,0 +1,113 @@
+"""CareerScorer must return what the if-chain in app.recommend_careers returned."""
+import random
+import zlib
+
+import app
+from career_scoring import CareerScorer, TIE_MODULUS
+
+LEVELS = ['Beginner', 'Intermediate', 'Advanced', 'Expert', 'Unknown']
+EDUCATION = ['High School', 'Bachelor', 'Master', 'PhD', 'Unknown']
+
+
+def legacy_recommend(form, pass_probability):
+    """The old if-chain, with hash(career + str(data)) replaced by the deterministic tie factor."""
+    skill_map, education_map = app.SKILL_MAP, app.EDUCATION_MAP
+    education_level = form['education_level']
+    tech_skills = form['tech_skills']
+    analytical = form['analytical']
+    comm_skills = form['comm_skills']
+    creativity = form['creativity']
+    interest_science = form['interest_science']
+    interest_arts = form['interest_arts']
+    interest_business = form['interest_business']
+
+    potential_careers = []
+    if tech_skills in ['Advanced', 'Expert'] and interest_science >= 7:
+        potential_careers.append({
+            'career': 'Data Scientist',
+            'score': interest_science * 0.6 + skill_map.get(analytical, 2) * 10 + pass_probability * 0.3
+        })
+        potential_careers.append({
+            'career': 'Software Engineer',
+            'score': interest_science * 0.5 + skill_map.get(tech_skills, 2) * 10 + pass_probability * 0.3
+        })
+    if interest_business >= 6:
+        potential_careers.append({
+            'career': 'Financial Analyst',
+            'score': interest_business * 0.6 + skill_map.get(analytical, 2) * 10 + pass_probability * 0.2
+        })
+        potential_careers.append({
+            'career': 'Marketing Specialist',
+            'score': interest_business * 0.5 + skill_map.get(comm_skills, 2) * 10 + skill_map.get(creativity, 2) * 5
+        })
+    if interest_arts >= 7 and creativity in ['Advanced', 'Expert']:
+        potential_careers.append({
+            'career': 'Graphic Designer',
+            'score': interest_arts * 0.7 + skill_map.get(creativity, 2) * 15
+        })
+    if education_level in ['Master', 'PhD'] and interest_science >= 6:
+        potential_careers.append({
+            'career': 'Doctor',
+            'score': interest_science * 0.6 + pass_probability * 0.4 + education_map.get(education_level, 2) * 5
+        })
+        potential_careers.append({
+            'career': 'Teacher',
+            'score': interest_arts * 0.3 + interest_science * 0.3 + skill_map.get(comm_skills, 2) * 10
+        })
+
+    if len(potential_careers) < 3:
+        key_crc = CareerScorer.key_crc(form)
+        for career in app.CAREERS:
+            if not any(pc['career'] == career for pc in potential_careers):
+                random_factor = (key_crc ^ zlib.crc32(career.encode())) % TIE_MODULUS
+                potential_careers.append({'career': career, 'score': pass_probability + random_factor})
+
+    potential_careers.sort(key=lambda x: x['score'], reverse=True)
+    top_careers = potential_careers[:3]
+    total_score = sum(career['score'] for career in top_careers)
+    if total_score > 0:
+        for career in top_careers:
+            career['probability'] = round((career['score'] / total_score) * 100, 1)
+            career['probability'] = max(30, min(95, career['probability']))
+    else:
+        for i, career in enumerate(top_careers):
+            career['probability'] = 90 - (i * 20)
+    return [{'career': career['career'], 'probability': career['probability']} for career in top_careers]
+
+
+def random_profiles(count, seed=42):
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(count):
+        data = {
+            'education': rng.choice(EDUCATION),
+            'technicalSkills': rng.choice(LEVELS),
+            'analyticalThinking': rng.choice(LEVELS),
+            'communicationSkills': rng.choice(LEVELS),
+            'creativity': rng.choice(LEVELS),
+            'interestScience': rng.randint(-2, 12),
+            'interestArts': rng.randint(-2, 12),
+            'interestBusiness': rng.randint(-2, 12)
+        }
+        form, _ = app.map_form_data(data)
+        pass_probability = rng.choice([0.0, 100.0, rng.uniform(0, 100)])
+        profiles.append((form, pass_probability))
+    profiles.extend((app.map_form_data(data)[0], 50.0) for data in app.WARMUP_PROFILES)
+    return profiles
+
+
+def typed(recommendations):
+    """Compare probability types too: the clamped bounds stay ints, as with max/min."""
+    return [[(item['career'], item['probability'], type(item['probability'])) for item in row]
+            for row in recommendations]
+
+
+def test_recommendations_match_the_old_if_chain():
+    profiles = random_profiles(5000)
+    expected = typed(legacy_recommend(form, pass_probability) for form, pass_probability in profiles)
+
+    single = [app.career_scorer.recommend(form, pass_probability) for form, pass_probability in profiles]
+    assert typed(single) == expected
+
+    forms, pass_probabilities = zip(*profiles)
+    assert typed(app.career_scorer.recommend_many(list(forms), list(pass_probabilities))) == expected
@@ -0,0 +1,46 @@
+"""FeatureEncoder must produce exactly the vectors of the pandas pipeline it replaced."""
+import numpy as np
+import pandas as pd
+
+import app
+from feature_encoder import FeatureEncoder
+
+
+def pandas_encode(student_data, model, numerical_cols, categorical_cols, numerical_transformer):
+    """The DataFrame/get_dummies/reindex/concat encoding app.py used before FeatureEncoder."""
+    student_df = pd.DataFrame([student_data])
+    student_num = pd.DataFrame(numerical_transformer.transform(student_df[numerical_cols].copy()),
+                               columns=numerical_cols)
+    student_cat = pd.get_dummies(student_df[categorical_cols])
+    expected_cat_cols = [col for col in model.feature_names_in_ if col not in numerical_cols]
+    student_cat = student_cat.reindex(columns=expected_cat_cols, fill_value=0)
+    student_processed = pd.concat([student_num, student_cat], axis=1)
+    return student_processed[model.feature_names_in_].to_numpy(dtype=np.float64)
+
+
+def encoder_for(model_info):
+    return FeatureEncoder(model_info['model'].feature_names_in_, model_info['numerical_cols'],
+                          model_info['categorical_cols'], model_info['numerical_transformer'],
+                          categories=app.STUDENT_FEATURES)
+
+
+def expected_rows(students, model_info):
+    return np.vstack([pandas_encode(student, model_info['model'], model_info['numerical_cols'],
+                                    model_info['categorical_cols'], model_info['numerical_transformer'])
+                      for student in students])
+
+
+def test_dataset_rows_match_pandas_encoding(students, model_info):
+    encoder = encoder_for(model_info)
+    np.testing.assert_array_equal(encoder.encode_many(students), expected_rows(students, model_info))
+
+
+def test_mapped_form_rows_match_pandas_encoding(model_info):
+    encoder = encoder_for(model_info)
+    mapped = [app.map_form_data(data)[1] for data in app.WARMUP_PROFILES]
+    mapped += [app.map_form_data({'education': education, 'technicalSkills': skill, 'yearsExperience': years,
+                                  'interestScience': years + 1, 'interestArts': 9 - years})[1]
+               for education in app.EDUCATION_LEVELS for skill in app.SKILL_LEVELS for years in range(0, 9, 2)]
+    np.testing.assert_array_equal(encoder.encode_many(mapped), expected_rows(mapped, model_info))
+    for student in mapped[:5]:
+        np.testing.assert_array_equal(encoder.encode(student), expected_rows([student], model_info))
@@ -0,0 +1,56 @@
+"""A damaged model artifact must be rejected, and the server must fall back to the pickle."""
+import json
+import os
+
+import numpy as np
+import pytest
+
+import app
+from model_artifact import MANIFEST_NAME, load_artifact, save_artifact
+
+
+@pytest.fixture
+def artifact_path(tmp_path, model_info):
+    path = str(tmp_path / 'model.mmap')
+    save_artifact(model_info, path)
+    return path
+
+
+def truncate_array(path):
+    with open(os.path.join(path, 'threshold.npy'), 'r+b') as f:
+        f.truncate(200)
+
+
+def delete_array(path):
+    os.remove(os.path.join(path, 'value.npy'))
+
+
+def drop_manifest_key(path):
+    manifest_path = os.path.join(path, MANIFEST_NAME)
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    del manifest['max_depth']
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f)
+
+
+def test_intact_artifact_matches_the_pickle(artifact_path, model_info):
+    model_info_loaded = load_artifact(artifact_path, verify_checksums=True)
+    X = np.zeros((1, len(model_info['model'].feature_names_in_)))
+    np.testing.assert_array_equal(model_info_loaded['model'].predict_proba(X), model_info['model'].predict_proba(X))
+
+
+@pytest.mark.parametrize('corrupt', [truncate_array, delete_array, drop_manifest_key])
+def test_corrupted_artifact_raises_value_error(artifact_path, corrupt):
+    corrupt(artifact_path)
+    with pytest.raises(ValueError):
+        load_artifact(artifact_path)
+
+
+@pytest.mark.parametrize('corrupt', [truncate_array, delete_array, drop_manifest_key])
+def test_corrupted_artifact_falls_back_to_the_pickle(artifact_path, corrupt, monkeypatch):
+    corrupt(artifact_path)
+    monkeypatch.setattr(app, 'MODEL_ARTIFACT_PATH', artifact_path)
+    bundle = app.build_model_bundle()
+    assert bundle.model_path == app.MODEL_PATH
+    assert bundle.model_type == 'RandomForestClassifier'
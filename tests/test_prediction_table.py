@@ -0,0 +1,41 @@
+"""Prediction table lookups must return exactly what live scoring returns."""
+import random
+
+import numpy as np
+
+import app
+from prediction_table import TABLE_AXES, PredictionTable, build_table, model_fingerprint
+
+
+def score_live(bundle, students):
+    return bundle.score_rows(bundle.feature_encoder.encode_many(students))[1]
+
+
+def random_payloads(count, seed=42):
+    rng = random.Random(seed)
+    payloads = []
+    for _ in range(count):
+        payload = {form_field: rng.choice(list(form_values)) for form_field, form_values, _ in TABLE_AXES}
+        # Years past the enumerated range clamp onto it
+        if rng.random() < 0.1:
+            payload['yearsExperience'] = rng.randint(16, 40)
+        payloads.append(payload)
+    return payloads
+
+
+def test_table_lookups_match_live_scoring(tmp_path):
+    bundle = app.build_model_bundle()
+    fingerprint = model_fingerprint(bundle.model_path)
+    table = build_table(app.map_form_data, lambda students: score_live(bundle, students),
+                        bundle.model.classes_, fingerprint)
+    table_path = str(tmp_path / 'model_table.npy')
+    table.save(table_path)
+    table = PredictionTable.load(table_path, fingerprint=fingerprint)
+
+    students = [app.map_form_data(payload)[1] for payload in random_payloads(400)]
+    cached = [table.lookup(student) for student in students]
+    assert all(probabilities is not None for probabilities in cached)
+    # One row at a time, as /api/predict scores a table miss, and as one batch
+    np.testing.assert_array_equal(np.vstack(cached),
+                                  np.vstack([score_live(bundle, [student]) for student in students]))
+    np.testing.assert_array_equal(np.vstack(cached), score_live(bundle, students))
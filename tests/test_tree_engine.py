@@ -0,0 +1,67 @@
+"""FlatForest must reproduce the estimators it flattens."""
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from feature_encoder import FeatureEncoder
+from tree_engine import FlatForest
+
+
+@pytest.fixture(scope='module')
+def encoded(students, model_info):
+    """Every dataset row encoded for the shipped model."""
+    encoder = FeatureEncoder(model_info['model'].feature_names_in_, model_info['numerical_cols'],
+                             model_info['categorical_cols'], model_info['numerical_transformer'],
+                             categories=app.STUDENT_FEATURES)
+    return encoder.encode_many(students)
+
+
+def test_random_forest_matches_sklearn_exactly(encoded, model_info):
+    model = model_info['model']
+    forest = FlatForest.from_model(model)
+    classes, probabilities = forest.predict_with_proba(encoded)
+    np.testing.assert_array_equal(probabilities, model.predict_proba(encoded))
+    np.testing.assert_array_equal(classes, model.predict(encoded))
+    # Single rows take the same path as the request handler
+    for row in encoded[:20]:
+        np.testing.assert_array_equal(forest.predict_proba(row[np.newaxis, :]),
+                                      model.predict_proba(row[np.newaxis, :]))
+
+
+def test_xgboost_matches_booster(encoded, students, model_info):
+    xgboost = pytest.importorskip('xgboost')
+    labels = np.array([int(index % 3 == 0) for index in range(len(students))])
+    labels[encoded[:, 0] > 0.5] = 1  # learnable signal, both classes present
+    model = xgboost.XGBClassifier(n_estimators=50, max_depth=4, learning_rate=0.2, random_state=42)
+    # Fitted on a DataFrame, as train_model.py does, so the booster has feature names
+    model.fit(pd.DataFrame(encoded, columns=model_info['model'].feature_names_in_), labels)
+
+    forest = FlatForest.from_model(model)
+    # Missing values take each split's default direction
+    with_missing = encoded.copy()
+    with_missing[::7, :5] = np.nan
+    for X in (encoded, with_missing):
+        classes, probabilities = forest.predict_with_proba(X)
+        expected = model.predict_proba(X)
+        # Same float32 arithmetic; the booster's exp may differ by about one ulp
+        np.testing.assert_allclose(probabilities, expected, rtol=0, atol=1.2e-7)
+        np.testing.assert_array_equal(classes, model.predict(X))
+
+
+def test_large_batches_score_the_same_on_either_side_of_the_crossover(encoded):
+    bundle = app.build_model_bundle()
+    assert bundle.flat_max_rows is not None
+    small = encoded[:bundle.flat_max_rows]
+    large = encoded[:bundle.flat_max_rows + 1]
+    small_classes, small_probabilities = bundle.score_rows(small)
+    large_classes, large_probabilities = bundle.score_rows(large)
+    np.testing.assert_array_equal(large_probabilities[:-1], small_probabilities)
+    np.testing.assert_array_equal(large_classes[:-1], small_classes)
+
+
+def test_warm_up_builds_the_explanation_arrays():
+    bundle = app.build_model_bundle()
+    assert bundle.inference_engine._contributions is None
+    app.warm_up(bundle)
+    assert bundle.inference_engine._contributions is not None
@@ -8,120 +8,662 @@ from xgboost import XGBClassifier
 from sklearn.metrics import accuracy_score, classification_report
 from imblearn.over_sampling import SMOTE
 import os
+import shutil
 import urllib.request
+import itertools
+import json
+import time
+import gc
+import multiprocessing
+import tempfile
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import ParameterGrid, StratifiedKFold
+
+from model_artifact import artifact_path_for, is_artifact, load_artifact, save_artifact
+from feature_cache import cache_key, load_prepared, save_prepared
+from tree_engine import FlatForest
+
+# Output format: 'pickle' (joblib model_info), 'mmap' (memory-mapped artifact
+# directory, see model_artifact.py) or 'both'
+ARTIFACT_FORMAT = os.environ.get('ARTIFACT_FORMAT', 'pickle').lower()
 
 # Download the dataset if not already present
 dataset_url = "https://archive.ics.uci.edu/ml/machine-learning-databases/00320/student.zip"
 dataset_path = "data/student.zip"
+DATA_PATH = "data/student-mat.csv"
+
+# Preprocessing settings; together with the CSV contents they key the feature cache
+PREPROCESS_PARAMS = {
+    'pass_threshold': 10,
+    'drop_columns': ['G1', 'G2', 'G3'],
+    'test_size': 0.2,
+    'split_random_state': 42,
+    'smote_random_state': 42
+}
+# Preprocessed data is cached here (see feature_cache.py); empty string disables the cache
+FEATURE_CACHE_DIR = os.environ.get('FEATURE_CACHE_DIR', '.feature_cache')
+
+# Hyperparameter search: TRAIN_SEARCH=1 runs k-fold cross-validation over a
+# parameter grid in parallel instead of fitting the two fixed models
+TRAIN_SEARCH = os.environ.get('TRAIN_SEARCH', '0') == '1'
+CV_FOLDS = int(os.environ.get('CV_FOLDS', 5))
+# Cores to use in total, split between worker processes and threads per model
+TRAIN_JOBS = int(os.environ.get('TRAIN_JOBS', 0)) or os.cpu_count() or 1
+# JSON file with a grid in the same shape as DEFAULT_PARAM_GRID
+PARAM_GRID_PATH = os.environ.get('PARAM_GRID')
+TRAINING_REPORT_PATH = os.environ.get('TRAINING_REPORT', 'training_report.json')
+
+# Model selection: the most accurate candidate whose median single-row model latency
+# (in milliseconds) fits the budget; unset or 0 means no budget
+LATENCY_BUDGET_MS = float(os.environ.get('LATENCY_BUDGET_MS', 0) or 0) or None
+# Engine app.py will score the saved model with (same setting as in app.py)
+INFERENCE_ENGINE = os.environ.get('INFERENCE_ENGINE', 'flat').lower()
+# Also save the best candidate of the other model family here, to serve with
+# SHADOW_MODEL_PATH next to the selected one (fixed-candidate mode; unset disables it)
+SHADOW_MODEL_OUTPUT = os.environ.get('SHADOW_MODEL_OUTPUT')
+LATENCY_SINGLE_CALLS = 200
+LATENCY_BATCH_ROWS = 1000
+
+# Model family -> (estimator class, fixed parameters)
+MODEL_FAMILIES = {
+    'random_forest': (RandomForestClassifier, {'random_state': 42}),
+    'xgboost': (XGBClassifier, {'random_state': 42}),
+}
+
+DEFAULT_PARAM_GRID = {
+    'random_forest': {
+        'n_estimators': [100, 200],
+        'max_depth': [None, 10],
+        'min_samples_leaf': [1, 2]
+    },
+    'xgboost': {
+        'n_estimators': [100, 200],
+        'learning_rate': [0.05, 0.1],
+        'max_depth': [3, 6]
+    }
+}
+
+MODEL_NAMES = {
+    'random_forest': "Random Forest",
+    'xgboost': "XGBoost",
+}
+# The selected model is saved where app.py loads it first (same MODEL_PATH setting
+# as in app.py), whatever its family
+SERVED_MODEL_PATH = os.environ.get('MODEL_PATH', 'student_performance_model.pkl')
+# Per-family files older versions wrote; app.py still falls back to them (ALT_MODEL_PATHS)
+LEGACY_MODEL_PATHS = ['student_performance_rf_model.pkl', 'student_performance_xgb_model.pkl']
+# Set to 1 to delete model files app.py could load instead of the one just saved
+REMOVE_STALE_MODELS = os.environ.get('REMOVE_STALE_MODELS', '0') == '1'
+
+# Candidates fitted by default: the two original models plus smaller forests and a
+# shallower booster that trade some accuracy for cheaper inference
+MODEL_CANDIDATES = [
+    ('random_forest', {'n_estimators': 100}),
+    ('xgboost', {'n_estimators': 100, 'learning_rate': 0.1}),
+    ('random_forest', {'n_estimators': 50}),
+    ('random_forest', {'n_estimators': 25}),
+    ('random_forest', {'n_estimators': 50, 'max_depth': 8}),
+    ('random_forest', {'n_estimators': 25, 'max_depth': 6}),
+    ('xgboost', {'n_estimators': 50, 'learning_rate': 0.2, 'max_depth': 3}),
+]
+
+# Each phase below is a separate function so benchmarks.py can time it on its own
+
+def download_dataset():
+    if not os.path.exists(DATA_PATH):
+        print("Downloading dataset...")
+        if not os.path.exists(dataset_path):
+            urllib.request.urlretrieve(dataset_url, dataset_path)
 
-if not os.path.exists("data/student-mat.csv"):
-    print("Downloading dataset...")
-    if not os.path.exists(dataset_path):
-        urllib.request.urlretrieve(dataset_url, dataset_path)
-    
-    # Unzip the dataset
-    import zipfile
-    with zipfile.ZipFile(dataset_path, 'r') as zip_ref:
-        zip_ref.extractall("data")
-    
-    print("Dataset downloaded and extracted.")
-
-# Load the dataset
-try:
-    df = pd.read_csv("data/student-mat.csv", sep=";")
-    print("Dataset loaded successfully!")
-    print(f"Dataset shape: {df.shape}")
-    print(df.head())
-except Exception as e:
-    print(f"Error loading dataset: {e}")
-    df = None
-
-if df is not None:
-    # Preprocess the data
-    print("\nPreprocessing data...")
-    
+        # Unzip the dataset
+        import zipfile
+        with zipfile.ZipFile(dataset_path, 'r') as zip_ref:
+            zip_ref.extractall("data")
+
+        print("Dataset downloaded and extracted.")
+
+def load_dataset(path=DATA_PATH):
+    return pd.read_csv(path, sep=";")
+
+def preprocess(df):
+    """Return (X_processed, y, numerical_cols, categorical_cols, numerical_transformer)."""
     # Define target variable - let's predict if student will pass (G3 >= 10)
-    df['pass'] = df['G3'].apply(lambda x: 1 if x >= 10 else 0)
-    
+    df = df.copy()
+    pass_threshold = PREPROCESS_PARAMS['pass_threshold']
+    df['pass'] = df['G3'].apply(lambda x: 1 if x >= pass_threshold else 0)
+
     # Drop the original grade columns
-    df = df.drop(['G1', 'G2', 'G3'], axis=1)
-    
+    df = df.drop(PREPROCESS_PARAMS['drop_columns'], axis=1)
+
     # Separate features and target
     X = df.drop('pass', axis=1)
     y = df['pass']
-    
+
     # Identify categorical and numerical columns
     categorical_cols = X.select_dtypes(include=['object']).columns
     numerical_cols = X.select_dtypes(exclude=['object']).columns
-    
+
     # Preprocessing for numerical data
     numerical_transformer = StandardScaler()
-    
+
     # Apply transformations
     X_num = X[numerical_cols].copy()
     X_num_scaled = numerical_transformer.fit_transform(X_num)
     X_num_scaled = pd.DataFrame(X_num_scaled, columns=numerical_cols)
-    
+
     # One-hot encode categorical data
     X_cat = pd.get_dummies(X[categorical_cols])
-    
+
     # Combine processed data
     X_processed = pd.concat([X_num_scaled, X_cat], axis=1)
-    
-    # Split the data
-    X_train, X_test, y_train, y_test = train_test_split(X_processed, y, test_size=0.2, random_state=42)
-    
+    return X_processed, y, numerical_cols, categorical_cols, numerical_transformer
+
+def split_data(X_processed, y):
+    """Return X_train, X_test, y_train, y_test."""
+    return train_test_split(X_processed, y, test_size=PREPROCESS_PARAMS['test_size'],
+                            random_state=PREPROCESS_PARAMS['split_random_state'])
+
+def resample(X_train, y_train):
+    """Apply SMOTE to balance classes."""
+    smote = SMOTE(random_state=PREPROCESS_PARAMS['smote_random_state'])
+    return smote.fit_resample(X_train, y_train)
+
+def prepare_data(df):
+    """Preprocess, split and resample; return the dict stored by the feature cache."""
+    X_processed, y, numerical_cols, categorical_cols, numerical_transformer = preprocess(df)
+    X_train, X_test, y_train, y_test = split_data(X_processed, y)
+    X_train_resampled, y_train_resampled = resample(X_train, y_train)
+    return {
+        'X_train': X_train,
+        'X_test': X_test,
+        'y_train': y_train,
+        'y_test': y_test,
+        'X_train_resampled': X_train_resampled,
+        'y_train_resampled': y_train_resampled,
+        'numerical_cols': numerical_cols,
+        'categorical_cols': categorical_cols,
+        'numerical_transformer': numerical_transformer
+    }
+
+def build_model(family, params, n_jobs=None):
+    model_class, fixed_params = MODEL_FAMILIES[family]
+    return model_class(**fixed_params, **params, n_jobs=n_jobs)
+
+def fit_model(family, params, X_train, y_train, n_jobs=None):
+    """Fit with n_jobs threads, then reset n_jobs so serving doesn't spin up a thread pool per call."""
+    model = build_model(family, params, n_jobs)
+    model.fit(X_train, y_train)
+    model.set_params(n_jobs=None)
+    return model
+
+def train_random_forest(X_train, y_train, n_jobs=TRAIN_JOBS):
+    return fit_model('random_forest', {'n_estimators': 100}, X_train, y_train, n_jobs)
+
+def train_xgboost(X_train, y_train, n_jobs=TRAIN_JOBS):
+    return fit_model('xgboost', {'n_estimators': 100, 'learning_rate': 0.1}, X_train, y_train, n_jobs)
+
+def evaluate(name, model, X_test, y_test):
+    """Print accuracy and the classification report; return the accuracy."""
+    y_pred = model.predict(X_test)
+    accuracy = accuracy_score(y_test, y_pred)
+    print(f"{name} accuracy: {accuracy:.4f}")
+    print(f"Classification Report ({name}):")
+    print(classification_report(y_test, y_pred))
+    return accuracy
+
+def parallel_plan(n_tasks, n_cores=TRAIN_JOBS):
+    """Split cores into (worker processes, threads per model) with processes * threads <= cores.
+
+    Independent fits are the cheaper way to use cores, so processes come first;
+    leftover cores go to intra-model threads when there are fewer tasks than cores.
+    """
+    processes = max(1, min(n_tasks, n_cores))
+    threads = max(1, n_cores // processes)
+    return processes, threads
+
+def load_param_grid(path=PARAM_GRID_PATH):
+    if not path:
+        return DEFAULT_PARAM_GRID
+    with open(path) as f:
+        return json.load(f)
+
+def candidate_list(param_grid):
+    """[(family, params), ...] for every point of every family's grid."""
+    candidates = []
+    for family, grid in param_grid.items():
+        if family not in MODEL_FAMILIES:
+            raise ValueError(f"Unknown model family '{family}'; choose from {', '.join(MODEL_FAMILIES)}")
+        candidates.extend((family, params) for params in ParameterGrid(grid))
+    return candidates
+
+# Training data shared with the search workers once, instead of pickled per task
+_search_data = None
+
+def _init_search_worker(X, y, threads):
+    global _search_data
+    from threadpoolctl import threadpool_limits
+    _search_data = (X, y, threads)
+    # Cap BLAS/OpenMP pools too, so nested parallelism stays within the core budget
+    threadpool_limits(threads)
+
+def _evaluate_fold(task):
+    """Resample the fold's training part, fit one candidate and score it on the held-out fold."""
+    candidate_index, family, params, fold, train_index, val_index = task
+    X, y, threads = _search_data
+    X_fold, y_fold = resample(X.iloc[train_index], y.iloc[train_index])
+    start = time.perf_counter()
+    model = build_model(family, params, threads)
+    model.fit(X_fold, y_fold)
+    fit_seconds = time.perf_counter() - start
+    accuracy = accuracy_score(y.iloc[val_index], model.predict(X.iloc[val_index]))
+    return candidate_index, fold, accuracy, fit_seconds
+
+def run_search(X_train, y_train, param_grid, folds=CV_FOLDS, n_cores=TRAIN_JOBS):
+    """Cross-validate every candidate, evaluating all (candidate, fold) pairs in parallel.
+
+    Returns the candidate results sorted best first, and the parallel plan used.
+    """
+    candidates = candidate_list(param_grid)
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=42).split(X_train, y_train))
+    tasks = [(index, family, params, fold, train_index, val_index)
+             for (index, (family, params)), (fold, (train_index, val_index))
+             in itertools.product(enumerate(candidates), enumerate(splits))]
+    processes, threads = parallel_plan(len(tasks), n_cores)
+    print(f"Evaluating {len(candidates)} candidates x {folds} folds with "
+          f"{processes} processes x {threads} threads")
+
+    scores = [[] for _ in candidates]
+    fit_times = [[] for _ in candidates]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_search_worker,
+                             initargs=(X_train, y_train, threads)) as executor:
+        for candidate_index, fold, accuracy, fit_seconds in executor.map(_evaluate_fold, tasks):
+            scores[candidate_index].append(accuracy)
+            fit_times[candidate_index].append(fit_seconds)
+
+    results = []
+    for (family, params), candidate_scores, candidate_fit_times in zip(candidates, scores, fit_times):
+        results.append({
+            'family': family,
+            'params': params,
+            'meanAccuracy': float(np.mean(candidate_scores)),
+            'stdAccuracy': float(np.std(candidate_scores)),
+            'foldAccuracies': candidate_scores,
+            'meanFitSeconds': float(np.mean(candidate_fit_times)),
+            'totalFitSeconds': float(np.sum(candidate_fit_times))
+        })
+    results.sort(key=lambda result: (-result['meanAccuracy'], result['meanFitSeconds']))
+    return results, {'processes': processes, 'threadsPerModel': threads, 'cores': n_cores}
+
+def print_search_results(results):
+    print(f"\n{'model':<14} {'cv accuracy':>15} {'fit (s)':>8}  params")
+    for result in results:
+        print(f"{result['family']:<14} {result['meanAccuracy']:>8.4f} ± {result['stdAccuracy']:.3f} "
+              f"{result['meanFitSeconds']:>8.3f}  {result['params']}")
+
+def candidate_label(family, params):
+    return f"{MODEL_NAMES[family]} ({', '.join(f'{key}={value}' for key, value in params.items())})"
+
+def serving_scorer(model):
+    """The (predictions, probabilities) call app.py's ModelBundle.score_rows makes for this model."""
+    if INFERENCE_ENGINE == 'flat':
+        try:
+            return FlatForest.from_model(model).predict_with_proba
+        except ValueError:
+            pass
+    return lambda X: (model.predict(X), model.predict_proba(X))
+
+def measure_latency(model, X_test):
+    """Median/p99 single-row and batched latency of the serving call on encoded test rows."""
+    score = serving_scorer(model)
+    X = np.ascontiguousarray(X_test.to_numpy(dtype=np.float64))
+    rows = [X[i:i + 1] for i in range(len(X))]
+    batch = np.resize(X, (LATENCY_BATCH_ROWS, X.shape[1]))
+    with warnings.catch_warnings():
+        # The server passes plain arrays too; sklearn warns about the missing feature names
+        warnings.simplefilter('ignore')
+        score(batch)
+        single = []
+        for i in range(LATENCY_SINGLE_CALLS):
+            start = time.perf_counter()
+            score(rows[i % len(rows)])
+            single.append(time.perf_counter() - start)
+        batched = []
+        for _ in range(5):
+            start = time.perf_counter()
+            score(batch)
+            batched.append(time.perf_counter() - start)
+    return {
+        'singleRowP50Ms': float(np.percentile(single, 50)) * 1e3,
+        'singleRowP99Ms': float(np.percentile(single, 99)) * 1e3,
+        'batchRows': LATENCY_BATCH_ROWS,
+        'batchMs': float(np.median(batched)) * 1e3,
+        'batchPerRowUs': float(np.median(batched)) / LATENCY_BATCH_ROWS * 1e6
+    }
+
+def directory_size(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+def resident_memory_mb():
+    """Current resident set size; falls back to the peak where /proc isn't available."""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        from chunked_training import peak_rss_mb
+        return peak_rss_mb()
+
+def _measure_loaded_memory(path):
+    """Resident memory (MB) added by loading a saved model the way app.py does.
+
+    Runs in a fresh spawned process, so memory freed by earlier candidates can't hide the cost.
+    """
+    gc.collect()
+    before = resident_memory_mb()
+    if is_artifact(path):
+        engine = load_artifact(path)['model']
+    else:
+        model = joblib.load(path)['model']
+        engine = FlatForest.from_model(model) if INFERENCE_ENGINE == 'flat' else model
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        engine.predict_proba(np.zeros((1, engine.n_features_in_)))
+    return resident_memory_mb() - before
+
+def profile_candidates(candidates, prepared):
+    """Add serving latency, size on disk and loaded memory to each fitted candidate.
+
+    Each candidate is a dict with 'family', 'params', 'model' and 'accuracy'.
+    Latency is measured one candidate at a time in this process; memory in
+    parallel, one fresh process per candidate.
+    """
+    # The server loads the mmap artifact when there is one (see MODEL_ARTIFACT_PATH in app.py)
+    served_format = 'artifact' if ARTIFACT_FORMAT in ('mmap', 'both') else 'pickle'
+    with tempfile.TemporaryDirectory() as temp_dir:
+        served_paths = []
+        for index, candidate in enumerate(candidates):
+            candidate['label'] = candidate_label(candidate['family'], candidate['params'])
+            candidate['latency'] = measure_latency(candidate['model'], prepared['X_test'])
+            model_info = {
+                'model': candidate['model'],
+                'numerical_cols': prepared['numerical_cols'],
+                'categorical_cols': prepared['categorical_cols'],
+                'numerical_transformer': prepared['numerical_transformer']
+            }
+            pickle_path = os.path.join(temp_dir, f'candidate_{index}.pkl')
+            joblib.dump(model_info, pickle_path)
+            artifact_path = artifact_path_for(pickle_path)
+            save_artifact(model_info, artifact_path)
+            candidate['pickleBytes'] = os.path.getsize(pickle_path)
+            candidate['artifactBytes'] = directory_size(artifact_path)
+            candidate['sizeBytes'] = candidate[f'{served_format}Bytes']
+            served_paths.append(artifact_path if served_format == 'artifact' else pickle_path)
+
+        workers = max(1, min(TRAIN_JOBS, len(candidates)))
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                 max_tasks_per_child=1) as executor:
+            for candidate, memory_mb in zip(candidates, executor.map(_measure_loaded_memory, served_paths)):
+                candidate['loadedMemoryMb'] = memory_mb
+    mark_pareto_front(candidates)
+    return candidates
+
+def mark_pareto_front(candidates):
+    """Flag candidates no other candidate beats on accuracy, single-row latency and size at once."""
+    def dominates(a, b):
+        no_worse = (a['accuracy'] >= b['accuracy']
+                    and a['latency']['singleRowP50Ms'] <= b['latency']['singleRowP50Ms']
+                    and a['sizeBytes'] <= b['sizeBytes'])
+        better = (a['accuracy'] > b['accuracy']
+                  or a['latency']['singleRowP50Ms'] < b['latency']['singleRowP50Ms']
+                  or a['sizeBytes'] < b['sizeBytes'])
+        return no_worse and better
+    for candidate in candidates:
+        candidate['paretoOptimal'] = not any(dominates(other, candidate) for other in candidates)
+
+def select_model(candidates, latency_budget_ms=LATENCY_BUDGET_MS):
+    """Most accurate candidate within the latency budget (faster, then smaller, on ties).
+
+    If none fits the budget, the fastest candidate is returned.
+    """
+    for candidate in candidates:
+        candidate['withinBudget'] = (latency_budget_ms is None
+                                     or candidate['latency']['singleRowP50Ms'] <= latency_budget_ms)
+    eligible = [candidate for candidate in candidates if candidate['withinBudget']]
+    if not eligible:
+        print(f"\nNo candidate meets the {latency_budget_ms} ms latency budget; using the fastest one")
+        return min(candidates, key=lambda candidate: candidate['latency']['singleRowP50Ms'])
+    return max(eligible, key=lambda candidate: (candidate['accuracy'], -candidate['latency']['singleRowP50Ms'],
+                                                -candidate['sizeBytes']))
+
+def print_candidate_profiles(candidates, selected):
+    """Accuracy / latency / size table, most accurate first; * marks the Pareto front."""
+    width = max(len(candidate['label']) for candidate in candidates)
+    print(f"\n{'model':<{width}} {'accuracy':>8} {'1-row p50':>10} {'1-row p99':>10} {'1000-row':>10} "
+          f"{'size':>9} {'memory':>9}  pareto")
+    for candidate in sorted(candidates, key=lambda candidate: -candidate['accuracy']):
+        latency = candidate['latency']
+        marker = ' <- selected' if candidate is selected else ''
+        print(f"{candidate['label']:<{width}} {candidate['accuracy']:>8.4f} "
+              f"{latency['singleRowP50Ms'] * 1e3:>7.1f} us {latency['singleRowP99Ms'] * 1e3:>7.1f} us "
+              f"{latency['batchMs']:>7.2f} ms {candidate['sizeBytes'] / 1024:>6.0f} KB "
+              f"{candidate['loadedMemoryMb']:>6.1f} MB  {'*' if candidate['paretoOptimal'] else ' '}{marker}")
+    budget = f"{LATENCY_BUDGET_MS} ms single-row budget" if LATENCY_BUDGET_MS else "no latency budget"
+    print(f"Latency is the '{INFERENCE_ENGINE}' engine's model call on encoded rows; {budget}")
+
+def candidate_report(candidates):
+    """JSON-ready candidate profiles (without the fitted models)."""
+    return [{key: value for key, value in candidate.items() if key != 'model'} for candidate in candidates]
+
+def save_model(model_info, model_name):
+    """Write the pickle and/or artifact for model_name, each replacing the previous one atomically."""
+    if ARTIFACT_FORMAT in ('pickle', 'both'):
+        # A server reloading mid-write must never read a partial pickle
+        temp_name = f"{model_name}.tmp-{os.getpid()}"
+        try:
+            joblib.dump(model_info, temp_name)
+            os.replace(temp_name, model_name)
+        except BaseException:
+            if os.path.exists(temp_name):
+                os.remove(temp_name)
+            raise
+        print(f"Model saved as {model_name}")
+    if ARTIFACT_FORMAT in ('mmap', 'both'):
+        artifact_path = artifact_path_for(model_name)
+        save_artifact(model_info, artifact_path)
+        print(f"Memory-mapped artifact saved as {artifact_path}")
+
+def save_served_model(model_info, label):
+    """Save the selected model at SERVED_MODEL_PATH and return the path app.py will load.
+
+    Other model files are left alone unless REMOVE_STALE_MODELS is set. Without
+    it, an older file that app.py loads before this one is only reported.
+    """
+    save_model(model_info, SERVED_MODEL_PATH)
+    # The served path's pickle or artifact if this run didn't rewrite it (app.py
+    # prefers the artifact), and the per-family files app.py falls back to
+    stale = []
+    if ARTIFACT_FORMAT == 'pickle':
+        stale.append(artifact_path_for(SERVED_MODEL_PATH))
+    elif ARTIFACT_FORMAT == 'mmap':
+        stale.append(SERVED_MODEL_PATH)
+    legacy = [path for path in LEGACY_MODEL_PATHS if path not in (SERVED_MODEL_PATH, SHADOW_MODEL_OUTPUT)]
+    stale += legacy + [artifact_path_for(path) for path in legacy]
+    for path in stale:
+        if not os.path.exists(path):
+            continue
+        if REMOVE_STALE_MODELS:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+            print(f"Removed stale model file {path}")
+        elif path == artifact_path_for(SERVED_MODEL_PATH):
+            print(f"Warning: {path} is older than {SERVED_MODEL_PATH} and app.py loads it first; "
+                  f"remove it or rerun with REMOVE_STALE_MODELS=1")
+    served_artifact = artifact_path_for(SERVED_MODEL_PATH)
+    served_path = served_artifact if is_artifact(served_artifact) else SERVED_MODEL_PATH
+    print(f"app.py will serve {'the older model' if served_path in stale else label} from {served_path}")
+    return served_path
+
+def main():
+    download_dataset()
+
+    # Reuse the preprocessed data if the CSV and settings haven't changed
+    prepared = None
+    if FEATURE_CACHE_DIR:
+        start = time.perf_counter()
+        key = cache_key([DATA_PATH], PREPROCESS_PARAMS)
+        prepared = load_prepared(FEATURE_CACHE_DIR, key)
+        if prepared is not None:
+            print(f"Loaded preprocessed data from feature cache {key[:12]} in {time.perf_counter() - start:.3f}s")
+
+    if prepared is None:
+        # Load the dataset
+        try:
+            df = load_dataset()
+            print("Dataset loaded successfully!")
+            print(f"Dataset shape: {df.shape}")
+            print(df.head())
+        except Exception as e:
+            print(f"Error loading dataset: {e}")
+            df = None
+
+        if df is None:
+            print("Failed to load dataset. Model training aborted.")
+            return
+
+        # Preprocess, split and apply SMOTE to balance classes
+        print("\nPreprocessing data...")
+        prepared = prepare_data(df)
+        if FEATURE_CACHE_DIR:
+            save_prepared(FEATURE_CACHE_DIR, key, prepared)
+            print(f"Preprocessed data saved to feature cache {key[:12]}")
+
+    X_train, X_test = prepared['X_train'], prepared['X_test']
+    y_train, y_test = prepared['y_train'], prepared['y_test']
+    X_train_resampled, y_train_resampled = prepared['X_train_resampled'], prepared['y_train_resampled']
+    numerical_cols = prepared['numerical_cols']
+    categorical_cols = prepared['categorical_cols']
+    numerical_transformer = prepared['numerical_transformer']
+
     # Check for class imbalance
     print(f"\nClass distribution in training set: {np.bincount(y_train)}")
-    
-    # Apply SMOTE to balance classes
-    smote = SMOTE(random_state=42)
-    X_train_resampled, y_train_resampled = smote.fit_resample(X_train, y_train)
     print(f"Class distribution after SMOTE: {np.bincount(y_train_resampled)}")
-    
-    # Train Random Forest model
-    print("\nTraining Random Forest model...")
-    rf_model = RandomForestClassifier(n_estimators=100, random_state=42)
-    rf_model.fit(X_train_resampled, y_train_resampled)
-    
-    # Evaluate Random Forest
-    y_pred_rf = rf_model.predict(X_test)
-    rf_accuracy = accuracy_score(y_test, y_pred_rf)
-    print(f"Random Forest accuracy: {rf_accuracy:.4f}")
-    print("Classification Report (Random Forest):")
-    print(classification_report(y_test, y_pred_rf))
-    
-    # Train XGBoost model
-    print("\nTraining XGBoost model...")
-    xgb_model = XGBClassifier(n_estimators=100, learning_rate=0.1, random_state=42)
-    xgb_model.fit(X_train_resampled, y_train_resampled)
-    
-    # Evaluate XGBoost
-    y_pred_xgb = xgb_model.predict(X_test)
-    xgb_accuracy = accuracy_score(y_test, y_pred_xgb)
-    print(f"XGBoost accuracy: {xgb_accuracy:.4f}")
-    print("Classification Report (XGBoost):")
-    print(classification_report(y_test, y_pred_xgb))
-    
-    # Save the better performing model
-    if rf_accuracy > xgb_accuracy:
-        print("\nSaving Random Forest model...")
-        best_model = rf_model
-        model_name = "student_performance_rf_model.pkl"
-    else:
-        print("\nSaving XGBoost model...")
-        best_model = xgb_model
-        model_name = "student_performance_xgb_model.pkl"
-    
+
+    if TRAIN_SEARCH:
+        search_and_save(prepared)
+        return
+
+    # Fit every candidate and check it on the held-out test split
+    start = time.perf_counter()
+    candidates = []
+    for family, params in MODEL_CANDIDATES:
+        label = candidate_label(family, params)
+        print(f"\nTraining {label}...")
+        model = fit_model(family, params, X_train_resampled, y_train_resampled, TRAIN_JOBS)
+        accuracy = accuracy_score(y_test, model.predict(X_test))
+        print(f"{label} accuracy: {accuracy:.4f}")
+        candidates.append({'family': family, 'params': params, 'model': model, 'accuracy': accuracy})
+
+    # Keep the most accurate model that is fast enough to serve
+    print("\nMeasuring inference latency, size and memory...")
+    profile_candidates(candidates, prepared)
+    best = select_model(candidates)
+    print_candidate_profiles(candidates, best)
+    print()
+    evaluate(best['label'], best['model'], X_test, y_test)
+
+    report = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'mode': 'fixed',
+        'latencyBudgetMs': LATENCY_BUDGET_MS,
+        'inferenceEngine': INFERENCE_ENGINE,
+        'candidates': candidate_report(candidates),
+        'selected': {'label': best['label'], 'modelPath': SERVED_MODEL_PATH},
+        'totalSeconds': time.perf_counter() - start
+    }
+    with open(TRAINING_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Training report saved as {TRAINING_REPORT_PATH}")
+
     # Save the model and preprocessing information
     model_info = {
-        'model': best_model,
+        'model': best['model'],
         'numerical_cols': numerical_cols,
         'categorical_cols': categorical_cols,
         'numerical_transformer': numerical_transformer
     }
-    
-    joblib.dump(model_info, model_name)
-    print(f"Model saved as {model_name}")
-else:
-    print("Failed to load dataset. Model training aborted.") 
\ No newline at end of file
+    print(f"\nSaving {best['label']}...")
+    save_served_model(model_info, best['label'])
+
+    if SHADOW_MODEL_OUTPUT:
+        others = [candidate for candidate in candidates if candidate['family'] != best['family']]
+        if others:
+            shadow = select_model(others)
+            print(f"\nSaving {shadow['label']} as the shadow model...")
+            save_model({**model_info, 'model': shadow['model']}, SHADOW_MODEL_OUTPUT)
+
+def search_and_save(prepared):
+    """TRAIN_SEARCH mode: cross-validated grid search, then refit the winner on the whole training split."""
+    start = time.perf_counter()
+    param_grid = load_param_grid()
+    results, plan = run_search(prepared['X_train'], prepared['y_train'], param_grid)
+    search_seconds = time.perf_counter() - start
+    print_search_results(results)
+
+    # Refit best-first until a candidate fits the latency budget (only the best one without a budget)
+    refit_start = time.perf_counter()
+    profiled = []
+    for result in results:
+        label = candidate_label(result['family'], result['params'])
+        print(f"\nRefitting {label} on the full training split...")
+        model = fit_model(result['family'], result['params'], prepared['X_train_resampled'],
+                          prepared['y_train_resampled'], TRAIN_JOBS)
+        profiled.append({'family': result['family'], 'params': result['params'], 'model': model,
+                         'accuracy': result['meanAccuracy'], 'result': result})
+        profile_candidates(profiled[-1:], prepared)
+        if LATENCY_BUDGET_MS is None or profiled[-1]['latency']['singleRowP50Ms'] <= LATENCY_BUDGET_MS:
+            break
+    refit_seconds = time.perf_counter() - refit_start
+    mark_pareto_front(profiled)
+    selected = select_model(profiled)
+    print_candidate_profiles(profiled, selected)
+
+    best = selected['result']
+    best_model = selected['model']
+    label = candidate_label(best['family'], best['params'])
+    test_accuracy = evaluate(label, best_model, prepared['X_test'], prepared['y_test'])
+
+    total_seconds = time.perf_counter() - start
+    print(f"Search wall time: {search_seconds:.2f}s, total: {total_seconds:.2f}s")
+    report = {
+        'createdAt': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'folds': CV_FOLDS,
+        'parallelism': plan,
+        'paramGrid': param_grid,
+        'candidates': results,
+        'best': {**best, 'modelPath': SERVED_MODEL_PATH, 'testAccuracy': test_accuracy, 'refitSeconds': refit_seconds},
+        'selection': {
+            'latencyBudgetMs': LATENCY_BUDGET_MS,
+            'inferenceEngine': INFERENCE_ENGINE,
+            'profiled': [{key: value for key, value in candidate.items() if key != 'result'}
+                         for candidate in candidate_report(profiled)]
+        },
+        'searchSeconds': search_seconds,
+        'totalSeconds': total_seconds
+    }
+    with open(TRAINING_REPORT_PATH, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Training report saved as {TRAINING_REPORT_PATH}")
+
+    model_info = {
+        'model': best_model,
+        'numerical_cols': prepared['numerical_cols'],
+        'categorical_cols': prepared['categorical_cols'],
+        'numerical_transformer': prepared['numerical_transformer']
+    }
+    print(f"\nSaving {label}...")
+    save_served_model(model_info, label)
+
+if __name__ == '__main__':
+    main()